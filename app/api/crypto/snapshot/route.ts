@@ -0,0 +1,41 @@
+import { NextResponse } from 'next/server';
+import { supabase } from '@/lib/supabase';
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const name = searchParams.get('name') || 'default';
+
+  try {
+    // One precomputed row, rewritten by every ingest run (see migrations/008_dashboard_snapshot.sql)
+    const { data, error } = await supabase
+      .from('dashboard_snapshots')
+      .select('version, payload')
+      .eq('name', name)
+      .limit(1);
+
+    if (error) {
+      throw error;
+    }
+
+    if (!data || data.length === 0) {
+      return NextResponse.json({ error: 'No snapshot found' }, { status: 404 });
+    }
+
+    const etag = `"${data[0].version}"`;
+    const headers = {
+      ETag: etag,
+      'Cache-Control': 'public, max-age=0, s-maxage=300, stale-while-revalidate=3600',
+    };
+    if (request.headers.get('if-none-match') === etag) {
+      return new NextResponse(null, { status: 304, headers });
+    }
+
+    return NextResponse.json(data[0].payload, { headers });
+  } catch (error) {
+    console.error('Database error:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch dashboard snapshot' },
+      { status: 500 }
+    );
+  }
+}
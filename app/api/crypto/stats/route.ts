@@ -0,0 +1,33 @@
+import { NextResponse } from 'next/server';
+import { supabase } from '@/lib/supabase';
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const coins = searchParams.get('coins')?.split(',') || ['BTC', 'ETH', 'SOL', 'BNB'];
+
+  try {
+    // Precomputed by the ingest (see migrations/007_coin_stats.sql)
+    const { data, error } = await supabase
+      .from('coin_stats')
+      .select('symbol, date, price, market_cap, volume, changes, ath, ath_date, drawdown, volatility_30d')
+      .in('symbol', coins);
+
+    if (error) {
+      throw error;
+    }
+
+    // Keyed by symbol for the stats cards
+    const stats: { [symbol: string]: any } = {};
+    (data || []).forEach(row => {
+      stats[row.symbol] = row;
+    });
+
+    return NextResponse.json(stats);
+  } catch (error) {
+    console.error('Database error:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch coin stats' },
+      { status: 500 }
+    );
+  }
+}
@@ -1,42 +1,17 @@
 import { NextResponse } from 'next/server';
-import { supabase } from '@/lib/supabase';
+import { fetchMarketSeries, pickInterval } from '@/lib/marketSeries';
 
 export async function GET(request: Request) {
   const { searchParams } = new URL(request.url);
   const start = searchParams.get('start') || '2024-01-01';
   const end = searchParams.get('end') || new Date().toISOString().split('T')[0];
   const coins = searchParams.get('coins')?.split(',') || ['BTC', 'ETH', 'SOL', 'BNB'];
+  // day, week or month; long ranges default to weekly/monthly points
+  const interval = pickInterval(start, end, searchParams.get('interval'));
 
   try {
-    const { data, error } = await supabase
-      .from('crypto_volumes')
-      .select('date, prices')
-      .gte('date', start)
-      .lte('date', end)
-      .order('date', { ascending: true });
-
-    if (error) {
-      throw error;
-    }
-
-    if (!data || data.length === 0) {
-      return NextResponse.json([]);
-    }
-
-    // Process the data to extract only the requested coins
-    const formattedData = data.map(row => {
-      const volumeData: any = { date: row.date };
-      
-      coins.forEach(coin => {
-        if (row.prices[coin] !== undefined) {
-          volumeData[coin] = row.prices[coin];
-        }
-      });
-      
-      return volumeData;
-    });
-
-    return NextResponse.json(formattedData);
+    const data = await fetchMarketSeries('crypto_volumes', coins, start, end, interval);
+    return NextResponse.json(data, { headers: { 'X-Interval': interval } });
   } catch (error) {
     console.error('Database error:', error);
     return NextResponse.json(
@@ -44,4 +19,4 @@ export async function GET(request: Request) {
       { status: 500 }
     );
   }
-}
\ No newline at end of file
+}
@@ -11,6 +11,7 @@ import ScaleToggle from '@/components/ScaleToggle';
 import MetricsWorkbench from '@/components/metrics/MetricsWorkbench';
 import { CustomMetric } from '@/components/metrics/MetricBuilder';
 import { calculateCustomMetrics, prepareDataForMetrics, formatMetricDataForChart } from '@/lib/metricEvaluator';
+import { getSnapshot, snapshotCovers } from '@/lib/dashboardSnapshot';
 
 export default function Home() {
   // State variables
@@ -23,6 +24,7 @@ export default function Home() {
   const [isLoading, setIsLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
   const [stats, setStats] = useState<{ [key: string]: any }>({});
+  const [coinStats, setCoinStats] = useState<{ [key: string]: any }>({});
   const [isLogarithmic, setIsLogarithmic] = useState<boolean>(false);
   const [showMetricsWorkbench, setShowMetricsWorkbench] = useState<boolean>(false);
   const [selectedMetric, setSelectedMetric] = useState<CustomMetric | null>(null);
@@ -66,6 +68,13 @@ export default function Home() {
     const fetchCoins = async () => {
       setIsLoading(true);
       try {
+        // The current top 100 is part of the dashboard snapshot
+        const snapshot = coinScope === 'current' ? await getSnapshot() : null;
+        if (snapshot && snapshot.coins.length > 0) {
+          setAvailableCoins(snapshot.coins.map(coin => coin.symbol));
+          return;
+        }
+
         const response = await axios.get('/api/crypto/coins', {
           params: { scope: coinScope }
         });
@@ -102,9 +111,18 @@ export default function Home() {
 
       try {
         const { startDate, endDate } = getDateRangeFromSelection(timeRange);
-        
+
+        // The default view comes from the precomputed snapshot (one read)
+        const snapshot = await getSnapshot();
+        const fromSnapshot = snapshot && snapshotCovers(snapshot, selectedCoins, timeRange) ? {
+          priceResponse: { data: snapshot.series.prices },
+          marketCapResponse: { data: snapshot.series['market-caps'] },
+          volumeResponse: { data: snapshot.series.volumes },
+          statsResponse: { data: snapshot.stats },
+        } : null;
+
         // Fetch price data
-        const priceResponse = await axios.get('/api/crypto/prices', {
+        const priceResponse = fromSnapshot ? fromSnapshot.priceResponse : await axios.get('/api/crypto/prices', {
           params: {
             start: startDate,
             end: endDate,
@@ -112,8 +130,13 @@ export default function Home() {
           },
         });
 
-        // Also fetch market cap and volume data for metrics
-        const [marketCapResponse, volumeResponse] = await Promise.all([
+        // Also fetch market cap and volume data for metrics, and the
+        // precomputed card stats (the cards fall back to the series without them)
+        const [marketCapResponse, volumeResponse, statsResponse] = fromSnapshot ? [
+          fromSnapshot.marketCapResponse,
+          fromSnapshot.volumeResponse,
+          fromSnapshot.statsResponse,
+        ] : await Promise.all([
           axios.get('/api/crypto/market-caps', {
             params: {
               start: startDate,
@@ -127,13 +150,17 @@ export default function Home() {
               end: endDate,
               coins: selectedCoins.join(','),
             },
-          })
+          }),
+          axios.get('/api/crypto/stats', {
+            params: { coins: selectedCoins.join(',') },
+          }).catch(() => ({ data: {} }))
         ]);
 
         // Store all data types
         setChartData(priceResponse.data);
         setMarketCapData(marketCapResponse.data);
         setVolumeData(volumeResponse.data);
+        setCoinStats(statsResponse.data);
 
         // Process for currently selected data type
         let displayData;
@@ -149,7 +176,7 @@ export default function Home() {
         }
 
         // Calculate stats
-        calculateStats(displayData);
+        calculateStats(displayData, statsResponse.data);
 
         // Update metric data if a metric is selected
         if (selectedMetric) {
@@ -187,7 +214,7 @@ export default function Home() {
     if (displayData && displayData.length > 0) {
       calculateStats(displayData);
     }
-  }, [dataType, chartData, marketCapData, volumeData]);
+  }, [dataType, chartData, marketCapData, volumeData, coinStats]);
 
   // Toggle logarithmic scale
   const toggleScale = () => {
@@ -233,26 +260,38 @@ export default function Home() {
   }, [chartData, selectedCoins, dataType]);
 
   // Calculate statistics for selected coins
-  const calculateStats = (data: any[]) => {
+  const calculateStats = (data: any[], summaries: { [key: string]: any } = coinStats) => {
     if (!data || data.length === 0) {
       setStats({});
       return;
     }
 
     const newStats: { [key: string]: any } = {};
+    const statKey = dataType === 'market-caps' ? 'market_cap' : dataType === 'volumes' ? 'volume' : 'price';
 
     selectedCoins.forEach(coin => {
-      // Get current and previous values
-      const currentValue = data[data.length - 1][coin];
-      const previousValue = data[0][coin];
-      
-      if (currentValue === undefined || previousValue === undefined) {
-        return;
-      }
+      let currentValue;
+      let percentChange;
+
+      // Precomputed by the ingest (coin_stats)
+      const summary = summaries[coin];
+      const precomputedChange = summary?.changes?.[statKey]?.[timeRange];
+      if (summary && summary[statKey] != null && precomputedChange != null) {
+        currentValue = summary[statKey];
+        percentChange = precomputedChange;
+      } else {
+        // Get current and previous values
+        currentValue = data[data.length - 1][coin];
+        const previousValue = data[0][coin];
+
+        if (currentValue === undefined || previousValue === undefined) {
+          return;
+        }
 
-      // Calculate percentage change
-      const change = currentValue - previousValue;
-      const percentChange = (change / previousValue) * 100;
+        // Calculate percentage change
+        const change = currentValue - previousValue;
+        percentChange = (change / previousValue) * 100;
+      }
 
       // Format values
       const formattedValue = formatValue(currentValue, dataType);
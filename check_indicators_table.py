@@ -2,6 +2,7 @@ import os
 import json
 import re
 from supabase import create_client
+from indicators.local_mirror import get_mirror
 import logging
 
 # Configure logging
@@ -53,6 +54,15 @@ def check_table():
         # Connect to Supabase
         supabase = get_supabase_client()
         
+        # Read from the local mirror when one is configured
+        mirror = get_mirror(supabase)
+        if mirror:
+            rows = mirror.rows("indicators")
+            logger.info(f"Indicators table (local mirror) has {len(rows)} rows")
+            for row in rows:
+                logger.info(f"{row.get('indicator_name')}: date {row.get('date')}, version {row.get('version')}")
+            return
+        
         # Check if indicators table exists
         logger.info("Checking for indicators table...")
         try:
@@ -1,56 +1,40 @@
 #!/usr/bin/env python
 """
+CI-specific script to update AVS indicator
+
+This script uses the avs_indicator_ci.py module which has no dependency on base_indicator.py.
+The update itself is the shared flow in indicators/indicator_update.py.
+
 If running this script locally, make sure you have a .env.local file with:
 SUPABASE_URL=your_supabase_url_here
 SUPABASE_KEY=your_supabase_service_role_key_here
-
-
-CI-specific script to update AVS indicator
-
-This script uses the avs_indicator_ci.py module which has no dependency on base_indicator.py
 """
 
-import os
-import json
 import logging
-from datetime import datetime
+import argparse
+from indicators.indicator_update import update_indicator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("ci_avs_update")
 
-def update_avs_indicator():
+def update_avs_indicator(supabase=None, data=None, force=False, writer=None):
+    """
+    Generate the AVS indicator and store it in Supabase.
+
+    Args:
+        supabase: Existing Supabase client to reuse (created if omitted)
+        data: Preloaded inputs from AVSIndicator.load_data() (loaded if omitted)
+        force: Recompute and upload even if the inputs are unchanged
+        writer: IndicatorWriter to queue the indicators row on (committed here if omitted)
+    """
     try:
         logger.info("Starting AVS indicator update")
         
         # Import the CI-specific version of the AVS indicator
         from indicators.avs_indicator_ci import AVSIndicator
         
-        # Create indicator instance
-        indicator = AVSIndicator()
-        
-        # Generate indicator data
-        logger.info("Generating indicator data")
-        result = indicator.generate_data({"period": "all", "theme": "light"})
-        
-        # Convert JSON string to a Python dictionary
-        plotly_json = json.loads(result["plotly_json"])
-        
-        # Prepare data for insertion
-        data = {
-            "indicator_name": "avs_average",
-            "date": datetime.now().strftime('%Y-%m-%d'),
-            "plotly_json": plotly_json,
-            "latest_data": result["latest_data"]
-        }
-        
-        # Delete existing record first
-        logger.info("Deleting existing AVS indicator")
-        indicator.supabase.table("indicators").delete().eq("indicator_name", "avs_average").execute()
-        
-        # Insert new record
-        logger.info("Inserting new AVS indicator")
-        response = indicator.supabase.table("indicators").insert(data).execute()
+        update_indicator(AVSIndicator(supabase=supabase), "avs_average", data=data, force=force, writer=writer)
         
         logger.info("✅ AVS indicator updated successfully")
         return True
@@ -59,5 +43,8 @@ def update_avs_indicator():
         return False
 
 if __name__ == "__main__":
-    success = update_avs_indicator()
+    parser = argparse.ArgumentParser(description="Update the AVS indicator in Supabase")
+    parser.add_argument('--force', action='store_true', help="Recompute and upload even if the inputs are unchanged")
+    args = parser.parse_args()
+    success = update_avs_indicator(force=args.force)
     exit(0 if success else 1)
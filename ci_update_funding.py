@@ -2,50 +2,35 @@
 """
 CI-specific script to update funding indicator
 
-This script uses the funding_indicator_ci.py module which has no dependency on base_indicator.py
+This script uses the funding_indicator_ci.py module which has no dependency on base_indicator.py.
+The update itself is the shared flow in indicators/indicator_update.py.
 """
 
-import os
-import json
 import logging
-from datetime import datetime
+import argparse
+from indicators.indicator_update import update_indicator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("ci_funding_update")
 
-def update_funding_indicator():
+def update_funding_indicator(supabase=None, data=None, force=False, writer=None):
+    """
+    Generate the funding indicator and store it in Supabase.
+
+    Args:
+        supabase: Existing Supabase client to reuse (created if omitted)
+        data: Preloaded inputs from FundingIndicator.load_data() (loaded if omitted)
+        force: Recompute and upload even if the inputs are unchanged
+        writer: IndicatorWriter to queue the indicators row on (committed here if omitted)
+    """
     try:
         logger.info("Starting funding indicator update")
         
         # Import the CI-specific version of the funding indicator
         from indicators.funding_indicator_ci import FundingIndicator
         
-        # Create indicator instance
-        indicator = FundingIndicator()
-        
-        # Generate indicator data
-        logger.info("Generating indicator data")
-        result = indicator.generate_data({"period": "all", "theme": "light"})
-        
-        # Convert JSON string to a Python dictionary
-        plotly_json = json.loads(result["plotly_json"])
-        
-        # Prepare data for insertion
-        data = {
-            "indicator_name": "funding_rate",
-            "date": datetime.now().strftime('%Y-%m-%d'),
-            "plotly_json": plotly_json,
-            "latest_data": result["latest_data"]
-        }
-        
-        # Delete existing record first
-        logger.info("Deleting existing funding rate indicator")
-        indicator.supabase.table("indicators").delete().eq("indicator_name", "funding_rate").execute()
-        
-        # Insert new record
-        logger.info("Inserting new funding rate indicator")
-        response = indicator.supabase.table("indicators").insert(data).execute()
+        update_indicator(FundingIndicator(supabase=supabase), "funding_rate", data=data, force=force, writer=writer)
         
         logger.info("✅ Funding indicator updated successfully")
         return True
@@ -54,5 +39,8 @@ def update_funding_indicator():
         return False
 
 if __name__ == "__main__":
-    success = update_funding_indicator()
+    parser = argparse.ArgumentParser(description="Update the funding indicator in Supabase")
+    parser.add_argument('--force', action='store_true', help="Recompute and upload even if the inputs are unchanged")
+    args = parser.parse_args()
+    success = update_funding_indicator(force=args.force)
     exit(0 if success else 1)
@@ -2,7 +2,8 @@
 
 import { useState, useEffect } from 'react';
 import dynamic from "next/dynamic";
-import { supabase } from "@/lib/supabase";
+import { useFigureTiles } from "@/lib/indicatorTiles";
+import { fetchIndicatorRow } from "@/lib/figurePatches";
 import PasswordProtection from "../PasswordProtection";
 
 // Dynamically import Plotly to prevent server-side rendering issues
@@ -18,6 +19,7 @@ export function AVSIndicator() {
     const [plotData, setPlotData] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const { figure, onRelayout } = useFigureTiles("avs_average", plotData);
     
     // This useEffect will only run after the password is verified
     // because the component is only mounted at that point
@@ -27,15 +29,7 @@ export function AVSIndicator() {
           setLoading(true);
           
           // Fetch the latest AVS indicator data from Supabase
-          const { data, error } = await supabase
-            .from("indicators")
-            .select("*")
-            .eq("indicator_name", "avs_average")
-            .order("date", { ascending: false }) // Get latest
-            .limit(1)
-            .single();
-
-          if (error) throw error;
+          const data = await fetchIndicatorRow("avs_average");
 
           setLatestData(data.latest_data);
           setPlotData(data.plotly_json); // Set Plotly chart data
@@ -91,14 +85,16 @@ export function AVSIndicator() {
           ) : (
             <>
               {/* Render Plotly Chart */}
-              {plotData && (
+              {figure && (
                 <div className="w-full max-w-[1400px] mx-auto">
                   <Plot 
-                    data={plotData.data} 
+                    data={figure.data} 
                     layout={{ 
-                      ...plotData.layout, 
-                      autosize: true // Allows Plotly to automatically size the chart
+                      ...figure.layout, 
+                      autosize: true, // Allows Plotly to automatically size the chart
+                      uirevision: "avs_average" // Keep the zoom while full-resolution tiles load
                     }} 
+                    onRelayout={onRelayout} // Swap in full-resolution tiles when zoomed in
                     useResizeHandler={true} // Ensures it resizes properly
                     className="w-full h-[600px]" // Forces it to take full width
                   />
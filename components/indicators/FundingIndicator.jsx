@@ -2,7 +2,8 @@
 
 import { useState, useEffect } from 'react';
 import dynamic from "next/dynamic";
-import { supabase } from "@/lib/supabase";
+import { useFigureTiles } from "@/lib/indicatorTiles";
+import { fetchIndicatorRow } from "@/lib/figurePatches";
 import PasswordProtection from "../PasswordProtection";
 
 // ✅ Dynamically import Plotly to prevent server-side rendering issues
@@ -18,6 +19,7 @@ export function FundingIndicator() {
     const [plotData, setPlotData] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const { figure, onRelayout } = useFigureTiles("funding_rate", plotData);
     
     // This useEffect will only run after the password is verified
     // because the component is only mounted at that point
@@ -27,15 +29,7 @@ export function FundingIndicator() {
           setLoading(true);
           
           // ✅ Fetch the latest funding indicator data from Supabase
-          const { data, error } = await supabase
-            .from("indicators")
-            .select("*")
-            .eq("indicator_name", "funding_rate")
-            .order("date", { ascending: false }) // Get latest
-            .limit(1)
-            .single();
-
-          if (error) throw error;
+          const data = await fetchIndicatorRow("funding_rate");
 
           setLatestData(data.latest_data);
           setPlotData(data.plotly_json); // ✅ Set Plotly chart data
@@ -81,14 +75,16 @@ export function FundingIndicator() {
           ) : (
             <>
               {/* ✅ Render Plotly Chart */}
-              {plotData && (
+              {figure && (
                 <div className="w-full max-w-[1400px] mx-auto">
                   <Plot 
-                    data={plotData.data} 
+                    data={figure.data} 
                     layout={{ 
-                      ...plotData.layout, 
-                      autosize: true // ✅ Allows Plotly to automatically size the chart
+                      ...figure.layout, 
+                      autosize: true, // ✅ Allows Plotly to automatically size the chart
+                      uirevision: "funding_rate" // Keep the zoom while full-resolution tiles load
                     }} 
+                    onRelayout={onRelayout} // Swap in full-resolution tiles when zoomed in
                     useResizeHandler={true} // ✅ Ensures it resizes properly
                     className="w-full h-[600px]" // ✅ Forces it to take full width
                   />
@@ -38,6 +38,34 @@ def process_data():
     df['Signal'] = df['RSI'] * df['zScore']
     return df
 
+def colored_line_traces(x, y, colors, width=2):
+    """
+    A line whose segment i -> i+1 is drawn in colors[i], as one trace per color.
+
+    Each color's segments are grouped into runs of consecutive segments; runs
+    are separated by a NaN point so they don't join up.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    colors = np.asarray(colors)
+    traces = []
+    for color in pd.unique(colors[:-1]):
+        # seg[k]: segment k -> k+1 has this color
+        seg = np.append(colors[:-1] == color, False)
+        prev = np.insert(seg[:-1], 0, False)
+        points = np.flatnonzero(seg | prev)
+        # A run ends at a point reached by this color but not left by it
+        run_ends = np.flatnonzero((prev & ~seg)[points])
+        traces.append(go.Scatter(
+            x=np.insert(x[points], run_ends + 1, x[points][run_ends]),
+            y=np.insert(y[points], run_ends + 1, np.nan),
+            mode='lines',
+            hoverinfo='skip',
+            line=dict(color=color, width=width),
+            showlegend=False
+        ))
+    return traces
+
 def plot_data(df):
     with open(r"C:\Users\mkslv\Desktop\Scritps\\LOGO_50opa_cut02.png", "rb") as image_file:
         encoded_image = base64.b64encode(image_file.read()).decode()
@@ -69,33 +97,20 @@ def plot_data(df):
         row=1, col=1
     )
     
-    # Iterate through segments to keep the line connected with color changes
-    for i in range(len(x_values) - 1):
-        fig.add_trace(
-            go.Scatter(
-                x=[x_values[i], x_values[i + 1]],
-                y=[price[i], price[i + 1]],
-                mode='lines',
-                hovertemplate=None,
-                hoverinfo='skip',
-                line=dict(color=colors[i], width=2.5),  # Slightly thicker line
-                showlegend=False
-            ),
-            row=1, col=1
-        )
+    # One trace per color instead of one per segment, so the full history stays interactive
+    for trace in colored_line_traces(x_values, price, colors, width=2.5):
+        fig.add_trace(trace, row=1, col=1)
     
-
-
     # Improved oscillator
     trace_net = go.Bar(
         x=df.index,
         y=df['Signal'],
         name='Crowding',
         marker=dict(
-            color=['rgba(0, 154, 154, 0.7)' if val >= 0 else 'rgba(86, 253, 164, 0.7)' for val in df['Signal']]
+            color=np.where(df['Signal'] >= 0, 'rgba(0, 154, 154, 0.7)', 'rgba(86, 253, 164, 0.7)')
         ),
         marker_line=dict(
-            color=['rgba(0, 154, 154, 1)' if val >= 0 else 'rgba(86, 253, 164, 1)' for val in df['Signal']],
+            color=np.where(df['Signal'] >= 0, 'rgba(0, 154, 154, 1)', 'rgba(86, 253, 164, 1)'),
             width=0.5
         )
     )
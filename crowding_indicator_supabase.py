@@ -1,11 +1,12 @@
 import os
-import json
-import pandas as pd
+import argparse
 import numpy as np
-from datetime import datetime, timedelta
 from supabase import create_client
+from indicators.price_reader import read_prices
+from indicators.local_mirror import get_mirror
+from indicators.crowding_records import DAILY_CONFLICT, build_records, last_stored_date, upload_metadata
+from indicators.bulk_writer import bulk_upsert
 import logging
-from typing import Dict, List, Any
 import re
 
 # Configure logging
@@ -31,15 +32,6 @@ def load_env_from_dotenv():
     except Exception as e:
         logger.warning(f"Error loading .env.local file: {e}")
 
-# Load service account
-def load_service_account(file_path: str) -> Dict[str, Any]:
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load service account file: {e}")
-        raise
-
 # Supabase client setup
 def get_supabase_client():
     # Try to use NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY from .env.local
@@ -61,51 +53,19 @@ def get_supabase_client():
 # Get BTC price data from Supabase
 def get_btc_price_data(supabase):
     try:
-        # Query the crypto_prices table
+        # Only the date and the BTC price are read, page by page
         logger.info("Querying the crypto_prices table...")
-        query = supabase.table("crypto_prices").select("*").order("date").execute()
+        mirror = get_mirror(supabase)
+        prices = mirror.read_prices(["BTC"]) if mirror else read_prices(supabase, ["BTC"])
         
-        if len(query.data) == 0:
+        if prices.empty:
             logger.error("No price data found in crypto_prices table")
             return None
         
-        logger.info(f"Retrieved {len(query.data)} days of price data")
+        logger.info(f"Retrieved {len(prices)} days of price data")
         
-        # Initialize empty lists for dates and prices
-        dates = []
-        btc_prices = []
-        
-        # Extract BTC prices from the JSON structure
-        for row in query.data:
-            date = row['date']
-            prices_json = row['prices']
-            
-            # If prices is already a dictionary (parsed by Supabase client)
-            if isinstance(prices_json, dict):
-                prices_data = prices_json
-            else:
-                # Otherwise parse it as JSON
-                prices_data = json.loads(prices_json)
-            
-            # Look for BTC price - try "GT" since we saw that in the sample data
-            btc_price = None
-            if "GT" in prices_data:
-                btc_price = float(prices_data["GT"])
-            
-            # If we found a valid price, add to our lists
-            if btc_price is not None:
-                dates.append(date)
-                btc_prices.append(btc_price)
-            
-        # Create dataframe from extracted data
-        df = pd.DataFrame({
-            'date': dates,
-            'BTC': btc_prices
-        })
-        
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df = df.sort_index()
+        # Keep the days that have a price
+        df = prices.dropna().sort_index()
         
         logger.info(f"Created dataframe with {len(df)} rows of BTC price data")
         logger.info(f"Sample data (first 5 rows):\n{df.head()}")
@@ -177,50 +137,17 @@ def calculate_crowding_indicator(df):
         return None
 
 # Prepare data for Supabase - now using a cleaner structure
-def prepare_indicators_data(df):
+def prepare_indicators_data(df, since=None):
     if df is None or df.empty:
         logger.warning("No data available to prepare indicators")
         return []
     
-    indicators_by_date = {}
     logger.info("Preparing indicator data for Supabase...")
     
-    for date, row in df.iterrows():
-        date_str = date.strftime('%Y-%m-%d')  # Format date as YYYY-MM-DD
-        
-        # Create or update the data for this date
-        if date_str not in indicators_by_date:
-            indicators_by_date[date_str] = {
-                "date": date_str,
-                "data": {}
-            }
-        
-        # Add the indicator data
-        indicators_by_date[date_str]["data"].update({
-            "BTC": {
-                "price": float(row['BTC']),
-                "RSI": {
-                    "value": float(row['RSI']),
-                    "period": 14,
-                    "description": "Relative Strength Index",
-                    "interpretation": "Values above 70 indicate overbought, below 30 indicate oversold"
-                },
-                "Crowding": {
-                    "value": float(row['Signal']),
-                    "roc": float(row['ROC']),
-                    "zScore": float(row['zScore']),
-                    "window": 100,
-                    "roc_period": 90,
-                    "rsi_period": 14,
-                    "description": "Bitcoin Crowding Index combining RSI and price rate of change Z-score",
-                    "interpretation": "Positive values indicate crowded markets, negative values indicate uncrowded markets"
-                }
-            }
-        })
+    # One compact row per day (the static settings and texts are stored once, see upload_metadata)
+    records = build_records(df, crowding='Signal', z_score='zScore', since=since)
     
-    # Convert the dictionary to a list of records
-    records = list(indicators_by_date.values())
-    logger.info(f"Prepared {len(records)} indicator records")
+    logger.info(f"Prepared {len(records)} indicator records" + (f" from {since}" if since else ""))
     return records
 
 # Upload indicators to Supabase
@@ -239,22 +166,10 @@ def upload_indicators(supabase, indicators):
             logger.warning("Please run the better_indicators_table.sql script in your Supabase SQL editor")
             return
         
-        # Split into chunks to avoid hitting request size limits
-        chunk_size = 50  
-        for i in range(0, len(indicators), chunk_size):
-            chunk = indicators[i:i + chunk_size]
-            
-            logger.info(f"Uploading chunk {i//chunk_size + 1}/{(len(indicators) + chunk_size - 1)//chunk_size}...")
-            try:
-                # Use upsert with the date as the conflict key
-                result = supabase.table("indicators").upsert(
-                    chunk, 
-                    on_conflict="date"
-                ).execute()
-                logger.info(f"Uploaded chunk {i//chunk_size + 1}")
-            except Exception as e:
-                logger.error(f"Error uploading chunk: {e}")
-                logger.error(f"First record in chunk: {chunk[0]}")
+        # Size-batched, concurrent upsert of the name-less daily rows, one per date
+        stats = bulk_upsert(supabase, "indicators", indicators, on_conflict=DAILY_CONFLICT)
+        if stats['failed']:
+            logger.error(f"{stats['failed']} indicator rows could not be uploaded")
         
         logger.info(f"Successfully uploaded indicators to Supabase")
     except Exception as e:
@@ -262,17 +177,13 @@ def upload_indicators(supabase, indicators):
         raise
 
 # Main process function
-def process_crowding_indicator():
+def process_crowding_indicator(full_refresh=False):
     try:
         logger.info("Starting crowding indicator process...")
         
         # Load environment variables from .env.local
         load_env_from_dotenv()
         
-        # Load service account
-        logger.info("Loading service account...")
-        service_account = load_service_account("liquidity-435820-92a5f57b22d7.json")
-        
         # Initialize Supabase client
         logger.info("Initializing Supabase client...")
         supabase = get_supabase_client()
@@ -286,13 +197,15 @@ def process_crowding_indicator():
             logger.info("Calculating crowding indicator...")
             df = calculate_crowding_indicator(df)
             
-            # Prepare data for Supabase
-            indicators = prepare_indicators_data(df)
+            # Prepare data for Supabase (only from the last stored date, unless refreshing everything)
+            since = None if full_refresh else last_stored_date(supabase)
+            indicators = prepare_indicators_data(df, since=since)
             
             # Upload to Supabase
             if indicators:
                 logger.info("Uploading indicators to Supabase...")
                 upload_indicators(supabase, indicators)
+                upload_metadata(supabase)
                 return True
             else:
                 logger.warning("No indicators generated")
@@ -305,7 +218,10 @@ def process_crowding_indicator():
         return False
 
 if __name__ == "__main__":
-    success = process_crowding_indicator()
+    parser = argparse.ArgumentParser(description="Calculate the crowding indicator and upload it to Supabase")
+    parser.add_argument('--full-refresh', action='store_true', help="Re-upload every day, not just the new ones")
+    args = parser.parse_args()
+    success = process_crowding_indicator(full_refresh=args.full_refresh)
     if success:
         logger.info("Successfully processed and uploaded crowding indicator")
     else:
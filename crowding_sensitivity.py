@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime
+import numpy as np
+import plotly.graph_objects as go
+from indicators.supabase_client import get_supabase_client
+from indicators.rolling_stats import crowding_surface
+from indicators.figure_encoding import compact_figure
+from indicators.indicator_store import write_indicator
+from indicators_uploader import get_btc_price_data
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger("crowding_sensitivity")
+
+# Z-score windows explored by the sensitivity surface (the live index uses 100)
+WINDOWS = list(range(20, 301, 10))
+
+# Build the window x date heatmap
+def plot_surface(surface):
+    fig = go.Figure(go.Heatmap(
+        x=surface.columns,
+        y=surface.index,
+        z=np.round(surface.to_numpy(), 2),
+        colorscale='RdBu_r',
+        zmid=0,
+        colorbar=dict(title='Crowding'),
+        hovertemplate='Date: %{x|%Y-%m-%d}<br>Window: %{y}<br>Crowding: %{z:.1f}<extra></extra>'
+    ))
+    fig.update_layout(
+        title={'text': 'Crowding Index Window Sensitivity', 'x': 0.5, 'xanchor': 'center'},
+        xaxis=dict(tickformat='%b %Y'),
+        yaxis=dict(title='Z-score window (days)'),
+        height=600,
+    )
+    return fig
+
+# Main process function
+def process_crowding_sensitivity(supabase=None, prices=None, writer=None):
+    try:
+        supabase = supabase or get_supabase_client()
+        if prices is None:
+            df = get_btc_price_data(supabase)
+            if df is None or df.empty:
+                logger.error("No price data available")
+                return False
+            prices = df['BTC']
+
+        logger.info(f"Computing crowding surface for {len(WINDOWS)} windows...")
+        surface = crowding_surface(prices, WINDOWS).dropna(axis=1, how='all')
+        latest = surface.iloc[:, -1]
+
+        data = {
+            "indicator_name": "crowding_sensitivity",
+            "date": datetime.now().strftime('%Y-%m-%d'),
+            "plotly_json": compact_figure(plot_surface(surface)),
+            "latest_data": {
+                "timestamp": surface.columns[-1].strftime('%Y-%m-%d'),
+                "windows": WINDOWS,
+                "crowding": [None if np.isnan(v) else round(float(v), 4) for v in latest]
+            }
+        }
+        write_indicator(supabase, data, writer)
+        logger.info("✅ Crowding sensitivity surface saved")
+        return True
+    except Exception as e:
+        logger.error(f"Error in process_crowding_sensitivity: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = process_crowding_sensitivity()
+    exit(0 if success else 1)
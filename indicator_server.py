@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+"""
+Indicator server
+
+Serves the indicator classes over HTTP for the Next.js proxy routes in
+app/api/indicators/[name] (FLASK_SERVER, port 5000 by default):
+
+    GET /api/indicators/<name>          figure JSON + latest values
+    GET /api/indicators/<name>/plot     standalone HTML chart
+    GET /api/indicators/<name>/image    PNG (rendered by a kaleido worker pool)
+    GET /api/indicators/<name>/latest   latest values only (no figure is built)
+    POST /api/indicators/<name>/prerender   reload the inputs now and pre-render
+                                            the default images if they changed
+
+Query parameters are passed to the indicator's validate_params(), so period,
+theme and any technical overrides (e.g. rsiLength=12) work as what-ifs, and
+max_points=600 returns a downsampled figure.
+
+Loaded sheet data is kept in memory for INDICATOR_DATA_TTL seconds and every
+result is cached under (indicator, normalized params, data version), so a
+repeated or concurrent request is answered from memory and only a changed
+spreadsheet triggers a recompute. Requests that only pick a period and theme
+are all answered from one generate_variants() pass per data version. A
+background refresher re-checks the sheets every INDICATOR_REFRESH_INTERVAL
+seconds and, when a new version appears, pre-renders the default images so
+/image requests are served from the content-addressed image cache. The CI
+updaters also POST to /prerender right after committing a new figure
+(indicators/indicator_update.py), so the images don't wait for the next poll. The cache is per process: run gunicorn with
+one worker and several threads to share it, e.g.
+
+    gunicorn 'indicator_server:create_app()' --workers 1 --threads 8 --bind 0.0.0.0:5000
+"""
+
+import os
+import json
+import time
+import logging
+import importlib
+import threading
+from flask import Flask, Response, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from indicators.result_cache import ResultCache
+from indicators.figure_encoding import dumps
+from indicators.image_renderer import ImageRenderer
+from indicators.supabase_client import get_supabase_client
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("indicator_server")
+
+# Indicator name -> (module, class)
+INDICATORS = {
+    'funding': ('indicators.funding_indicator_ci', 'FundingIndicator'),
+    'avs': ('indicators.avs_indicator_ci', 'AVSIndicator'),
+}
+
+# Other names the frontend and the indicators table use
+ALIASES = {
+    'funding_rate': 'funding',
+    'funding-indicator': 'funding',
+    'avs-indicator': 'avs',
+    'avs_average': 'avs',
+}
+
+DATA_TTL = float(os.environ.get('INDICATOR_DATA_TTL', 300))
+RESULT_TTL = float(os.environ.get('INDICATOR_RESULT_TTL', 3600))
+CACHE_SIZE = int(os.environ.get('INDICATOR_CACHE_SIZE', 256))
+REFRESH_INTERVAL = float(os.environ.get('INDICATOR_REFRESH_INTERVAL', DATA_TTL))
+RENDER_WORKERS = int(os.environ.get('INDICATOR_RENDER_WORKERS', 2))
+
+# Default image size and the variants rendered ahead of time after each update
+IMAGE_SIZE = (1200, 700, 1)
+PRERENDER_VARIANTS = [
+    {'period': 'all', 'theme': 'light'},
+    {'period': 'all', 'theme': 'dark'},
+]
+
+# Normalized params served from generate_variants() instead of generate_data()
+VARIANT_PARAMS = {'period', 'theme'}
+
+# Params that only affect the figure, not the latest values
+FIGURE_PARAMS = {'period', 'theme', 'max_points'}
+
+PLOT_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.plot.ly/plotly-2.29.1.min.js"></script>
+<style>html, body, #chart {{ margin: 0; width: 100%; height: 100%; }}</style>
+</head>
+<body>
+<div id="chart"></div>
+<script>
+var figure = {figure};
+Plotly.newPlot('chart', figure.data, figure.layout, {{responsive: true}});
+</script>
+</body>
+</html>
+"""
+
+
+class UnknownIndicator(KeyError):
+    pass
+
+
+class InvalidParams(ValueError):
+    pass
+
+
+class IndicatorService:
+    """
+    Loads, computes and caches indicator results.
+
+    Args:
+        supabase: Supabase client handed to the indicator classes (created
+            on first use if omitted)
+        data_ttl (float): Seconds loaded inputs are reused before the sheet
+            version is checked again
+        result_ttl (float): Seconds a computed result is kept
+        cache_size (int): Maximum cached inputs + results
+        renderer (ImageRenderer): PNG renderer (a pooled, disk-cached one by default)
+    """
+
+    def __init__(self, supabase=None, data_ttl=DATA_TTL, result_ttl=RESULT_TTL, cache_size=CACHE_SIZE,
+                 renderer=None):
+        self.supabase = supabase
+        self.data_ttl = data_ttl
+        self.result_ttl = result_ttl
+        self.cache = ResultCache(maxsize=cache_size, ttl=result_ttl)
+        self.renderer = renderer or ImageRenderer(workers=RENDER_WORKERS)
+        self._indicators = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """Map a requested name to its registry key"""
+        key = ALIASES.get(name, name)
+        if key not in INDICATORS:
+            raise UnknownIndicator(name)
+        return key
+
+    def indicator(self, name):
+        """The (shared) indicator instance for a registry key"""
+        with self._lock:
+            if name not in self._indicators:
+                module_name, class_name = INDICATORS[name]
+                cls = getattr(importlib.import_module(module_name), class_name)
+                if self.supabase is None:
+                    self.supabase = get_supabase_client()
+                self._indicators[name] = cls(supabase=self.supabase)
+            return self._indicators[name]
+
+    def normalize_params(self, name, args):
+        """
+        Validate query parameters and reduce them to a canonical, hashable form.
+
+        Defaults are filled in and overrides equal to the default are dropped,
+        so ?rsiLength=9, ?rsiLength=9.0 and no parameter share one cache entry.
+
+        Returns:
+            tuple: Sorted (key, value) pairs
+        """
+        indicator = self.indicator(name)
+        params = indicator.validate_params(dict(args))
+        normalized = {
+            'period': params.get('period', 'all'),
+            'theme': params.get('theme', 'light'),
+        }
+        if 'max_points' in params:
+            normalized['max_points'] = params['max_points']
+        for key, default in indicator.default_params.items():
+            if key not in params:
+                continue
+            try:
+                value = int(float(params[key])) if isinstance(default, int) else float(params[key])
+            except (TypeError, ValueError):
+                raise InvalidParams(f"Invalid value for {key}: {params[key]!r}")
+            if value != default:
+                normalized[key] = value
+        return tuple(sorted(normalized.items()))
+
+    def inputs(self, name):
+        """
+        Loaded inputs for an indicator.
+
+        Returns:
+            tuple: (data version, data as returned by load_data())
+        """
+        def load():
+            indicator = self.indicator(name)
+            start = time.perf_counter()
+            data = indicator.load_data()
+            version = indicator.sheet_loader.version() or f"loaded-{time.time():.0f}"
+            logger.info(f"Loaded {name} inputs (version {version}) in {time.perf_counter() - start:.2f}s")
+            if self._versions.get(name) != version:
+                self._versions[name] = version
+                threading.Thread(target=self.prerender, args=(name,), daemon=True).start()
+            return version, data
+
+        return self.cache.get_or_compute(('inputs', name), load, ttl=self.data_ttl)
+
+    def result(self, name, params):
+        """
+        The generate_data() result for normalized params.
+
+        Returns:
+            tuple: (data version, result dict)
+        """
+        version, data = self.inputs(name)
+
+        def compute():
+            # Plain period/theme selections come from the shared variants pass
+            if set(dict(params)) <= VARIANT_PARAMS:
+                variants = self.variants(name, version, data)
+                figure = variants["variants"].get((dict(params)['period'], dict(params)['theme']))
+                if figure is not None:
+                    return {"plotly_json": dumps(figure), "figure": figure, "latest_data": variants["latest_data"]}
+            
+            start = time.perf_counter()
+            result = self.indicator(name).generate_data(dict(params), data=data)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            logger.info(f"Computed {name} {dict(params)} in {time.perf_counter() - start:.2f}s")
+            return result
+
+        return version, self.cache.get_or_compute(('result', name, params, version), compute)
+
+    def variants(self, name, version, data):
+        """Every period/theme figure for the default parameters, computed in one pass"""
+        def compute():
+            start = time.perf_counter()
+            result = self.indicator(name).generate_variants(data=data)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            logger.info(f"Computed {len(result['variants'])} {name} variants in {time.perf_counter() - start:.2f}s")
+            return result
+
+        return self.cache.get_or_compute(('variants', name, version), compute)
+
+    def latest(self, name, params):
+        """
+        The /latest response body, from the indicator's latest() fast path.
+
+        Period, theme and max_points only shape the figure, so requests that
+        differ only in those share one entry.
+
+        Returns:
+            tuple: (data version, body bytes)
+        """
+        version, data = self.inputs(name)
+        technical = tuple((key, value) for key, value in params if key not in FIGURE_PARAMS)
+
+        def compute():
+            start = time.perf_counter()
+            result = self.indicator(name).latest(dict(technical), data=data)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            logger.info(f"Computed latest {name} {dict(technical)} in {time.perf_counter() - start:.3f}s")
+            return latest_body(name, params)(result, version)
+
+        return version, self.cache.get_or_compute(('latest', name, technical, version), compute)
+
+    def derived(self, kind, name, params, build, *extra):
+        """
+        Cache an output built from a result (response body, HTML, PNG).
+
+        Args:
+            kind (str): Output type, part of the cache key
+            build (callable): Called as build(result, version)
+        """
+        version, result = self.result(name, params)
+        key = (kind, name, params, version) + extra
+        return version, self.cache.get_or_compute(key, lambda: build(result, version))
+
+    def image(self, name, params, width, height, scale):
+        """PNG for normalized params, via the memory cache, the image cache or a render"""
+        theme = dict(params)['theme']
+
+        def build(result, version):
+            return self.renderer.render(result["plotly_json"], width, height, scale, theme)
+
+        return self.derived('png', name, params, build, width, height, scale)
+
+    def refresh(self, name):
+        """Reload an indicator's inputs now; a new sheet version pre-renders its images"""
+        self.cache.invalidate(lambda key: key == ('inputs', name))
+        return self.inputs(name)[0]
+
+    def prerender(self, name):
+        """Render the default image variants for an indicator's current data"""
+        for variant in PRERENDER_VARIANTS:
+            try:
+                self.image(name, self.normalize_params(name, variant), *IMAGE_SIZE)
+            except Exception as e:
+                logger.warning(f"Pre-rendering {name} {variant} failed: {e}")
+        self.renderer.prune()
+
+    def start_refresher(self, interval=REFRESH_INTERVAL):
+        """Periodically reload inputs so new sheet versions are computed and rendered before they're requested"""
+        def loop():
+            try:
+                self.renderer.warm()
+            except Exception as e:
+                logger.warning(f"Image renderer warm-up failed: {e}")
+            while True:
+                for name in INDICATORS:
+                    try:
+                        self.inputs(name)
+                    except Exception as e:
+                        logger.warning(f"Refreshing {name} failed: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name='indicator-refresher', daemon=True).start()
+
+
+# Response builders
+
+def indicator_body(name, params):
+    def build(result, version):
+        # Splice the figure JSON in as-is instead of parsing and re-serializing it
+        meta = json.dumps({
+            "indicator": name,
+            "params": dict(params),
+            "data_version": version,
+            "latest_data": result["latest_data"],
+        })
+        return (meta[:-1] + ', "plotly_json": ' + result["plotly_json"] + '}').encode('utf-8')
+    return build
+
+
+def latest_body(name, params):
+    def build(result, version):
+        return json.dumps({
+            "indicator": name,
+            "data_version": version,
+            **result["latest_data"],
+        }).encode('utf-8')
+    return build
+
+
+def plot_html(name):
+    def build(result, version):
+        figure = result["plotly_json"].replace('</', '<\\/')
+        return PLOT_HTML.format(title=name, figure=figure).encode('utf-8')
+    return build
+
+
+def _int_arg(args, key, default, low, high):
+    try:
+        value = int(args.get(key, default))
+    except (TypeError, ValueError):
+        raise InvalidParams(f"Invalid value for {key}: {args.get(key)!r}")
+    return min(max(value, low), high)
+
+
+def create_app(service=None, refresh_interval=REFRESH_INTERVAL):
+    """
+    Build the Flask app around an IndicatorService.
+
+    Nothing is built at import time (the renderer workers import this module
+    too), so gunicorn calls the factory: indicator_server:create_app()
+    """
+    app = Flask(__name__)
+    service = service or IndicatorService()
+    app.config['INDICATOR_SERVICE'] = service
+    if refresh_interval:
+        service.start_refresher(refresh_interval)
+
+    def respond(name, kind, build_for, mimetype, extra=()):
+        key = service.resolve(name)
+        params = service.normalize_params(key, request.args)
+        version, body = service.derived(kind, key, params, build_for(key, params), *extra)
+        response = Response(body, mimetype=mimetype)
+        response.headers['X-Data-Version'] = str(version)
+        return response
+
+    @app.errorhandler(UnknownIndicator)
+    def unknown_indicator(e):
+        return jsonify({"error": f"Unknown indicator: {e.args[0]}", "available": sorted(INDICATORS)}), 404
+
+    @app.errorhandler(InvalidParams)
+    def invalid_params(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.errorhandler(Exception)
+    def server_error(e):
+        if isinstance(e, HTTPException):
+            return e
+        logger.error(f"Error serving {request.path}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/indicators')
+    def list_indicators():
+        return jsonify({"indicators": sorted(INDICATORS), "aliases": ALIASES})
+
+    @app.route('/api/indicators/<name>')
+    def indicator(name):
+        return respond(name, 'json', indicator_body, 'application/json')
+
+    @app.route('/api/indicators/<name>/latest')
+    def latest(name):
+        key = service.resolve(name)
+        params = service.normalize_params(key, request.args)
+        version, body = service.latest(key, params)
+        response = Response(body, mimetype='application/json')
+        response.headers['X-Data-Version'] = str(version)
+        return response
+
+    @app.route('/api/indicators/<name>/plot')
+    def plot(name):
+        return respond(name, 'html', lambda key, params: plot_html(key), 'text/html; charset=utf-8')
+
+    @app.route('/api/indicators/<name>/image')
+    def image(name):
+        default_width, default_height, default_scale = IMAGE_SIZE
+        width = _int_arg(request.args, 'width', default_width, 200, 4000)
+        height = _int_arg(request.args, 'height', default_height, 200, 4000)
+        scale = _int_arg(request.args, 'scale', default_scale, 1, 4)
+        key = service.resolve(name)
+        params = service.normalize_params(key, request.args)
+        version, png = service.image(key, params, width, height, scale)
+        response = Response(png, mimetype='image/png')
+        response.headers['X-Data-Version'] = str(version)
+        return response
+
+    @app.route('/api/indicators/<name>/prerender', methods=['POST'])
+    def prerender(name):
+        key = service.resolve(name)
+
+        def refresh():
+            try:
+                service.refresh(key)
+            except Exception as e:
+                logger.warning(f"Refreshing {key} failed: {e}")
+
+        threading.Thread(target=refresh, daemon=True).start()
+        return jsonify({"indicator": key, "status": "scheduled"}), 202
+
+    @app.route('/health')
+    def health():
+        return jsonify({"status": "ok", "cache": service.cache.stats(), "images": service.renderer.stats()})
+
+    return app
+
+
+if __name__ == "__main__":
+    app = create_app()
+    port = int(os.environ.get('PORT', 5000))
+    logger.info(f"Serving indicators on port {port}")
+    app.run(host='0.0.0.0', port=port, threaded=True)
@@ -7,32 +7,49 @@ It's specifically designed to run in GitHub Actions.
 
 import os
 import json
+import numpy as np
 import pandas as pd
 import re
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import gspread
-from google.oauth2 import service_account
 import logging
 from supabase import create_client
+from .downsample import build_pyramid
+from .figure_encoding import compact_figure, dumps
+from .sheets_loader import SheetLoader, pad_rows, quote_sheet_name
+from .variants import PERIODS, THEMES, apply_theme, data_end, period_slices, period_start, slice_from
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Zone names and fill colors, in threshold precedence order (rgba of the
+# previous darkred/red/darkgreen/green shapes at opacity 0.3)
+ZONE_COLORS = [
+    ('Strong Sell Zone', 'rgba(139, 0, 0, 0.3)'),
+    ('Sell Zone', 'rgba(255, 0, 0, 0.3)'),
+    ('Strong Buy Zone', 'rgba(0, 100, 0, 0.3)'),
+    ('Buy Zone', 'rgba(0, 128, 0, 0.3)'),
+]
+
+# Rows latest() loads; the signal only needs the last one
+LATEST_ROWS = 5
+
+# Decimals kept in the stored figure arrays (prices and AVS)
+FIGURE_DECIMALS = 2
+
 class AVSIndicator:
     """
     Simplified AVS Average Indicator for CI/CD
     """
     
-    def __init__(self):
-        """Initialize the AVS Indicator"""
+    def __init__(self, supabase=None):
+        """Initialize the AVS Indicator (optionally reusing a Supabase client)"""
         self.name = "avs-indicator"
         self.description = "Bitcoin buy/sell zones based on the AVS average"
         
         # Configuration
         self.creds_file = 'secret_key.json'
         self.spreadsheet_id = '1hqD9PV0FzSSn1VB_O8_HX575BmXZXQjEvokSEd5NxDI'
+        self.sheet_loader = SheetLoader(self.spreadsheet_id, self.creds_file)
         
         # Default parameters
         self.default_params = {
@@ -43,6 +60,10 @@ class AVSIndicator:
             'strong_sell_threshold': 0.95,  # Strong sell when AVS average is above this
         }
         
+        if supabase is not None:
+            self.supabase = supabase
+            return
+
         # Get Supabase client
         supabase_url = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
         supabase_key = os.environ.get("SUPABASE_KEY") or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
@@ -73,25 +94,25 @@ class AVSIndicator:
         
         self.supabase = create_client(supabase_url, supabase_key)
     
-    def generate_data(self, params=None):
+    def load_data(self, rows=None):
+        """Load the AVS worksheet (or only its last rows) from Google Sheets."""
+        return self.load_google_sheets_data('Complete AVS', rows=rows)
+    
+    def generate_data(self, params=None, data=None):
         """
         Generate data for the AVS indicator.
+
+        Pass the result of load_data() as data to reuse already loaded inputs.
+        With params['max_points'] set, plotly_json is a downsampled overview
+        and the result also carries full-resolution yearly 'tiles'. 'figure'
+        is the same compactly encoded figure as a dict, ready to store.
         """
         try:
-            # Merge default params with any custom params
             custom_params = self.validate_params(params or {})
-            chart_params = self.default_params.copy()
-            
-            # Process any overrides of technical parameters
-            for key, value in custom_params.items():
-                if key in chart_params:
-                    if isinstance(chart_params[key], int):
-                        chart_params[key] = int(value)
-                    elif isinstance(chart_params[key], float):
-                        chart_params[key] = float(value)
+            chart_params = self.merge_params(custom_params)
             
-            # Load data from Google Sheets
-            avs_data = self.load_google_sheets_data('Complete AVS')
+            # Load data from Google Sheets unless it was handed in
+            avs_data = self.load_data() if data is None else data
             
             # Filter by period if specified
             period = custom_params.get('period', None)
@@ -102,35 +123,119 @@ class AVSIndicator:
             theme = custom_params.get('theme', 'light')
             fig = self.plot_avs_chart(avs_data, chart_params, theme)
             
-            # Get the latest data for the response
-            latest_data = avs_data.iloc[-1]
-            
-            # Determine the current signal based on AVS average
-            avg_value = float(latest_data['Average'])
-            signal = "neutral"
-            if avg_value <= chart_params['strong_buy_threshold']:
-                signal = "strong_buy"
-            elif avg_value <= chart_params['buy_threshold']:
-                signal = "buy"
-            elif avg_value >= chart_params['strong_sell_threshold']:
-                signal = "strong_sell"
-            elif avg_value >= chart_params['sell_threshold']:
-                signal = "sell"
+            # Downsampled overview plus full-resolution yearly tiles
+            tiles = None
+            figure = fig
+            if custom_params.get('max_points'):
+                figure, tiles = build_pyramid(fig, custom_params['max_points'])
+            figure = compact_figure(figure, decimals=FIGURE_DECIMALS)
             
             # Return the results
-            return {
-                "plotly_json": fig.to_json(),
-                "latest_data": {
-                    "timestamp": avs_data.index[-1].strftime('%Y-%m-%d'),
-                    "price": float(latest_data['Price']),
-                    "avs_average": float(latest_data['Average']),
-                    "signal": signal
-                }
+            result = {
+                "plotly_json": dumps(figure),
+                "figure": figure,
+                "latest_data": self.latest_values(avs_data, chart_params)
             }
+            if tiles is not None:
+                result["tiles"] = tiles
+            return result
         except Exception as e:
             logger.exception("Error generating AVS indicator data")
             return {"error": str(e)}
     
+    def generate_variants(self, params=None, data=None, periods=PERIODS, themes=THEMES):
+        """
+        Generate the figure for every period/theme combination in one pass.
+
+        Each period is a slice of the loaded data and each theme an overlay
+        on one theme-neutral figure per period. params['max_points']
+        downsamples the 'all' figure and adds its yearly 'tiles'.
+
+        Returns:
+            dict: {'variants': {(period, theme): figure dict}, 'latest_data':
+                {...}, 'tiles': [...]} or {'error': ...}
+        """
+        try:
+            custom_params = self.validate_params(params or {})
+            chart_params = self.merge_params(custom_params)
+            avs_data = self.load_data() if data is None else data
+            
+            variants = {}
+            tiles = None
+            overlays = {theme: self.theme_overlay(theme) for theme in themes}
+            for period, period_data in period_slices(avs_data, periods).items():
+                if period_data.empty:
+                    logger.warning(f"No AVS data for period {period}")
+                    continue
+                figure = self.plot_base(period_data, chart_params)
+                if period == 'all' and custom_params.get('max_points'):
+                    figure, tiles = build_pyramid(figure, custom_params['max_points'])
+                figure = compact_figure(figure, decimals=FIGURE_DECIMALS)
+                for theme in themes:
+                    variants[(period, theme)] = apply_theme(figure, overlays[theme])
+            
+            result = {"variants": variants, "latest_data": self.latest_values(avs_data, chart_params)}
+            if tiles is not None:
+                result["tiles"] = tiles
+            return result
+        except Exception as e:
+            logger.exception("Error generating AVS indicator variants")
+            return {"error": str(e)}
+    
+    def latest(self, params=None, data=None):
+        """
+        Latest AVS values and signal only: the fast path for signal polling.
+
+        The signal depends on the last row alone, so only the last
+        LATEST_ROWS rows are loaded (or taken from the handed-in data) and
+        nothing is plotted.
+
+        Returns:
+            dict: {'latest_data': {...}} with the same fields as generate_data(),
+                or {'error': ...}
+        """
+        try:
+            chart_params = self.merge_params(self.validate_params(params or {}))
+            avs_data = self.load_data(rows=LATEST_ROWS) if data is None else data.iloc[-LATEST_ROWS:]
+            return {"latest_data": self.latest_values(avs_data, chart_params)}
+        except Exception as e:
+            logger.exception("Error computing latest AVS values")
+            return {"error": str(e)}
+    
+    def merge_params(self, custom_params):
+        """Default thresholds with validated overrides applied."""
+        chart_params = self.default_params.copy()
+        for key, value in custom_params.items():
+            if key in chart_params:
+                if isinstance(chart_params[key], int):
+                    chart_params[key] = int(value)
+                elif isinstance(chart_params[key], float):
+                    chart_params[key] = float(value)
+        return chart_params
+    
+    def latest_values(self, avs_data, chart_params):
+        """The latest AVS values and the current signal for the indicators table."""
+        latest_data = avs_data.iloc[-1]
+        
+        # Determine the current signal based on AVS average
+        avg_value = float(latest_data['Average'])
+        signal = "neutral"
+        if avg_value <= chart_params['strong_buy_threshold']:
+            signal = "strong_buy"
+        elif avg_value <= chart_params['buy_threshold']:
+            signal = "buy"
+        elif avg_value >= chart_params['strong_sell_threshold']:
+            signal = "strong_sell"
+        elif avg_value >= chart_params['sell_threshold']:
+            signal = "sell"
+        
+        return {
+            "timestamp": avs_data.index[-1].strftime('%Y-%m-%d'),
+            "price": float(latest_data['Price']),
+            "avs_average": float(latest_data['Average']),
+            "signal": signal
+        }
+    
     def validate_params(self, params):
         """Validate the parameters for the AVS indicator."""
         valid_params = {}
@@ -148,6 +253,15 @@ class AVSIndicator:
             if theme in ['light', 'dark']:
                 valid_params['theme'] = theme
         
+        # Downsampling of the stored figure (points per trace in the overview)
+        if 'max_points' in params:
+            try:
+                max_points = int(params['max_points'])
+            except (TypeError, ValueError):
+                max_points = 0
+            if max_points >= 100:
+                valid_params['max_points'] = max_points
+        
         # Add any technical parameter overrides
         for key, value in params.items():
             if key in self.default_params:
@@ -157,55 +271,27 @@ class AVSIndicator:
     
     def filter_by_period(self, data, period):
         """Filter data by the specified time period."""
-        from datetime import datetime, timedelta
-        
-        end_date = datetime.now()
-        
-        if period == '7d':
-            start_date = end_date - timedelta(days=7)
-        elif period == '14d':
-            start_date = end_date - timedelta(days=14)
-        elif period == '30d':
-            start_date = end_date - timedelta(days=30)
-        elif period == '90d':
-            start_date = end_date - timedelta(days=90)
-        elif period == '180d':
-            start_date = end_date - timedelta(days=180)
-        elif period == '1y':
-            start_date = end_date - timedelta(days=365)
-        else:  # 'all'
-            start_date = pd.Timestamp('2013-05-01')
-        
-        filtered_data = data[data.index >= start_date]
-        return filtered_data
+        start_date = period_start(period, data_end(data)) or pd.Timestamp('2013-05-01')
+        return slice_from(data, start_date)
     
-    def load_google_sheets_data(self, worksheet_name):
-        """Load data from Google Sheets."""
-        logger.info(f"Loading data from Google Sheets: {worksheet_name}")
-        
-        # Using gspread with ServiceAccountCredentials
-        scopes = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-        creds = service_account.Credentials.from_service_account_file(
-            self.creds_file, 
-            scopes=scopes
-        )
-        
-        # Use gspread client to access the data
-        gc = gspread.authorize(creds)
-        
-        # Open the spreadsheet and get the specified worksheet
-        spreadsheet = gc.open_by_key(self.spreadsheet_id)
-        worksheet = spreadsheet.worksheet(worksheet_name)
-        
-        # Get all values from worksheet
-        values = worksheet.get_all_values()
-        
-        if not values or len(values) <= 1:  # No data or only header row
+    def load_google_sheets_data(self, worksheet_name, rows=None):
+        """Load a whole worksheet (or its last rows) from Google Sheets (batched and cached)."""
+        range_name = quote_sheet_name(worksheet_name)
+        if rows:
+            values = self.sheet_loader.load_tail([range_name], rows)[range_name]
+        else:
+            values = self.sheet_loader.load([range_name])[range_name]
+        return self.values_to_frame(values)
+    
+    def values_to_frame(self, values):
+        """Convert raw AVS worksheet values into a numeric DataFrame indexed by date."""
+        header, rows = pad_rows(values)
+        if not rows:  # No data or only header row
             logger.warning("No data returned from Google Sheets")
             return pd.DataFrame()
 
         # Create DataFrame from the values
-        df = pd.DataFrame(values[1:], columns=values[0])  # Use the first row as headers
+        df = pd.DataFrame(rows, columns=header)  # Use the first row as headers
         
         # Process the data - date as index, convert numeric columns
         df.rename(columns={df.columns[0]: 'Date'}, inplace=True)  # Ensure first column is named 'Date'
@@ -223,22 +309,102 @@ class AVSIndicator:
         
         return df
     
-    def plot_avs_chart(self, data, params, theme='light'):
-        """Create a plot for the AVS indicator."""
-        # Set theme colors
+    def zone_polygons(self, data, params):
+        """
+        Outline of the colored AVS zones, one polygon set per zone color.
+        
+        Each colored day that follows a colored day covers [previous day, day]
+        from the lowest positive price up to the day's price. Consecutive days
+        of the same color are merged into one stepped polygon; polygons are
+        separated by gaps so every color is a single filled trace.
+        
+        Returns:
+            list: (name, fill color, x, y) per zone color that occurs
+        """
+        average = data['Average'].to_numpy(dtype=float)
+        price = data['Price'].to_numpy(dtype=float)
+        dates = data.index.to_numpy()
+        y0 = price[price > 0].min() if (price > 0).any() else np.nan
+        
+        # Zone per day (0 = none), with the same precedence as the thresholds
+        zone = np.select(
+            [average >= params['strong_sell_threshold'],
+             average >= params['sell_threshold'],
+             average <= params['strong_buy_threshold'],
+             average <= params['buy_threshold']],
+            [1, 2, 3, 4],
+            default=0
+        )
+        
+        # A day is drawn when it and the day before are both colored
+        drawn = np.zeros(len(zone), dtype=bool)
+        drawn[1:] = (zone[1:] > 0) & (zone[:-1] > 0) & np.isfinite(price[1:])
+        
+        polygons = []
+        for code, (name, color) in enumerate(ZONE_COLORS, start=1):
+            days = np.flatnonzero(drawn & (zone == code))
+            if not len(days):
+                continue
+            
+            # Run-length encode consecutive days into runs [start, end]
+            breaks = np.flatnonzero(np.diff(days) > 1)
+            starts = days[np.concatenate([[0], breaks + 1])]
+            ends = days[np.concatenate([breaks, [len(days) - 1]])]
+            
+            xs, ys = [], []
+            for start, end in zip(starts, ends):
+                steps = np.arange(start, end + 1)
+                # Stepped top edge: (day before, price), (day, price) per day, then a gap
+                xs.append(np.concatenate([dates[[start - 1]], np.column_stack([dates[steps - 1], dates[steps]]).ravel(),
+                                          dates[[end, start - 1]], [np.datetime64('NaT')]]))
+                ys.append(np.concatenate([[y0], np.repeat(price[steps], 2), [y0, y0, np.nan]]))
+            polygons.append((name, color, np.concatenate(xs)[:-1], np.concatenate(ys)[:-1]))
+        
+        return polygons
+    
+    def theme_overlay(self, theme='light'):
+        """Theme-dependent layout and trace properties, applied on top of plot_base()."""
         if theme == 'dark':
             bg_color = 'rgba(40, 40, 40, 1)'
             paper_bg = 'rgba(30, 30, 30, 1)'
-            grid_color = 'rgba(80, 80, 80, 0.3)'
             text_color = '#ffffff'
             price_line_color = '#ffffff'
         else:  # light theme
             bg_color = 'rgba(250, 250, 250, 0.85)'
             paper_bg = 'rgba(245, 245, 245, 1)'
-            grid_color = 'lightgrey'
             text_color = '#4B4B4B'
             price_line_color = 'black'
         
+        return {
+            'layout': {
+                'title': {'font': {'color': text_color}},
+                'plot_bgcolor': bg_color,
+                'paper_bgcolor': paper_bg,
+                'legend': {'font': {'color': text_color}},
+                'xaxis': {'tickfont': {'color': text_color}},
+                'yaxis': {'tickfont': {'color': text_color}},
+                'xaxis2': {'tickfont': {'color': text_color}},
+                'yaxis2': {'tickfont': {'color': text_color}},
+            },
+            # Price line
+            'traces': {0: {'line': {'color': price_line_color}}},
+        }
+    
+    def plot_avs_chart(self, data, params, theme='light'):
+        """Create a plot for the AVS indicator."""
+        fig = self.plot_base(data, params)
+        overlay = self.theme_overlay(theme)
+        fig.update_layout(overlay['layout'])
+        for index, props in overlay['traces'].items():
+            fig.data[index].update(props)
+        return fig
+    
+    def plot_base(self, data, params):
+        """Create the theme-neutral AVS plot (see theme_overlay())."""
+        # Imported here so latest() never loads plotly
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        
         # Create subplots: one for price, one for AVS average
         fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1)
         
@@ -248,7 +414,7 @@ class AVSIndicator:
                 x=data.index, 
                 y=data['Price'], 
                 name='Price', 
-                line=dict(color=price_line_color, width=2)
+                line=dict(width=2)
             ),
             row=1, col=1
         )
@@ -264,56 +430,22 @@ class AVSIndicator:
             row=2, col=1
         )
         
-        # Simplified shape logic for colored zones
-        min_positive_price = data[data['Price'] > 0]['Price'].min()
-        prev_index, prev_color = None, None
-        shapes = []
-
-        # Batch create shapes based on AVS average values
-        for index, row in data.iterrows():
-            color = None
-            if row['Average'] >= params['strong_sell_threshold']:
-                color = 'darkred'
-            elif row['Average'] >= params['sell_threshold']:
-                color = 'red'
-            elif row['Average'] <= params['strong_buy_threshold']:
-                color = 'darkgreen'
-            elif row['Average'] <= params['buy_threshold']:
-                color = 'green'
-
-            if prev_index and color:
-                shapes.append({
-                    'type': 'rect', 
-                    'x0': prev_index, 
-                    'x1': index,
-                    'y0': min_positive_price, 
-                    'y1': row['Price'],
-                    'xref': 'x', 
-                    'yref': 'y',
-                    'fillcolor': color, 
-                    'opacity': 0.3, 
-                    'line': {'width': 0}
-                })
-            if color:
-                prev_index, prev_color = index, color
-            else:
-                prev_index = None
-
-        # Add the last shape if needed
-        if prev_index:
-            last_row = data.iloc[-1]
-            shapes.append({
-                'type': 'rect', 
-                'x0': prev_index, 
-                'x1': data.index[-1],
-                'y0': min_positive_price, 
-                'y1': last_row['Price'],
-                'xref': 'x', 
-                'yref': 'y',
-                'fillcolor': prev_color, 
-                'opacity': 0.3, 
-                'line': {'width': 0}
-            })
+        # Colored zones: one filled trace per zone color instead of a shape per day
+        for name, color, x, y in self.zone_polygons(data, params):
+            fig.add_trace(
+                go.Scatter(
+                    x=x,
+                    y=y,
+                    name=name,
+                    mode='lines',
+                    fill='toself',
+                    fillcolor=color,
+                    line=dict(width=0),
+                    hoverinfo='skip',
+                    showlegend=False
+                ),
+                row=1, col=1
+            )
         
         # Update layout
         fig.update_layout(
@@ -323,40 +455,33 @@ class AVSIndicator:
                 'y': 0.95, 
                 'xanchor': 'center', 
                 'yanchor': 'top', 
-                'font': {'size': 24, 'color': text_color}
+                'font': {'size': 24}
             },
-            shapes=shapes,
             autosize=True,
             height=700,
             margin=dict(l=50, r=50, t=80, b=100),
-            plot_bgcolor=bg_color,
-            paper_bgcolor=paper_bg,
             legend=dict(
                 orientation='h',
                 yanchor='top',
                 xanchor='center',
                 y=1.02,
                 x=0.5,
-                font=dict(size=12, color=text_color)
+                font=dict(size=12)
             ),
             xaxis=dict(
                 showgrid=False,
-                tickfont=dict(color=text_color),
                 tickangle=30,
                 tickformat='%b %Y'
             ),
             yaxis=dict(
                 showgrid=False,
-                type="log",
-                tickfont=dict(color=text_color)
+                type="log"
             ),
             xaxis2=dict(
-                showgrid=False,
-                tickfont=dict(color=text_color)
+                showgrid=False
             ),
             yaxis2=dict(
                 showgrid=False,
-                tickfont=dict(color=text_color),
                 title="AVS Average"
             ),
         )
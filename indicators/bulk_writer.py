@@ -0,0 +1,255 @@
+"""
+Bulk Writer
+
+One shared path for large upserts into Supabase (price history, crowding rows,
+screener output, figure tiles and variants).
+
+- Rows are encoded once with the fast encoder from figure_encoding and packed
+  into batches by encoded size rather than a fixed row count, so a batch of
+  small daily rows and a batch of large figures both end up near
+  MAX_BATCH_BYTES.
+- Batches are posted straight to PostgREST over the Supabase client's own
+  HTTP session (one pooled connection per worker), gzip-compressed, with a
+  bounded number in flight at once. If the server doesn't accept compressed
+  bodies the writer falls back to plain ones for the rest of the run.
+- A failed batch is retried on its own with backoff; the others aren't resent.
+- merge() sends {date, prices} patches for the wide market tables to the
+  merge_market_rows() RPC, which merges them into the stored JSONB instead of
+  replacing it.
+- Every call logs rows/s for its table, and report() sums up the run.
+
+Clients without an HTTP session (tests, older supabase versions) are written
+through the regular table().upsert() calls with the same batching.
+"""
+
+import gzip
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .figure_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+# Target encoded size of one request body (before compression)
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+
+# PostgREST handles large bulk inserts fine; this only bounds memory per batch
+MAX_BATCH_ROWS = 5000
+
+# Batches in flight at once
+MAX_WORKERS = 4
+
+# Attempts per batch
+RETRIES = 3
+
+# JSONB merge upsert for the wide market tables (migrations/005_merge_market_rows.sql)
+MERGE_RPC = "merge_market_rows"
+
+
+def is_missing_rpc(error):
+    """Whether an RPC failed because the function doesn't exist (not yet migrated)"""
+    message = str(error)
+    return 'PGRST202' in message or '404' in message or 'Could not find' in message
+
+
+def rejects_compression(response):
+    """Whether a response refused a gzip body (415, or a 400 about its Content-Encoding)"""
+    if response.status_code == 415:
+        return True
+    return response.status_code == 400 and 'content-encoding' in (response.text or '').lower()
+
+
+def _session(supabase):
+    """The pooled HTTP session of the client's PostgREST API, or None"""
+    return getattr(getattr(supabase, 'postgrest', None), 'session', None)
+
+
+def pack_batches(encoded, max_bytes=MAX_BATCH_BYTES, max_rows=MAX_BATCH_ROWS):
+    """
+    Group encoded rows into batches of at most max_bytes / max_rows.
+
+    Args:
+        encoded (list): (row, encoded bytes) pairs
+
+    Returns:
+        list: Lists of (row, encoded bytes) pairs
+    """
+    batches, batch, size = [], [], 0
+    for item in encoded:
+        if batch and (size + len(item[1]) > max_bytes or len(batch) >= max_rows):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(item)
+        size += len(item[1]) + 1
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BulkWriter:
+    """
+    Concurrent, size-batched upserts.
+
+    Args:
+        supabase: Supabase client
+        max_batch_bytes (int): Target encoded size per request
+        max_batch_rows (int): Most rows per request
+        max_workers (int): Requests in flight at once
+        retries (int): Attempts per batch
+        compress (bool): gzip the request bodies
+    """
+
+    def __init__(self, supabase, max_batch_bytes=MAX_BATCH_BYTES, max_batch_rows=MAX_BATCH_ROWS,
+                 max_workers=MAX_WORKERS, retries=RETRIES, compress=True):
+        self.supabase = supabase
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_rows = max_batch_rows
+        self.max_workers = max_workers
+        self.retries = retries
+        self.compress = compress
+        self.totals = {}
+        self._missing_rpcs = set()
+        self._lock = threading.Lock()
+
+    def upsert(self, table, rows, on_conflict=None):
+        """
+        Upsert rows into a table.
+
+        Args:
+            table (str): Table name
+            rows (list): Row dicts
+            on_conflict (str): Conflict columns (the primary key if omitted)
+
+        Returns:
+            dict: {'rows', 'bytes', 'batches', 'failed', 'seconds'} where
+                failed is the number of rows that couldn't be written
+        """
+        return self._write(table, rows, lambda batch: self._send(table, batch, on_conflict))
+
+    def merge(self, table, rows, rpc=MERGE_RPC, fallback_upsert=False):
+        """
+        Merge {date, prices} patches into a wide market table (see
+        migrations/005_merge_market_rows.sql): only the symbols in each
+        patch are written.
+
+        Patches for the same date are combined first. Without the RPC
+        installed nothing is written, unless fallback_upsert is set (for
+        complete rows only: an upsert replaces each row's prices).
+
+        Returns:
+            dict: As for upsert()
+        """
+        merged = {}
+        for row in rows:
+            merged.setdefault(row['date'], {}).update(row['prices'])
+        patches = [{'date': date, 'prices': prices} for date, prices in merged.items() if prices]
+        return self._write(table, patches, lambda batch: self._send(table, batch, None, rpc=rpc, fallback=fallback_upsert))
+
+    def _write(self, table, rows, send):
+        """Batch rows by size, send the batches concurrently and record the stats"""
+        started = time.time()
+        stats = {'rows': 0, 'bytes': 0, 'batches': 0, 'failed': 0, 'seconds': 0.0}
+        if not rows:
+            return stats
+
+        # PostgREST takes the columns of a bulk request from its first row, so
+        # rows with different column sets go into different batches
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append((row, dumps(row).encode('utf-8')))
+        batches = [batch for group in groups.values()
+                   for batch in pack_batches(group, self.max_batch_bytes, self.max_batch_rows)]
+
+        if len(batches) == 1 or self.max_workers <= 1:
+            results = [send(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                results = list(executor.map(send, batches))
+
+        for batch, ok in zip(batches, results):
+            stats['batches'] += 1
+            stats['bytes'] += sum(len(item[1]) for item in batch)
+            stats['rows' if ok else 'failed'] += len(batch)
+        stats['seconds'] = time.time() - started
+
+        with self._lock:
+            total = self.totals.setdefault(table, {'rows': 0, 'bytes': 0, 'batches': 0, 'failed': 0, 'seconds': 0.0})
+            for key, value in stats.items():
+                total[key] += value
+
+        rate = stats['rows'] / stats['seconds'] if stats['seconds'] else 0
+        log = logger.error if stats['failed'] else logger.info
+        log(f"{table}: wrote {stats['rows']} rows ({stats['bytes'] / 1e6:.2f} MB) in {stats['batches']} batch(es), "
+            f"{stats['seconds']:.2f}s, {rate:.0f} rows/s" + (f", {stats['failed']} rows FAILED" if stats['failed'] else ""))
+        return stats
+
+    def _send(self, table, batch, on_conflict, rpc=None, fallback=True):
+        """Write one batch (as an upsert, or through a merge RPC), retrying it with backoff; True on success"""
+        for attempt in range(1, self.retries + 1):
+            try:
+                session = _session(self.supabase)
+                rows = [item[0] for item in batch]
+                body = b"[" + b",".join(item[1] for item in batch) + b"]"
+                if rpc and rpc in self._missing_rpcs and not fallback:
+                    return False
+                if rpc and rpc not in self._missing_rpcs:
+                    try:
+                        if session is None:
+                            self.supabase.rpc(rpc, {'p_table': table, 'p_rows': rows}).execute()
+                        else:
+                            self._post(session, f"rpc/{rpc}", b'{"p_table":' + dumps(table).encode('utf-8') +
+                                       b',"p_rows":' + body + b'}', None, prefer=None)
+                        return True
+                    except Exception as e:
+                        if not is_missing_rpc(e):
+                            raise
+                        logger.warning(f"{rpc}() not found ({e}), " + ("upserting whole rows; " if fallback else "nothing written; ") +
+                                       "run migrate.py to enable merges")
+                        self._missing_rpcs.add(rpc)
+                        if not fallback:
+                            return False
+                if session is None:
+                    query = self.supabase.table(table)
+                    query = query.upsert(rows, on_conflict=on_conflict) if on_conflict else query.upsert(rows)
+                    query.execute()
+                else:
+                    self._post(session, table, body, on_conflict)
+                return True
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"{table}: batch of {len(batch)} rows failed after {attempt} attempts: {e}")
+                    return False
+                logger.warning(f"{table}: batch of {len(batch)} rows failed ({e}), retrying")
+                time.sleep(0.5 * 2 ** (attempt - 1))
+
+    def _post(self, session, path, body, on_conflict, prefer='resolution=merge-duplicates,return=minimal'):
+        """POST a JSON body to PostgREST (a table upsert by default)"""
+        params = {'on_conflict': on_conflict} if on_conflict else {}
+        headers = {'Content-Type': 'application/json'}
+        if prefer:
+            headers['Prefer'] = prefer
+        if self.compress:
+            response = session.post(f"/{path}", params=params, content=gzip.compress(body, compresslevel=5),
+                                    headers={**headers, 'Content-Encoding': 'gzip'})
+            if not rejects_compression(response):
+                response.raise_for_status()
+                return
+            # Compressed bodies not accepted: send this one (and the rest) plain
+            logger.warning(f"{path}: compressed upload rejected ({response.status_code}), sending uncompressed")
+            self.compress = False
+        session.post(f"/{path}", params=params, content=body, headers=headers).raise_for_status()
+
+    def report(self):
+        """Log the totals of every table written"""
+        for table, total in self.totals.items():
+            rate = total['rows'] / total['seconds'] if total['seconds'] else 0
+            logger.info(f"{table}: {total['rows']} rows, {total['bytes'] / 1e6:.2f} MB, {total['batches']} batch(es), "
+                        f"{rate:.0f} rows/s" + (f", {total['failed']} failed" if total['failed'] else ""))
+        return self.totals
+
+
+def bulk_upsert(supabase, table, rows, on_conflict=None, **kwargs):
+    """Upsert rows with a one-off BulkWriter (see BulkWriter.upsert)"""
+    return BulkWriter(supabase, **kwargs).upsert(table, rows, on_conflict)
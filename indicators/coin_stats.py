@@ -0,0 +1,140 @@
+"""
+Coin Statistics
+
+Per-coin summary behind the dashboard's statistics cards (coin_stats, see
+migrations/007_coin_stats.sql): latest price, market cap and volume, their
+percentage change over each of the dashboard's ranges, all-time high and
+drawdown, and 30-day volatility.
+
+Computed by the ingest from the date x coin matrices it has just downloaded,
+in one vectorized pass per matrix, so the cards need one small read by symbol
+instead of every selected coin's full history.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+from .bulk_writer import BulkWriter
+from .screener import calculate_volatility
+
+logger = logging.getLogger(__name__)
+
+STATS_TABLE = "coin_stats"
+
+# The dashboard's range selector values; None is the whole history
+RANGES = {
+    '7d': pd.DateOffset(days=7),
+    '1m': pd.DateOffset(months=1),
+    '3m': pd.DateOffset(months=3),
+    '6m': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    'all': None,
+}
+
+VOLATILITY_WINDOW = 30
+
+
+def frame_matrix(frame):
+    """Date x coin float matrix from an ingest frame (optional 'Date' column)"""
+    if frame is None or frame.empty:
+        return pd.DataFrame()
+    if 'Date' in frame.columns:
+        frame = frame.set_index('Date')
+    matrix = frame.apply(pd.to_numeric, errors='coerce').astype(float)
+    matrix.index = pd.to_datetime(matrix.index)
+    return matrix[~matrix.index.duplicated(keep='last')].sort_index()
+
+
+def _value(x):
+    """Float for JSON, None for NaN/inf"""
+    return float(x) if np.isfinite(x) else None
+
+
+def range_changes(matrix):
+    """
+    Percentage change of every coin over each range, as the cards show it:
+    from the first value inside the range to the latest one.
+
+    Returns:
+        DataFrame: Coin x range changes in percent (NaN without data)
+    """
+    latest = matrix.ffill().to_numpy()[-1]
+    # First value on or after each row
+    following = matrix.bfill().to_numpy()
+    end = matrix.index[-1]
+
+    changes = {}
+    for name, offset in RANGES.items():
+        row = 0 if offset is None else matrix.index.searchsorted(end - offset)
+        first = following[min(row, len(matrix) - 1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes[name] = (latest / first - 1) * 100
+    return pd.DataFrame(changes, index=matrix.columns)
+
+
+def compute_coin_stats(prices, market_caps=None, volumes=None):
+    """
+    coin_stats rows for every coin with a price.
+
+    Args:
+        prices, market_caps, volumes (DataFrame): Date x coin matrices (the
+            ingest frames, with or without their 'Date' column)
+
+    Returns:
+        list: Row dicts for coin_stats
+    """
+    prices = frame_matrix(prices)
+    if prices.empty:
+        return []
+    others = {'market_cap': frame_matrix(market_caps), 'volume': frame_matrix(volumes)}
+
+    values = prices.to_numpy()
+    valid = np.isfinite(values)
+    last = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+    has_price = valid.any(axis=0)
+    cols = np.arange(values.shape[1])
+
+    ath_rows = np.argmax(np.where(valid, values, -np.inf), axis=0)
+    ath = values[ath_rows, cols]
+    price = values[last, cols]
+    volatility = calculate_volatility(prices, VOLATILITY_WINDOW).ffill().to_numpy()[-1]
+
+    changes = {'price': range_changes(prices)}
+    latest = {}
+    for name, matrix in others.items():
+        matrix = matrix.reindex(columns=prices.columns)
+        if matrix.empty:
+            latest[name] = pd.Series(np.nan, index=prices.columns)
+            continue
+        latest[name] = matrix.ffill().iloc[-1]
+        changes[name] = range_changes(matrix)
+
+    dates = prices.index.strftime('%Y-%m-%d')
+    rows = []
+    for j, symbol in enumerate(prices.columns):
+        if not has_price[j]:
+            continue
+        rows.append({
+            'symbol': symbol,
+            'date': dates[last[j]],
+            'price': _value(price[j]),
+            'market_cap': _value(latest['market_cap'].iloc[j]),
+            'volume': _value(latest['volume'].iloc[j]),
+            'changes': {kind: {r: _value(v) for r, v in frame.loc[symbol].items()}
+                        for kind, frame in changes.items()},
+            'ath': _value(ath[j]),
+            'ath_date': dates[ath_rows[j]],
+            'drawdown': _value(price[j] / ath[j] - 1),
+            'volatility_30d': _value(volatility[j]),
+        })
+    return rows
+
+
+def upload_coin_stats(supabase, rows):
+    """Upsert coin_stats rows (from compute_coin_stats); True on success"""
+    if not rows:
+        logger.warning("No coin stats to upload")
+        return False
+    stats = BulkWriter(supabase).upsert(STATS_TABLE, rows, on_conflict='symbol')
+    return not stats['failed']
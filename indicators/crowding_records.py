@@ -0,0 +1,100 @@
+"""
+Crowding Indicator Records
+
+Builds the daily BTC crowding rows of the indicators table (used by
+indicators_uploader.py and crowding_indicator_supabase.py).
+
+Each day's row carries only that day's numbers:
+
+    {"indicator_name": null, "date": "2024-01-01", "data": {"BTC": {"price": ..., "RSI": {"value": ...},
+     "Crowding": {"value": ..., "roc": ..., "zScore": ...}}}}
+
+The settings and texts that are the same every day (periods, window,
+descriptions) live in one row of indicator_metadata instead (see
+migrations/015_indicator_metadata.sql). Records are built from the column
+arrays in one pass, and normally only the days from the last stored date
+onwards are built and uploaded.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Upsert key of the daily rows: they have no indicator_name and one row per date
+# (see migrations/016_indicators_row_keys.sql)
+DAILY_CONFLICT = "indicator_name,date"
+
+METADATA_TABLE = "indicator_metadata"
+METADATA_NAME = "crowding"
+
+CROWDING_METADATA = {
+    "symbol": "BTC",
+    "RSI": {
+        "period": 14,
+        "description": "Relative Strength Index",
+        "interpretation": "Values above 70 indicate overbought, below 30 indicate oversold"
+    },
+    "Crowding": {
+        "window": 100,
+        "roc_period": 90,
+        "rsi_period": 14,
+        "description": "Bitcoin Crowding Index combining RSI and price rate of change Z-score",
+        "interpretation": "Positive values indicate crowded markets, negative values indicate uncrowded markets"
+    }
+}
+
+
+def _values(series):
+    """Column as a list of floats, with None for NaN/inf (not valid in JSON)"""
+    array = series.to_numpy(dtype=float)
+    return np.where(np.isfinite(array), array, None).tolist()
+
+
+def build_records(df, crowding='Crowding', z_score='Z_Score', since=None):
+    """
+    Daily indicators rows from a calculated indicator frame.
+
+    Args:
+        df (DataFrame): Date-indexed frame with BTC, RSI, ROC and the crowding
+            and Z-score columns
+        crowding, z_score (str): Names of the crowding and Z-score columns
+        since: Only build rows for this date and later (all rows if None)
+
+    Returns:
+        list: Row dicts for the indicators table
+    """
+    if df is None or df.empty:
+        return []
+    if since is not None:
+        df = df[df.index >= pd.Timestamp(since)]
+
+    columns = zip(df.index.strftime('%Y-%m-%d'), _values(df['BTC']), _values(df['RSI']),
+                  _values(df[crowding]), _values(df['ROC']), _values(df[z_score]))
+    return [
+        {"indicator_name": None, "date": date, "data": {"BTC": {
+            "price": price,
+            "RSI": {"value": rsi},
+            "Crowding": {"value": value, "roc": roc, "zScore": z},
+        }}}
+        for date, price, rsi, value, roc, z in columns
+    ]
+
+
+def last_stored_date(supabase):
+    """Latest date with a crowding row in the indicators table, or None"""
+    try:
+        rows = supabase.table("indicators").select("date").is_("indicator_name", "null") \
+            .not_.is_("data", "null").order("date", desc=True).limit(1).execute().data
+    except Exception as e:
+        logger.warning(f"Could not read the last stored crowding date: {e}")
+        return None
+    return rows[0]["date"] if rows else None
+
+
+def upload_metadata(supabase):
+    """Store the static settings and texts once"""
+    supabase.table(METADATA_TABLE).upsert(
+        {"name": METADATA_NAME, "metadata": CROWDING_METADATA}, on_conflict="name"
+    ).execute()
@@ -0,0 +1,135 @@
+"""
+Dashboard Snapshot
+
+One precomputed document with everything the dashboard's default view needs
+on first load (see migrations/008_dashboard_snapshot.sql):
+
+    {"version": ..., "generated_at": ...,
+     "default": {"coins": [...], "range": "3m", "start": ..., "end": ...},
+     "coins": [{"symbol": "BTC", "rank": 1}, ...],
+     "series": {"prices": [{"date": ..., "BTC": ...}, ...], "market-caps": [...], "volumes": [...]},
+     "stats": {"BTC": <coin_stats row>, ...}}
+
+The series have the same shape the market routes return, downsampled to at
+most MAX_POINTS points. The ingest builds it from the frames it already holds
+after each run and stores it in one row of dashboard_snapshots (served by
+/api/crypto/snapshot) and as a static JSON file. version is a hash of the
+content, so clients and caches can tell when it actually changed.
+"""
+
+import os
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .coin_stats import RANGES, frame_matrix
+from .figure_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLE = "dashboard_snapshots"
+SNAPSHOT_NAME = "default"
+SNAPSHOT_PATH = os.path.join('public', 'dashboard-snapshot.json')
+
+# What app/page.tsx shows before the user changes anything
+DEFAULT_COINS = ['BTC', 'ETH', 'SOL', 'BNB']
+DEFAULT_RANGE = '3m'
+
+# Most points per series
+MAX_POINTS = 366
+
+
+def _series(matrix, coins, start, max_points=MAX_POINTS):
+    """[{date, coin: value}] points of a few coins from start, evenly thinned to max_points (keeping the last)"""
+    if matrix.empty:
+        return []
+    frame = matrix.reindex(columns=coins)
+    frame = frame[frame.index >= start]
+    if len(frame) > max_points:
+        keep = np.unique(np.linspace(0, len(frame) - 1, max_points).round().astype(int))
+        frame = frame.iloc[keep]
+
+    dates = frame.index.strftime('%Y-%m-%d')
+    values = frame.to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    points = []
+    for i, date in enumerate(dates):
+        point = {'date': date}
+        point.update({coins[j]: float(values[i, j]) for j in np.flatnonzero(finite[i])})
+        points.append(point)
+    return points
+
+
+def build_snapshot(prices, market_caps, volumes, top_coins, stats_rows,
+                   coins=DEFAULT_COINS, range_name=DEFAULT_RANGE):
+    """
+    Build the snapshot document.
+
+    Args:
+        prices, market_caps, volumes (DataFrame): Ingest frames (date x coin)
+        top_coins (list): Current top coins in rank order ({"Symbol": ...} dicts)
+        stats_rows (list): coin_stats rows
+        coins (list): Coins of the default view
+        range_name (str): Range of the default view (a coin_stats.RANGES key)
+
+    Returns:
+        dict: The snapshot, or None without price data
+    """
+    matrices = {'prices': frame_matrix(prices), 'market-caps': frame_matrix(market_caps),
+                'volumes': frame_matrix(volumes)}
+    if matrices['prices'].empty:
+        return None
+
+    end = matrices['prices'].index[-1]
+    offset = RANGES[range_name]
+    start = matrices['prices'].index[0] if offset is None else end - offset
+
+    payload = {
+        'default': {'coins': list(coins), 'range': range_name,
+                    'start': start.strftime('%Y-%m-%d'), 'end': end.strftime('%Y-%m-%d')},
+        'coins': [{'symbol': coin['Symbol'], 'rank': rank} for rank, coin in enumerate(top_coins, 1)],
+        'series': {kind: _series(matrix, list(coins), start) for kind, matrix in matrices.items()},
+        'stats': {row['symbol']: row for row in stats_rows if row['symbol'] in coins},
+    }
+    version = hashlib.sha256(dumps(payload).encode('utf-8')).hexdigest()[:16]
+    return {'version': version, 'generated_at': datetime.now(timezone.utc).isoformat(), **payload}
+
+
+def publish_snapshot(supabase, snapshot, path=SNAPSHOT_PATH):
+    """
+    Store the snapshot row and write the static file.
+
+    Returns:
+        bool: True if both were written
+    """
+    if not snapshot:
+        logger.warning("No dashboard snapshot to publish")
+        return False
+
+    encoded = dumps(snapshot)
+    ok = True
+    try:
+        supabase.table(SNAPSHOT_TABLE).upsert({
+            'name': SNAPSHOT_NAME,
+            'version': snapshot['version'],
+            'payload': snapshot,
+            'updated_at': snapshot['generated_at'],
+        }, on_conflict='name').execute()
+    except Exception as e:
+        logger.error(f"Could not store the dashboard snapshot: {e}")
+        ok = False
+
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Written next to the target and renamed, so readers never see half a file
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(encoded)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        logger.error(f"Could not write {path}: {e}")
+        ok = False
+
+    logger.info(f"Dashboard snapshot {snapshot['version']} ({len(encoded) / 1024:.1f} KB)")
+    return ok
@@ -0,0 +1,314 @@
+"""
+Figure Downsampling
+
+Shrinks indicator figures before they are stored or served. A daily chart
+since 2013 has thousands of points per trace, far more than a chart a few
+hundred pixels wide can show.
+
+- Line traces are reduced with Largest-Triangle-Three-Buckets (LTTB), which
+  keeps the visual shape (peaks, troughs, trend changes). On date axes the
+  buckets are fixed calendar intervals, so appending a day only changes the
+  tail of the downsampled trace.
+- Bar traces keep the largest-magnitude bar in each bucket, so funding spikes
+  survive.
+- Marker traces (buy/sell signals) are never thinned, and the line points at
+  signal dates are always kept so markers still sit on the line.
+
+build_pyramid() returns a coarse figure for the full range plus one
+full-resolution tile per calendar year, which the frontend swaps in when the
+user zooms.
+"""
+
+import base64
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Points per trace in the coarse "all" view
+DEFAULT_MAX_POINTS = 600
+
+# Calendar bucket widths (days) used for date axes
+BUCKET_DAYS = (1, 2, 3, 4, 5, 7, 10, 14, 21, 28, 42, 56, 91, 182, 364)
+NS_PER_DAY = 86400 * 10**9
+
+# Per-point properties kept in step with x/y when points are dropped
+POINT_KEYS = ('x', 'y', 'text', 'hovertext', 'customdata')
+NESTED_POINT_KEYS = {'marker': ('color', 'size', 'symbol', 'opacity')}
+
+
+def _as_array(value):
+    """Trace data as a numpy array (decoding Plotly's base64 typed arrays)"""
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+        if 'shape' in value:
+            shape = value['shape']
+            if isinstance(shape, str):
+                shape = [int(s) for s in shape.split(',')]
+            array = array.reshape(shape)
+        return array
+    return np.asarray(value)
+
+
+def _x_numeric(x):
+    """x values as floats (nanoseconds for dates) for area and range calculations"""
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(float)
+    return pd.to_datetime(x).to_numpy('datetime64[ns]').astype('int64').astype(float)
+
+
+def lttb_indices(x, y, threshold=None, keep=None, groups=None):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Args:
+        x, y (np.ndarray): Numeric coordinates
+        threshold (int): Target number of points (equal-count buckets)
+        keep (np.ndarray): Optional indices that must survive (e.g. signal dates)
+        groups (np.ndarray): Optional bucket id per point instead of threshold,
+            e.g. from calendar_buckets()
+
+    Returns:
+        np.ndarray: Sorted indices into x/y
+    """
+    n = len(y)
+    finite = np.flatnonzero(np.isfinite(y))
+    m = len(finite)
+    if groups is not None:
+        edges = np.concatenate([[1], np.flatnonzero(np.diff(groups[finite][1:m - 1])) + 2, [m - 1]]) if m > 2 else None
+    elif threshold is not None and 3 <= threshold < m:
+        edges = np.unique(np.linspace(1, m - 1, threshold - 1).astype(int))
+    else:
+        edges = None
+
+    if edges is None or len(edges) < 2:
+        selected = finite
+    else:
+        fx, fy = x[finite], y[finite]
+        selected = [0]
+        a = 0
+        buckets = len(edges) - 1
+        for i in range(buckets):
+            start, end = edges[i], edges[i + 1]
+            if end <= start:
+                continue
+            # Average of the next bucket (or the last point)
+            next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 1 < buckets else (m - 1, m)
+            avg_x, avg_y = fx[next_start:next_end].mean(), fy[next_start:next_end].mean()
+            area = np.abs((fx[a] - avg_x) * (fy[start:end] - fy[a]) - (fx[a] - fx[start:end]) * (avg_y - fy[a]))
+            a = start + int(np.argmax(area))
+            selected.append(a)
+        selected.append(m - 1)
+        selected = finite[np.array(selected)]
+
+    if keep is not None and len(keep):
+        selected = np.union1d(selected, keep[(keep >= 0) & (keep < n)])
+    return np.unique(selected)
+
+
+def bucket_indices(y, threshold=None, groups=None):
+    """
+    Indices of the largest-magnitude value in each bucket.
+
+    Args:
+        y (np.ndarray): Values
+        threshold (int): Number of equal-count buckets
+        groups (np.ndarray): Optional bucket id per point instead of threshold
+
+    Returns:
+        np.ndarray: Sorted indices into y
+    """
+    n = len(y)
+    if groups is not None:
+        edges = np.concatenate([[0], np.flatnonzero(np.diff(groups)) + 1, [n]])
+    elif threshold is not None and threshold < n:
+        edges = np.linspace(0, n, threshold + 1).astype(int)
+    else:
+        return np.arange(n)
+    magnitude = np.nan_to_num(np.abs(y.astype(float)), nan=-1.0)
+    return np.array([start + int(np.argmax(magnitude[start:end]))
+                     for start, end in zip(edges[:-1], edges[1:]) if end > start], dtype=int)
+
+
+def bucket_days(span_days, max_points):
+    """Smallest calendar bucket width (in days) that fits span_days into max_points"""
+    for days in BUCKET_DAYS:
+        if span_days / days <= max_points:
+            return days
+    return int(np.ceil(span_days / max_points))
+
+
+def calendar_buckets(x, days):
+    """
+    Bucket id per point for fixed-width calendar buckets anchored at the epoch.
+
+    Unlike equal-count buckets, these don't move when points are appended, so
+    a new day only changes the last bucket or two of a downsampled trace.
+    """
+    return np.floor(x / (days * NS_PER_DAY)).astype(np.int64)
+
+
+def _take(trace, index, n):
+    """Copy of a trace with every per-point array reduced to index"""
+    reduced = dict(trace)
+    for key in POINT_KEYS:
+        if key in trace and not isinstance(trace[key], str):
+            values = _as_array(trace[key])
+            if values.ndim and len(values) == n:
+                reduced[key] = values[index]
+    for parent, keys in NESTED_POINT_KEYS.items():
+        if isinstance(trace.get(parent), dict):
+            nested = dict(trace[parent])
+            for key in keys:
+                if key in nested and not isinstance(nested[key], str):
+                    values = _as_array(nested[key])
+                    if values.ndim and len(values) == n:
+                        nested[key] = values[index]
+            reduced[parent] = nested
+    return reduced
+
+
+def _trace_kind(trace):
+    trace_type = trace.get('type', 'scatter')
+    if trace.get('fill') == 'toself':
+        # Filled outlines (e.g. AVS zones) are polygons, not series
+        return 'other'
+    if trace_type == 'bar':
+        return 'bar'
+    if trace_type in ('scatter', 'scattergl'):
+        mode = trace.get('mode', 'lines')
+        if 'markers' in mode and 'lines' not in mode:
+            return 'markers'
+        return 'line'
+    return 'other'
+
+
+def downsample_figure(figure, max_points=DEFAULT_MAX_POINTS, x_range=None):
+    """
+    Downsample every trace of a figure.
+
+    Args:
+        figure (dict): Figure dict (fig.to_plotly_json() or parsed JSON)
+        max_points (int): Target points per line/bar trace (None keeps all)
+        x_range (tuple): Optional (start, end) dates to cut every trace to
+            first, end exclusive
+
+    Returns:
+        dict: A new figure dict with the same layout
+    """
+    traces = figure.get('data', [])
+    if x_range is not None:
+        lo, hi = _x_numeric(np.asarray(pd.to_datetime(list(x_range))))
+
+    # Signal dates every line must keep
+    signal_x = [_x_numeric(_as_array(t['x'])) for t in traces
+                if _trace_kind(t) == 'markers' and t.get('x') is not None and len(_as_array(t['x']))]
+    signal_x = np.unique(np.concatenate(signal_x)) if signal_x else np.array([])
+
+    # Date axes use calendar buckets sized from the overall span
+    days = None
+    if max_points:
+        xs = [_as_array(t['x']) for t in traces if _trace_kind(t) in ('line', 'bar') and t.get('x') is not None]
+        xs = [x for x in xs if len(x) and not np.issubdtype(x.dtype, np.number)]
+        if xs:
+            span = [_x_numeric(x) for x in xs]
+            span_days = (max(v.max() for v in span) - min(v.min() for v in span)) / NS_PER_DAY
+            days = bucket_days(span_days, max_points)
+
+    data = []
+    for trace in traces:
+        kind = _trace_kind(trace)
+        if kind == 'other' or trace.get('x') is None or trace.get('y') is None:
+            data.append(trace)
+            continue
+
+        x = _x_numeric(_as_array(trace['x']))
+        y = _as_array(trace['y']).astype(float)
+        n = len(x)
+        index = np.arange(n)
+        if x_range is not None:
+            index = index[(x >= lo) & (x < hi)]
+
+        if max_points and kind != 'markers' and len(index) > max_points:
+            dates = not np.issubdtype(_as_array(trace['x']).dtype, np.number)
+            groups = calendar_buckets(x[index], days) if dates and days else None
+            threshold = None if groups is not None else max_points
+            if kind == 'bar':
+                index = index[bucket_indices(y[index], threshold, groups=groups)]
+            else:
+                keep = np.flatnonzero(np.isin(x[index], signal_x))
+                index = index[lttb_indices(x[index], y[index], threshold, keep=keep, groups=groups)]
+
+        data.append(_take(trace, index, n))
+
+    return {'data': data, 'layout': figure.get('layout', {})}
+
+
+def _jsonable(values):
+    """A numpy array as a JSON-ready list (dates as ISO strings, NaN as null)"""
+    if values.ndim > 1:
+        return [_jsonable(row) for row in values]
+    if np.issubdtype(values.dtype, np.datetime64):
+        return pd.DatetimeIndex(values).strftime('%Y-%m-%d').tolist()
+    if np.issubdtype(values.dtype, np.floating):
+        # Six significant digits are plenty for a chart
+        return [None if not np.isfinite(v) else float(f"{v:.6g}") for v in values.tolist()]
+    return values.tolist()
+
+
+def _tile_traces(figure):
+    """Only the per-point arrays of each trace, for a tile payload"""
+    traces = []
+    for trace in figure['data']:
+        tile = {}
+        if _trace_kind(trace) == 'other':
+            traces.append(tile)
+            continue
+        for key in POINT_KEYS:
+            if isinstance(trace.get(key), np.ndarray):
+                tile[key] = _jsonable(trace[key])
+        for parent, keys in NESTED_POINT_KEYS.items():
+            nested = {key: _jsonable(value) for key, value in (trace.get(parent) or {}).items()
+                      if key in keys and isinstance(value, np.ndarray)}
+            if nested:
+                tile[parent] = nested
+        traces.append(tile)
+    return traces
+
+
+def build_pyramid(fig, max_points=DEFAULT_MAX_POINTS):
+    """
+    Build the coarse overview figure and the yearly full-resolution tiles.
+
+    Args:
+        fig: plotly Figure (or figure dict)
+        max_points (int): Points per trace in the overview
+
+    Returns:
+        tuple: (overview figure dict, list of tiles). Each tile is
+            {'level': 1, 'tile': year, 'x0': 'YYYY-01-01', 'x1': next year,
+             'traces': [per-trace point arrays, in figure trace order]}
+    """
+    figure = fig.to_plotly_json() if hasattr(fig, 'to_plotly_json') else fig
+    overview = downsample_figure(figure, max_points)
+
+    xs = [_as_array(t['x']) for t in figure.get('data', []) if _trace_kind(t) in ('line', 'bar') and t.get('x') is not None]
+    xs = [x for x in xs if len(x) and not np.issubdtype(x.dtype, np.number)]
+    if not xs:
+        return overview, []
+
+    dates = pd.to_datetime(np.concatenate(xs))
+    tiles = []
+    for year in range(dates.min().year, dates.max().year + 1):
+        x0, x1 = f"{year}-01-01", f"{year + 1}-01-01"
+        tile = downsample_figure(figure, max_points=None, x_range=(x0, x1))
+        tiles.append({'level': 1, 'tile': year, 'x0': x0, 'x1': x1, 'traces': _tile_traces(tile)})
+
+    logger.info(f"Built overview ({max_points} points/trace) and {len(tiles)} yearly tiles")
+    return overview, tiles
+
+
+def tile_rows(indicator_name, tiles):
+    """Rows for the indicator_tiles table"""
+    return [{'indicator_name': indicator_name, **tile} for tile in tiles]
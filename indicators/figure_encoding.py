@@ -0,0 +1,160 @@
+"""
+Compact Figure Encoding
+
+Serializes Plotly figures for storage in the indicators table and for the
+indicator server, in one pass and without a to_json()/json.loads() round trip.
+
+- Numeric arrays become Plotly's base64 typed arrays ({"dtype": "f4",
+  "bdata": ...}), which plotly.js >= 2.28 decodes natively. float32 keeps ~7
+  significant digits, more than a chart can show, at half the bytes of f8 and a
+  fraction of a decimal JSON list.
+- Daily date arrays are written as plain 'YYYY-MM-DD' strings.
+- orjson is used when installed, with the standard json module as fallback.
+"""
+
+import json
+import base64
+import datetime
+import logging
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+from .downsample import _as_array
+
+logger = logging.getLogger(__name__)
+
+# Shorter numeric lists aren't worth encoding
+MIN_TYPED_ARRAY_LENGTH = 8
+
+
+def _default(value):
+    """JSON fallback for values the encoders don't handle natively"""
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return value.total_seconds() * 1000
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialize to a JSON string (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(obj, default=_default, separators=(',', ':'))
+
+
+def encode_array(values, decimals=None, float32=True):
+    """
+    Encode one data array compactly.
+
+    Args:
+        values: numpy array, list, pandas object or base64 typed array
+        decimals (int): Optional rounding applied before encoding
+        float32 (bool): Store floats as f4 instead of f8
+
+    Returns:
+        dict or list: A typed array for numeric data, a list otherwise
+    """
+    array = _as_array(values)
+
+    if np.issubdtype(array.dtype, np.datetime64):
+        index = pd.DatetimeIndex(array)
+        valid = index[index.notna()]
+        daily = len(valid) and (valid == valid.normalize()).all()
+        # Missing dates (gaps between polygons) become null
+        return [None if pd.isna(v) else v for v in index.strftime('%Y-%m-%d' if daily else '%Y-%m-%dT%H:%M:%S').tolist()]
+
+    if array.dtype == bool or not np.issubdtype(array.dtype, np.number) or len(array) < MIN_TYPED_ARRAY_LENGTH:
+        if np.issubdtype(array.dtype, np.floating):
+            return [None if not np.isfinite(v) else v for v in array.tolist()]
+        return array.tolist()
+
+    if np.issubdtype(array.dtype, np.floating):
+        if decimals is not None:
+            array = np.round(array, decimals)
+        dtype = '<f4' if float32 else '<f8'
+    elif array.min(initial=0) >= np.iinfo(np.int32).min and array.max(initial=0) <= np.iinfo(np.int32).max:
+        dtype = '<i4'
+    else:
+        dtype = '<f8'
+
+    encoded = {'dtype': dtype[1:], 'bdata': base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')}
+    if array.ndim > 1:
+        encoded['shape'] = ','.join(str(n) for n in array.shape)
+    return encoded
+
+
+def _is_array(value):
+    if isinstance(value, dict):
+        return 'bdata' in value
+    if isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+        return True
+    return isinstance(value, (list, tuple)) and len(value) >= MIN_TYPED_ARRAY_LENGTH and \
+        all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)
+
+
+def _plain(value):
+    """Plain Python/JSON types throughout (numpy scalars, timestamps), so stored and fresh figures compare equal"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _plain(value.tolist())
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _compact(value, decimals):
+    if _is_array(value):
+        return encode_array(value, decimals)
+    if isinstance(value, dict):
+        return {k: _compact(v, decimals) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(v, decimals) for v in value]
+    return _plain(value)
+
+
+def decode_arrays(value):
+    """
+    The same figure data with every typed array decoded back into a plain
+    list, for consumers that don't understand {'dtype', 'bdata'} (plotly.py
+    before 6, which silently drops them with skip_invalid).
+    """
+    if _is_array(value) and isinstance(value, dict):
+        return _plain(_as_array(value))
+    if isinstance(value, dict):
+        return {k: decode_arrays(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_arrays(v) for v in value]
+    return value
+
+
+def compact_figure(fig, decimals=None):
+    """
+    A JSON-ready figure dict with every data array compactly encoded.
+
+    Args:
+        fig: plotly Figure or figure dict (e.g. a downsampled overview)
+        decimals (int): Optional rounding for float arrays
+
+    Returns:
+        dict: {'data': [...], 'layout': {...}}
+    """
+    figure = fig.to_plotly_json() if hasattr(fig, 'to_plotly_json') else fig
+    return {
+        'data': [_compact(trace, decimals) for trace in figure.get('data', [])],
+        'layout': _plain(figure.get('layout', {})),
+    }
@@ -0,0 +1,263 @@
+"""
+Figure Patches
+
+Stores an indicator figure as a base plus small append patches, instead of
+rewriting the whole plotly_json every day.
+
+A daily update normally only appends a point to each trace (and moves the
+x-axis range), so diff_figures() records, for every data array that changed,
+where it first differs from the previous figure and the new values from there
+on. Patches carry sequence numbers and are kept in indicator_figure_patches;
+the base lives in the indicators row with the sequence number it includes
+(figure_seq). Every COMPACT_EVERY patches, or whenever the change isn't a
+tail change (history edited, traces added, parameters changed), a fresh base
+is written and the old patches are dropped. A patch is queued on the
+IndicatorWriter and committed in the same call as its indicators row.
+
+reassemble() rebuilds the current figure; lib/figurePatches.ts does the same
+in the browser.
+"""
+
+import copy
+import base64
+import logging
+import numpy as np
+
+from .downsample import POINT_KEYS, NESTED_POINT_KEYS, _as_array
+from .figure_encoding import dumps
+from .indicator_store import PATCH_TABLE, IndicatorWriter
+
+logger = logging.getLogger(__name__)
+
+# Write a fresh base after this many patches
+COMPACT_EVERY = 30
+
+# A change reaching further back than this many points is treated as a rewrite
+MAX_CHANGED_POINTS = 64
+
+
+def _array_paths(trace):
+    """(path, value) for every per-point array in a trace"""
+    for key in POINT_KEYS:
+        value = trace.get(key)
+        if isinstance(value, (list, dict)) and (not isinstance(value, dict) or 'bdata' in value):
+            yield (key,), value
+    for parent, keys in NESTED_POINT_KEYS.items():
+        nested = trace.get(parent)
+        if isinstance(nested, dict):
+            for key in keys:
+                value = nested.get(key)
+                if isinstance(value, (list, dict)) and (not isinstance(value, dict) or 'bdata' in value):
+                    yield (parent, key), value
+
+
+def _without_arrays(trace):
+    """A trace with its per-point arrays removed, for comparing everything else"""
+    stripped = dict(trace)
+    for path, _ in _array_paths(trace):
+        if len(path) == 1:
+            stripped.pop(path[0], None)
+        else:
+            stripped[path[0]] = {k: v for k, v in stripped[path[0]].items() if k != path[1]}
+    return stripped
+
+
+def _get(trace, path):
+    for key in path:
+        if not isinstance(trace, dict):
+            return None
+        trace = trace.get(key)
+    return trace
+
+
+def _set(trace, path, value):
+    for key in path[:-1]:
+        trace[key] = dict(trace.get(key) or {})
+        trace = trace[key]
+    trace[path[-1]] = value
+
+
+def _values(value):
+    """Array values for comparison: numpy for typed arrays, a list otherwise"""
+    return _as_array(value) if isinstance(value, dict) else list(value)
+
+
+def _common_prefix(old, new):
+    """Number of leading elements old and new share"""
+    n = min(len(old), len(new))
+    if isinstance(old, np.ndarray) and isinstance(new, np.ndarray):
+        a, b = old[:n], new[:n]
+        same = a == b
+        if np.issubdtype(a.dtype, np.floating) and np.issubdtype(b.dtype, np.floating):
+            same |= np.isnan(a) & np.isnan(b)
+        mismatch = np.flatnonzero(~same)
+        return int(mismatch[0]) if len(mismatch) else n
+    for i in range(n):
+        if old[i] != new[i]:
+            return i
+    return n
+
+
+def _slice(value, start):
+    """Elements from start onwards, in the same encoding"""
+    if isinstance(value, dict):
+        array = _as_array(value)[start:]
+        return {'dtype': value['dtype'], 'bdata': base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')}
+    return list(value[start:])
+
+
+def _splice(value, start, tail):
+    """value[:start] + tail, in value's encoding"""
+    if isinstance(value, dict):
+        dtype = value['dtype']
+        array = np.concatenate([_as_array(value)[:start], _as_array(tail).astype(dtype)])
+        return {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')}
+    return list(value[:start]) + list(tail)
+
+
+def diff_figures(old, new, max_changed=MAX_CHANGED_POINTS):
+    """
+    Describe new as a tail patch on old.
+
+    Args:
+        old, new (dict): Compactly encoded figure dicts
+        max_changed (int): Largest number of trailing points a trace may
+            change or lose
+
+    Returns:
+        dict: {'traces': [{'trace', 'path', 'start', 'values'}], 'layout':
+            {changed top-level keys}}, or None if new isn't a tail change of old
+    """
+    old_traces, new_traces = old.get('data', []), new.get('data', [])
+    if len(old_traces) != len(new_traces):
+        return None
+
+    changes = []
+    for i, (old_trace, new_trace) in enumerate(zip(old_traces, new_traces)):
+        if _without_arrays(old_trace) != _without_arrays(new_trace):
+            return None
+        old_paths = {path for path, _ in _array_paths(old_trace)}
+        new_arrays = dict(_array_paths(new_trace))
+        if old_paths != set(new_arrays):
+            return None
+
+        for path, new_value in new_arrays.items():
+            old_value = _get(old_trace, path)
+            if isinstance(old_value, dict) != isinstance(new_value, dict) or \
+                    (isinstance(new_value, dict) and old_value['dtype'] != new_value['dtype']):
+                return None
+            old_values, new_values = _values(old_value), _values(new_value)
+            start = _common_prefix(old_values, new_values)
+            if start == len(old_values) == len(new_values):
+                continue
+            if len(old_values) - start > max_changed:
+                return None
+            changes.append({'trace': i, 'path': '.'.join(path), 'start': start, 'values': _slice(new_value, start)})
+
+    old_layout, new_layout = old.get('layout', {}), new.get('layout', {})
+    layout = {key: new_layout.get(key) for key in set(old_layout) | set(new_layout)
+              if old_layout.get(key) != new_layout.get(key)}
+
+    return {'traces': changes, 'layout': layout}
+
+
+def apply_patch(figure, patch):
+    """Return a new figure with a patch applied"""
+    data = list(figure.get('data', []))
+    for change in patch.get('traces', []):
+        i, path = change['trace'], tuple(change['path'].split('.'))
+        trace = copy.copy(data[i])
+        _set(trace, path, _splice(_get(trace, path), change['start'], change['values']))
+        data[i] = trace
+
+    layout = dict(figure.get('layout', {}))
+    for key, value in patch.get('layout', {}).items():
+        if value is None:
+            layout.pop(key, None)
+        else:
+            layout[key] = value
+    return {**figure, 'data': data, 'layout': layout}
+
+
+def reassemble(base, patches):
+    """Apply patches (in sequence order) to a base figure"""
+    figure = base
+    for patch in patches:
+        figure = apply_patch(figure, patch)
+    return figure
+
+
+def patched_since(patch, figure):
+    """Earliest x value (in figure, the patched result) touched by a patch, or None"""
+    starts = []
+    for change in patch.get('traces', []):
+        x = figure['data'][change['trace']].get('x')
+        if x is not None and change['start'] < len(_values(x)):
+            starts.append(str(_values(x)[change['start']]))
+    return min(starts) if starts else None
+
+
+def save_figure(supabase, row, compact_every=COMPACT_EVERY, writer=None):
+    """
+    Store an indicators row, writing only a patch when the figure allows it.
+
+    Args:
+        supabase: Supabase client
+        row (dict): indicators row with indicator_name, date, plotly_json
+            (compactly encoded figure dict) and latest_data
+        compact_every (int): Patches allowed before a fresh base is written
+        writer (IndicatorWriter): Queue the indicators row (and the patch)
+            here instead of committing them right away
+
+    Returns:
+        dict: {'mode': 'base'|'patch'|'unchanged', 'seq': int, 'bytes': int,
+            'since': earliest changed x or None (everything for a base),
+            'version': committed row version (None when queued)}
+    """
+    name = row["indicator_name"]
+    figure = row["plotly_json"]
+
+    current = supabase.table("indicators").select("plotly_json, figure_seq") \
+        .eq("indicator_name", name).limit(1).execute().data
+    stored = supabase.table(PATCH_TABLE).select("seq, patch") \
+        .eq("indicator_name", name).order("seq").execute().data or []
+
+    base_seq = (current[0].get("figure_seq") or 0) if current else 0
+    pending = [p for p in stored if p["seq"] > base_seq]
+    last_seq = max([base_seq] + [p["seq"] for p in stored])
+    metadata = {key: value for key, value in row.items() if key != "plotly_json"}
+
+    # The patch is committed together with the row (see IndicatorWriter)
+    own = writer if writer is not None else IndicatorWriter(supabase)
+
+    def commit():
+        return None if writer is not None else own.flush().get(name)
+
+    if current and len(pending) < compact_every:
+        previous = reassemble(current[0]["plotly_json"], [p["patch"] for p in pending])
+        patch = diff_figures(previous, figure)
+        if patch is not None:
+            if not patch["traces"] and not patch["layout"]:
+                own.add(metadata)
+                logger.info(f"{name}: figure unchanged")
+                return {"mode": "unchanged", "seq": last_seq, "bytes": 0, "since": None, "version": commit()}
+
+            size = len(dumps(patch))
+            own.add_patch({"indicator_name": name, "seq": last_seq + 1, "patch": patch})
+            own.add(metadata)
+            version = commit()
+            logger.info(f"{name}: stored patch {last_seq + 1} ({size} bytes, {len(pending) + 1} since base)")
+            return {"mode": "patch", "seq": last_seq + 1, "bytes": size, "since": patched_since(patch, figure),
+                    "version": version}
+
+    # Fresh base: upsert the row, then drop the patches it includes once it's committed
+    seq = last_seq + 1
+
+    def drop_patches():
+        supabase.table(PATCH_TABLE).delete().eq("indicator_name", name).lte("seq", seq).execute()
+
+    own.add({**row, "figure_seq": seq}, after=drop_patches if stored else None)
+    version = commit()
+    size = len(dumps(figure))
+    logger.info(f"{name}: stored new base figure at seq {seq} ({size} bytes)")
+    return {"mode": "base", "seq": seq, "bytes": size, "since": None, "version": version}
@@ -0,0 +1,77 @@
+"""
+Input Fingerprints
+
+A content hash of everything an indicator update depends on: the loaded input
+frames, the parameters and the source of the code that turns them into the
+stored figures. The CI updaters store it in indicators.input_fingerprint and
+skip both the computation and the upload when a run would produce exactly what
+is already stored (e.g. on weekends, when the sheets don't change). The
+period figures are cut relative to the data's last timestamp (see
+variants.period_slices), so nothing else in the output depends on the run date.
+"""
+
+import sys
+import json
+import hashlib
+import inspect
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _update_frame(hasher, frame):
+    """Feed a DataFrame's columns, dtypes, index and values into a hash"""
+    hasher.update(json.dumps([str(c) for c in frame.columns]).encode('utf-8'))
+    hasher.update(json.dumps([str(t) for t in frame.dtypes]).encode('utf-8'))
+    hasher.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+
+
+def code_version(*modules):
+    """
+    Hash of the source files of the given modules (module objects or names).
+
+    Any edit to the indicator logic, the plotting or the figure encoding
+    changes the fingerprint, without relying on a git checkout being present.
+    """
+    hasher = hashlib.sha256()
+    for module in modules:
+        if isinstance(module, str):
+            module = sys.modules[module]
+        path = inspect.getsourcefile(module)
+        with open(path, 'rb') as f:
+            hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def input_fingerprint(data, params, modules):
+    """
+    Fingerprint of an indicator update.
+
+    Args:
+        data: DataFrame or dict of DataFrames, as returned by load_data()
+        params (dict): Parameters passed to the indicator
+        modules (list): Modules (or module names) whose code shapes the output
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    hasher = hashlib.sha256()
+    frames = data if isinstance(data, dict) else {'data': data}
+    for key in sorted(frames):
+        hasher.update(key.encode('utf-8'))
+        _update_frame(hasher, frames[key])
+    hasher.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    hasher.update(code_version(*modules).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def stored_fingerprint(supabase, indicator_name):
+    """The input_fingerprint stored with an indicators row, or None"""
+    try:
+        rows = supabase.table("indicators").select("input_fingerprint") \
+            .eq("indicator_name", indicator_name).limit(1).execute().data
+    except Exception as e:
+        logger.warning(f"Could not read the stored fingerprint for {indicator_name}: {e}")
+        return None
+    return rows[0].get("input_fingerprint") if rows else None
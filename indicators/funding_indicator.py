@@ -10,14 +10,13 @@ import json
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import ta  # Technical Analysis library
 import base64
 import logging
 import re
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from .sheets_loader import SheetLoader, pad_rows
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -98,6 +97,7 @@ class FundingIndicator(BaseIndicator):
         # Configuration
         self.creds_file = 'funding-435016-442a60c70683.json'
         self.spreadsheet_id = '1Xn9Q1io5Fwm0s3JillXyDR2eMoySC_vCgde_oJCx64w'
+        self.sheet_loader = SheetLoader(self.spreadsheet_id, self.creds_file)
         
         # Default parameters
         self.default_params = {
@@ -195,9 +195,8 @@ class FundingIndicator(BaseIndicator):
                     elif isinstance(chart_params[key], float):
                         chart_params[key] = float(value)
             
-            # Load data from Google Sheets
-            ohlc_data = self.load_google_sheets_data('cleaned_price_data!A:E')
-            funding_data = self.load_google_sheets_data('fr2!A:F')
+            # Load data from Google Sheets (both ranges in one request)
+            ohlc_data, funding_data = self.load_google_sheets_data(['cleaned_price_data!A:E', 'fr2!A:F'])
             
             # Process the funding data
             funding_data.rename(columns={'FundingRateIndex': 'fr'}, inplace=True)
@@ -312,31 +311,38 @@ class FundingIndicator(BaseIndicator):
         
         return ohlc_filtered, funding_filtered
     
-    def load_google_sheets_data(self, range_name):
+    def load_google_sheets_data(self, range_names):
         """
         Load data from Google Sheets.
         
+        All ranges are fetched in one batched request through the shared,
+        cached sheet loader.
+        
         Args:
-            range_name (str): The range to load from the spreadsheet
+            range_names (list): The ranges to load from the spreadsheet
             
         Returns:
-            DataFrame: The loaded data
+            list: One DataFrame per range
         """
-        logger.info(f"Loading data from Google Sheets: {range_name}")
-        creds = service_account.Credentials.from_service_account_file(
-            self.creds_file, 
-            scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-        )
-        service = build('sheets', 'v4', credentials=creds)
-        sheet = service.spreadsheets()
-        result = sheet.values().get(spreadsheetId=self.spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
+        values = self.sheet_loader.load(range_names)
+        return [self.values_to_frame(values[range_name]) for range_name in range_names]
+    
+    def values_to_frame(self, values):
+        """
+        Convert raw sheet values into a numeric DataFrame indexed by timestamp.
         
-        if not values:
+        Args:
+            values (list): Rows returned by the Sheets API, header first
+            
+        Returns:
+            DataFrame: The loaded data
+        """
+        header, rows = pad_rows(values)
+        if not header:
             return pd.DataFrame()
 
         # Create DataFrame from the values and format appropriately
-        df = pd.DataFrame(values[1:], columns=values[0])  # Use the first row as headers
+        df = pd.DataFrame(rows, columns=header)  # Use the first row as headers
         df['timestamp'] = pd.to_datetime(df['timestamp'])  # Convert timestamp to datetime
         df.set_index('timestamp', inplace=True)
         df = df.apply(pd.to_numeric, errors='coerce')  # Convert all columns to numeric
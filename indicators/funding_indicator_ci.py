@@ -8,31 +8,39 @@ It's specifically designed to run in GitHub Actions.
 import os
 import json
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import ta  # Technical Analysis library
 import logging
 from supabase import create_client
+from .downsample import build_pyramid
+from .figure_encoding import compact_figure, dumps
+from .sheets_loader import SheetLoader, pad_rows
+from .variants import PERIODS, THEMES, apply_theme, data_end, period_slices, period_start, slice_from
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# latest() look-back: EMA warm-up in multiples of the longest span, plus spare rows
+EMA_WARMUP_SPANS = 6
+LOOKBACK_MARGIN = 30
+
+# Decimals kept in the stored figure arrays (funding rates need the 6th)
+FIGURE_DECIMALS = 6
+
 class FundingIndicator:
     """
     Simplified Bitcoin Funding Rate Indicator for CI/CD
     """
     
-    def __init__(self):
-        """Initialize the Funding Indicator"""
+    def __init__(self, supabase=None):
+        """Initialize the Funding Indicator (optionally reusing a Supabase client)"""
         self.name = "funding-indicator"
         self.description = "Bitcoin buy/sell signals based on funding rates and technical analysis"
         
         # Configuration
         self.creds_file = 'funding-435016-442a60c70683.json'
         self.spreadsheet_id = '1Xn9Q1io5Fwm0s3JillXyDR2eMoySC_vCgde_oJCx64w'
+        self.sheet_loader = SheetLoader(self.spreadsheet_id, self.creds_file)
         
         # Default parameters for indicator calculations
         self.default_params = {
@@ -68,6 +76,10 @@ class FundingIndicator:
             'lowerBand': 0.1,
         }
         
+        if supabase is not None:
+            self.supabase = supabase
+            return
+
         # Get Supabase client
         supabase_url = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
         supabase_key = os.environ.get("SUPABASE_KEY") or os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
@@ -77,68 +89,194 @@ class FundingIndicator:
         
         self.supabase = create_client(supabase_url, supabase_key)
     
-    def generate_data(self, params=None):
+    def load_data(self, rows=None):
+        """
+        Load the OHLC and funding rate inputs from Google Sheets.
+
+        Args:
+            rows (int): Only load the last rows of each sheet (None loads everything)
+
+        Returns:
+            dict: {'ohlc': DataFrame, 'funding': DataFrame}
+        """
+        ohlc_data, funding_data = self.load_google_sheets_data(['cleaned_price_data!A:E', 'fr2!A:F'], rows=rows)
+        
+        # Process the funding data
+        funding_data.rename(columns={'FundingRateIndex': 'fr'}, inplace=True)
+        funding_data['fr'] = pd.to_numeric(funding_data['fr'], errors='coerce')
+        funding_data['fr'] = funding_data['fr'].ffill()
+        
+        return {'ohlc': ohlc_data, 'funding': funding_data}
+    
+    def generate_data(self, params=None, data=None):
         """
         Generate data for the funding indicator.
+
+        Pass the result of load_data() as data to reuse already loaded inputs.
+        With params['max_points'] set, plotly_json is a downsampled overview
+        and the result also carries full-resolution yearly 'tiles'. 'figure'
+        is the same compactly encoded figure as a dict, ready to store.
         """
         try:
-            # Merge default params with any custom params
             custom_params = self.validate_params(params or {})
-            chart_params = self.default_params.copy()
+            chart_params = self.merge_params(custom_params)
             
-            # Process any overrides of technical parameters
-            for key, value in custom_params.items():
-                if key in chart_params:
-                    if isinstance(chart_params[key], int):
-                        chart_params[key] = int(value)
-                    elif isinstance(chart_params[key], float):
-                        chart_params[key] = float(value)
+            # Load data from Google Sheets unless it was handed in
+            if data is None:
+                data = self.load_data()
             
-            # Load data from Google Sheets
-            ohlc_data = self.load_google_sheets_data('cleaned_price_data!A:E')
-            funding_data = self.load_google_sheets_data('fr2!A:F')
+            # Run the indicator calculations over the full history
+            processed_data = self.dip_hunter_with_funding_and_sopr(
+                self.merge_inputs(data['ohlc'], data['funding']), chart_params)
             
-            # Process the funding data
-            funding_data.rename(columns={'FundingRateIndex': 'fr'}, inplace=True)
-            funding_data['fr'] = pd.to_numeric(funding_data['fr'], errors='coerce')
-            funding_data['fr'] = funding_data['fr'].ffill()
-            
-            # Filter by period if specified
+            # Show only the requested period (the averages stay warmed up)
             period = custom_params.get('period', None)
+            period_data = processed_data
             if period and period != 'all':
-                ohlc_data, funding_data = self.filter_by_period(ohlc_data, funding_data, period)
-            
-            # Merge OHLC and funding data
-            start_date = max(ohlc_data.index.min(), funding_data.index.min())
-            ohlc_data = ohlc_data.loc[start_date:]
-            funding_data = funding_data.loc[start_date:]
-            full_data = ohlc_data.join(funding_data[['fr']], how='inner')
-            
-            # Run the indicator calculations
-            processed_data = self.dip_hunter_with_funding_and_sopr(full_data, chart_params)
+                period_data = slice_from(processed_data, period_start(period, data_end(processed_data)))
             
             # Create the plot
             theme = custom_params.get('theme', 'light')
-            fig = self.plot_signals(processed_data, theme)
+            fig = self.plot_signals(period_data, theme)
+            
+            # Downsampled overview plus full-resolution yearly tiles
+            tiles = None
+            figure = fig
+            if custom_params.get('max_points'):
+                figure, tiles = build_pyramid(fig, custom_params['max_points'])
+            figure = compact_figure(figure, decimals=FIGURE_DECIMALS)
             
             # Return the results
-            return {
-                "plotly_json": fig.to_json(),
-                "latest_data": {
-                    "timestamp": processed_data.index[-1].strftime('%Y-%m-%d'),
-                    "close": float(processed_data['close'].iloc[-1]),
-                    "funding_rate": float(processed_data['fr'].iloc[-1]),
-                    "rsi": float(processed_data['rsi'].iloc[-1]),
-                    "bull_buy_signal": bool(processed_data['bullBuy'].iloc[-1]),
-                    "bear_buy_signal": bool(processed_data['bearBuy'].iloc[-1]),
-                    "sell_signal": bool(processed_data['sellSignal'].iloc[-1]),
-                    "weak_sell_signal": bool(processed_data['weakSellSignal'].iloc[-1])
-                }
+            result = {
+                "plotly_json": dumps(figure),
+                "figure": figure,
+                "latest_data": self.latest_values(processed_data)
             }
+            if tiles is not None:
+                result["tiles"] = tiles
+            return result
         except Exception as e:
             logger.exception("Error generating funding indicator data")
             return {"error": str(e)}
     
+    def generate_variants(self, params=None, data=None, periods=PERIODS, themes=THEMES):
+        """
+        Generate the figure for every period/theme combination in one pass.
+
+        The indicator is computed once over the full history and each period
+        is a slice of it, so short periods use the same warmed-up averages as
+        the full chart. Themes are overlays on one theme-neutral figure per
+        period. params['max_points'] downsamples the 'all' figure and adds
+        its yearly 'tiles'.
+
+        Returns:
+            dict: {'variants': {(period, theme): figure dict}, 'latest_data':
+                {...}, 'tiles': [...]} or {'error': ...}
+        """
+        try:
+            custom_params = self.validate_params(params or {})
+            chart_params = self.merge_params(custom_params)
+            
+            if data is None:
+                data = self.load_data()
+            processed_data = self.dip_hunter_with_funding_and_sopr(
+                self.merge_inputs(data['ohlc'], data['funding']), chart_params)
+            
+            variants = {}
+            tiles = None
+            overlays = {theme: self.theme_overlay(theme) for theme in themes}
+            for period, period_data in period_slices(processed_data, periods).items():
+                if period_data.empty:
+                    logger.warning(f"No funding data for period {period}")
+                    continue
+                figure = self.plot_base(period_data)
+                if period == 'all' and custom_params.get('max_points'):
+                    figure, tiles = build_pyramid(figure, custom_params['max_points'])
+                figure = compact_figure(figure, decimals=FIGURE_DECIMALS)
+                for theme in themes:
+                    variants[(period, theme)] = apply_theme(figure, overlays[theme])
+            
+            result = {"variants": variants, "latest_data": self.latest_values(processed_data)}
+            if tiles is not None:
+                result["tiles"] = tiles
+            return result
+        except Exception as e:
+            logger.exception("Error generating funding indicator variants")
+            return {"error": str(e)}
+    
+    def latest(self, params=None, data=None):
+        """
+        Latest values and signals only: the fast path for signal polling.
+
+        Loads just the trailing lookback_rows() of each sheet (or slices the
+        handed-in data), runs the indicator on that window and skips plotting.
+
+        Returns:
+            dict: {'latest_data': {...}} with the same fields as generate_data(),
+                or {'error': ...}
+        """
+        try:
+            chart_params = self.merge_params(self.validate_params(params or {}))
+            rows = self.lookback_rows(chart_params)
+            
+            if data is None:
+                data = self.load_data(rows=rows)
+            ohlc_data = data['ohlc'].iloc[-rows:]
+            funding_data = data['funding'].iloc[-rows:]
+            
+            processed_data = self.dip_hunter_with_funding_and_sopr(self.merge_inputs(ohlc_data, funding_data), chart_params)
+            return {"latest_data": self.latest_values(processed_data)}
+        except Exception as e:
+            logger.exception("Error computing latest funding indicator values")
+            return {"error": str(e)}
+    
+    def lookback_rows(self, chart_params):
+        """
+        Daily rows the latest signals depend on.
+
+        The EMAs never fully forget their start, so they get EMA_WARMUP_SPANS
+        times their longest span (leaving an influence of about 1e-5), plus the
+        longest rolling window and LOOKBACK_MARGIN rows.
+        """
+        ema_spans = [chart_params[key] for key in (
+            'longShortEmaLength', 'shortEma1Length', 'longEma1Length', 'shortEma2Length', 'bullEma1', 'bullEma2',
+            'longShortEmaLengthSell', 'shortEma1LengthSell', 'longEma1LengthSell', 'shortEma2LengthSell',
+            'weakShortEmaLength', 'weakLongEmaLength', 'rsiLength')]
+        windows = [chart_params['rocLength'] + chart_params['stdLength'], chart_params['fundingRateMAWindow'],
+                   chart_params['fundingRateMAWindowWeak']]
+        return int(EMA_WARMUP_SPANS * max(ema_spans) + max(windows) + LOOKBACK_MARGIN)
+    
+    def merge_params(self, custom_params):
+        """Default technical parameters with validated overrides applied."""
+        chart_params = self.default_params.copy()
+        for key, value in custom_params.items():
+            if key in chart_params:
+                if isinstance(chart_params[key], int):
+                    chart_params[key] = int(value)
+                elif isinstance(chart_params[key], float):
+                    chart_params[key] = float(value)
+        return chart_params
+    
+    def merge_inputs(self, ohlc_data, funding_data):
+        """Join OHLC and funding data over the dates both cover."""
+        start_date = max(ohlc_data.index.min(), funding_data.index.min())
+        ohlc_data = ohlc_data.loc[start_date:]
+        funding_data = funding_data.loc[start_date:]
+        return ohlc_data.join(funding_data[['fr']], how='inner')
+    
+    def latest_values(self, processed_data):
+        """The latest values and signals for the indicators table."""
+        return {
+            "timestamp": processed_data.index[-1].strftime('%Y-%m-%d'),
+            "close": float(processed_data['close'].iloc[-1]),
+            "funding_rate": float(processed_data['fr'].iloc[-1]),
+            "rsi": float(processed_data['rsi'].iloc[-1]),
+            "bull_buy_signal": bool(processed_data['bullBuy'].iloc[-1]),
+            "bear_buy_signal": bool(processed_data['bearBuy'].iloc[-1]),
+            "sell_signal": bool(processed_data['sellSignal'].iloc[-1]),
+            "weak_sell_signal": bool(processed_data['weakSellSignal'].iloc[-1])
+        }
+    
     def validate_params(self, params):
         """Validate the parameters for the funding indicator."""
         valid_params = {}
@@ -156,6 +294,15 @@ class FundingIndicator:
             if theme in ['light', 'dark']:
                 valid_params['theme'] = theme
         
+        # Downsampling of the stored figure (points per trace in the overview)
+        if 'max_points' in params:
+            try:
+                max_points = int(params['max_points'])
+            except (TypeError, ValueError):
+                max_points = 0
+            if max_points >= 100:
+                valid_params['max_points'] = max_points
+        
         # Add any technical parameter overrides
         for key, value in params.items():
             if key in self.default_params:
@@ -165,47 +312,25 @@ class FundingIndicator:
     
     def filter_by_period(self, ohlc_data, funding_data, period):
         """Filter data by the specified time period."""
-        from datetime import datetime, timedelta
-        
-        end_date = datetime.now()
-        
-        if period == '7d':
-            start_date = end_date - timedelta(days=7)
-        elif period == '14d':
-            start_date = end_date - timedelta(days=14)
-        elif period == '30d':
-            start_date = end_date - timedelta(days=30)
-        elif period == '90d':
-            start_date = end_date - timedelta(days=90)
-        elif period == '180d':
-            start_date = end_date - timedelta(days=180)
-        elif period == '1y':
-            start_date = end_date - timedelta(days=365)
-        else:  # 'all'
-            return ohlc_data, funding_data
-        
-        ohlc_filtered = ohlc_data[ohlc_data.index >= start_date]
-        funding_filtered = funding_data[funding_data.index >= start_date]
-        
-        return ohlc_filtered, funding_filtered
+        start_date = period_start(period, data_end(ohlc_data))
+        return slice_from(ohlc_data, start_date), slice_from(funding_data, start_date)
     
-    def load_google_sheets_data(self, range_name):
-        """Load data from Google Sheets."""
-        logger.info(f"Loading data from Google Sheets: {range_name}")
-        creds = service_account.Credentials.from_service_account_file(
-            self.creds_file, 
-            scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-        )
-        service = build('sheets', 'v4', credentials=creds)
-        sheet = service.spreadsheets()
-        result = sheet.values().get(spreadsheetId=self.spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
-        
-        if not values:
+    def load_google_sheets_data(self, range_names, rows=None):
+        """Load several ranges from Google Sheets in one batched, cached request."""
+        if rows:
+            values = self.sheet_loader.load_tail(range_names, rows)
+        else:
+            values = self.sheet_loader.load(range_names)
+        return [self.values_to_frame(values[range_name]) for range_name in range_names]
+    
+    def values_to_frame(self, values):
+        """Convert raw sheet values into a numeric DataFrame indexed by timestamp."""
+        header, rows = pad_rows(values)
+        if not header:
             return pd.DataFrame()
 
         # Create DataFrame from the values and format appropriately
-        df = pd.DataFrame(values[1:], columns=values[0])  # Use the first row as headers
+        df = pd.DataFrame(rows, columns=header)  # Use the first row as headers
         df['timestamp'] = pd.to_datetime(df['timestamp'])  # Convert timestamp to datetime
         df.set_index('timestamp', inplace=True)
         df = df.apply(pd.to_numeric, errors='coerce')  # Convert all columns to numeric
@@ -301,9 +426,8 @@ class FundingIndicator:
 
         return data
     
-    def plot_signals(self, data, theme='light'):
-        """Create a plot of the signals."""
-        # Set theme colors
+    def theme_overlay(self, theme='light'):
+        """Theme-dependent layout and trace properties, applied on top of plot_base()."""
         if theme == 'dark':
             bg_color = 'rgba(40, 40, 40, 1)'
             paper_bg = 'rgba(30, 30, 30, 1)'
@@ -317,6 +441,35 @@ class FundingIndicator:
             text_color = '#4B4B4B'
             price_line_color = 'black'
         
+        return {
+            'layout': {
+                'title': {'font': {'color': text_color}},
+                'plot_bgcolor': bg_color,
+                'paper_bgcolor': paper_bg,
+                'legend': {'font': {'color': text_color}},
+                'xaxis': {'tickfont': {'color': text_color}},
+                'yaxis': {'gridcolor': grid_color, 'tickfont': {'color': text_color}, 'color': text_color},
+                'yaxis2': {'gridcolor': grid_color, 'tickfont': {'color': text_color}, 'color': text_color},
+            },
+            # Price line
+            'traces': {0: {'line': {'color': price_line_color}}},
+        }
+    
+    def plot_signals(self, data, theme='light'):
+        """Create a plot of the signals."""
+        fig = self.plot_base(data)
+        overlay = self.theme_overlay(theme)
+        fig.update_layout(overlay['layout'])
+        for index, props in overlay['traces'].items():
+            fig.data[index].update(props)
+        return fig
+    
+    def plot_base(self, data):
+        """Create the theme-neutral plot of the signals (see theme_overlay())."""
+        # Imported here so latest() never loads plotly
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        
         # Create a single-row plot with two y-axes
         fig = make_subplots(specs=[[{"secondary_y": True}]])
         
@@ -326,9 +479,9 @@ class FundingIndicator:
             y=data['close'],
             mode='lines',
             name='Price',
-            text=[f"<b style='color:white;background:black;padding:2px;border-radius:3px;'>Price</b><br>Date: {d.strftime('%Y-%m-%d')}<br>Value: {v:.0f}" 
-                for d, v in zip(data.index, data['close'])],
-            line=dict(color=price_line_color, width=2.5)
+            hovertemplate="<b style='color:white;background:black;padding:2px;border-radius:3px;'>Price</b>"
+                          "<br>Date: %{x|%Y-%m-%d}<br>Value: %{y:.0f}<extra></extra>",
+            line=dict(width=2.5)
         ), secondary_y=False)
 
         fig.add_trace(go.Scatter(
@@ -400,12 +553,20 @@ class FundingIndicator:
             )
         ), secondary_y=False)
 
-        # Funding Rate on the right y-axis with color coding
+        # Funding Rate on the right y-axis, colored by sign through a two-step color scale
+        fr_limit = max(float(data['fr'].abs().max()), 1e-9) if data['fr'].notna().any() else 1.0
         fig.add_trace(go.Bar(
             x=data.index, 
             y=data['fr'], 
             name='Funding Rate', 
-            marker_color=['rgba(34, 139, 34, 0.7)' if v > 0 else 'rgba(220, 20, 60, 0.7)' for v in data['fr']]
+            marker=dict(
+                color=data['fr'],
+                cmin=-fr_limit,
+                cmax=fr_limit,
+                colorscale=[[0, 'rgba(220, 20, 60, 0.7)'], [0.5, 'rgba(220, 20, 60, 0.7)'],
+                            [0.5, 'rgba(34, 139, 34, 0.7)'], [1, 'rgba(34, 139, 34, 0.7)']],
+                showscale=False
+            )
         ), secondary_y=True)
         
         # Calculate padding by extending the x-axis range by 2% on both sides
@@ -421,7 +582,7 @@ class FundingIndicator:
                 'y': 0.95, 
                 'xanchor': 'center', 
                 'yanchor': 'top', 
-                'font': {'size': 24, 'color': text_color}
+                'font': {'size': 24}
             },
             xaxis_title='',
             yaxis_title='BTC Price (log scale)',
@@ -429,37 +590,30 @@ class FundingIndicator:
             autosize=True,
             height=700,
             margin=dict(l=50, r=50, t=80, b=100),
-            plot_bgcolor=bg_color,
-            paper_bgcolor=paper_bg,
             legend=dict(
                 orientation='h',
                 yanchor='top',
                 xanchor='center',
                 y=1.02,
                 x=0.5,
-                font=dict(size=12, color=text_color)
+                font=dict(size=12)
             ),
             xaxis=dict(
                 range=[x_min - x_range_padding, x_max + x_range_padding],
                 showgrid=False,
-                tickfont=dict(color=text_color),
                 tickangle=30,
                 tickformat='%b %Y'
             ),
             yaxis=dict(
-                showgrid=False,
-                gridcolor=grid_color,
-                tickfont=dict(color=text_color)
+                showgrid=False
             ),
             yaxis2=dict(
-                showgrid=True,
-                gridcolor=grid_color,
-                tickfont=dict(color=text_color)
+                showgrid=True
             ),
         )
         
         # Update y-axes with log scale and limit range for Funding Rate
-        fig.update_yaxes(type='log', secondary_y=False, color=text_color)
-        fig.update_yaxes(range=[-0.06, 0.3], fixedrange=False, secondary_y=True, color=text_color)
+        fig.update_yaxes(type='log', secondary_y=False)
+        fig.update_yaxes(range=[-0.06, 0.3], fixedrange=False, secondary_y=True)
 
         return fig
@@ -0,0 +1,175 @@
+"""
+Image Renderer
+
+Turns Plotly figure JSON into PNGs for the /image endpoint.
+
+- Rendering runs in a pool of worker processes that each start kaleido once
+  and keep it warm, so requests don't pay the renderer start-up and several
+  images can render at the same time.
+- Finished PNGs are stored on disk under a content address: the SHA-256 of the
+  figure JSON plus size, scale and theme. An unchanged figure is never rendered
+  twice, even across restarts, and a new indicator run naturally gets new
+  files.
+- Concurrent requests for the same image share a single render.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_DIR = os.path.join('.cache', 'images')
+
+
+def figure_hash(plotly_json):
+    """Content hash of a figure's JSON"""
+    return hashlib.sha256(plotly_json.encode('utf-8')).hexdigest()
+
+
+def render_png(plotly_json, width, height, scale=1):
+    """Render figure JSON to PNG bytes with kaleido (runs in a worker process)"""
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    from .figure_encoding import decode_arrays
+    # Stored figures hold base64 typed arrays, which older plotly.py versions
+    # would drop as invalid (and render blank)
+    fig = go.Figure(decode_arrays(json.loads(plotly_json)), skip_invalid=True)
+    return pio.to_image(fig, format='png', width=width, height=height, scale=scale)
+
+
+def _warm_worker():
+    """Pool initializer: start kaleido before the first real request arrives"""
+    try:
+        render_png('{"data": [{"type": "scatter", "y": [0, 1]}], "layout": {}}', 50, 50)
+    except Exception as e:
+        logger.warning(f"Image renderer warm-up failed: {e}")
+
+
+def _ping():
+    return os.getpid()
+
+
+class ImageRenderer:
+    """
+    Pooled, disk-cached PNG rendering.
+
+    Args:
+        cache_dir (str): Directory for rendered images (None disables the disk cache)
+        workers (int): Renderer processes
+        render_func (callable): Picklable render_png replacement, e.g. for tests
+    """
+
+    def __init__(self, cache_dir=DEFAULT_IMAGE_DIR, workers=2, render_func=render_png):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.render_func = render_func
+        self._pool = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawn rather than fork: the server process is multi-threaded
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker if self.render_func is render_png else None,
+                )
+            return self._pool
+
+    def warm(self):
+        """Start every worker process (and its kaleido) now"""
+        pool = self._executor()
+        pids = {f.result() for f in [pool.submit(_ping) for _ in range(self.workers * 2)]}
+        logger.info(f"Image renderer ready with {len(pids)} worker(s)")
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def image_path(self, plotly_json, width, height, scale=1, theme='light'):
+        """Content-addressed path for a rendered figure"""
+        digest = figure_hash(plotly_json)
+        return os.path.join(self.cache_dir or '', digest[:2], f"{digest}-{width}x{height}@{scale}x-{theme}.png")
+
+    def _read(self, path):
+        if not self.cache_dir or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _write(self, path, png):
+        if not self.cache_dir:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+
+    def render(self, plotly_json, width=1200, height=700, scale=1, theme='light'):
+        """
+        PNG bytes for a figure, from the disk cache when possible.
+
+        Args:
+            plotly_json (str): Figure JSON
+            width, height (int): Image size in pixels
+            scale (int): Pixel ratio
+            theme (str): Theme the figure was built with (part of the cache key)
+        """
+        path = self.image_path(plotly_json, width, height, scale, theme)
+        png = self._read(path)
+        if png is not None:
+            self.hits += 1
+            return png
+
+        pool = self._executor()
+        with self._lock:
+            future = self._inflight.get(path)
+            leader = future is None
+            if leader:
+                future = self._inflight[path] = pool.submit(self.render_func, plotly_json, width, height, scale)
+
+        try:
+            png = future.result()
+            if leader:
+                self._write(path, png)
+                self.renders += 1
+                logger.info(f"Rendered {os.path.basename(path)} ({len(png) / 1024:.0f} KB)")
+        finally:
+            if leader:
+                with self._lock:
+                    self._inflight.pop(path, None)
+        return png
+
+    def prune(self, max_files=2000):
+        """Delete the least recently written images beyond max_files"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        paths = []
+        for root, _, files in os.walk(self.cache_dir):
+            paths.extend(os.path.join(root, name) for name in files if name.endswith('.png'))
+        if len(paths) <= max_files:
+            return 0
+        paths.sort(key=os.path.getmtime)
+        stale = paths[:len(paths) - max_files]
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        logger.info(f"Pruned {len(stale)} cached image(s)")
+        return len(stale)
+
+    def stats(self):
+        return {'hits': self.hits, 'renders': self.renders, 'workers': self.workers}
@@ -0,0 +1,153 @@
+"""
+Indicator Store
+
+The one write path for rows of the indicators table.
+
+Updaters hand their rows to an IndicatorWriter instead of writing them
+directly; flush() commits every row of a run in a single upsert_indicators()
+RPC call (see migrations/014_indicator_versions.sql). The RPC upserts on
+indicator_name inside one transaction, so readers see either the previous rows
+or the new ones and never a missing indicator, and it returns the version the
+versions trigger gave each committed row.
+
+Figure patches (indicators/figure_patches.py) are queued on the writer too and
+go into the same call (migrations/017_indicator_patch_commits.sql), so a new
+figure tail becomes visible together with the row it belongs to.
+
+Rows for the same indicator are merged before the flush, so an updater can add
+its figure first and its input fingerprint only once everything else has been
+uploaded. Columns a row leaves out keep their stored values. An updater queues
+on a writer of its own and merge()s it into the run's writer only when it
+succeeds, so a failed update never commits half its rows.
+"""
+
+import logging
+import threading
+
+from .bulk_writer import is_missing_rpc
+
+logger = logging.getLogger(__name__)
+
+UPSERT_RPC = "upsert_indicators"
+PATCH_TABLE = "indicator_figure_patches"
+
+
+class IndicatorWriter:
+    """
+    Collects indicators rows and commits them in one request.
+
+    Args:
+        supabase: Supabase client
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._rows = {}
+        self._patches = []
+        self._after = []
+        self._lock = threading.Lock()
+
+    def add(self, row, after=None):
+        """
+        Queue a row (merged into any queued row for the same indicator).
+
+        Args:
+            row (dict): Columns to write, including indicator_name
+            after (callable): Called once the row is committed, e.g. to clean
+                up data the new row supersedes
+        """
+        with self._lock:
+            self._rows.setdefault(row["indicator_name"], {}).update(row)
+            if after is not None:
+                self._after.append(after)
+
+    def add_patch(self, row):
+        """Queue an indicator_figure_patches row ({indicator_name, seq, patch}) for the same commit"""
+        with self._lock:
+            self._patches.append(row)
+
+    def merge(self, other):
+        """Move everything queued on another writer onto this one"""
+        with other._lock:
+            rows, patches, after = list(other._rows.values()), other._patches, other._after
+            other._rows, other._patches, other._after = {}, [], []
+        for row in rows:
+            self.add(row)
+        with self._lock:
+            self._patches.extend(patches)
+            self._after.extend(after)
+
+    def pending(self):
+        with self._lock:
+            return sorted(self._rows)
+
+    def flush(self):
+        """
+        Commit every queued row.
+
+        Raises whatever the RPC raised, unless the function is missing (an
+        unmigrated database), in which case the patches and rows are written
+        with plain inserts and upserts instead.
+
+        Returns:
+            dict: indicator_name -> committed version (None if unknown)
+        """
+        with self._lock:
+            rows, patches, after = list(self._rows.values()), self._patches, self._after
+            self._rows, self._patches, self._after = {}, [], []
+        if not rows and not patches:
+            return {}
+
+        params = {"p_rows": rows}
+        if patches:
+            params["p_patches"] = patches
+        try:
+            result = self.supabase.rpc(UPSERT_RPC, params).execute()
+            versions = {r["indicator_name"]: r.get("version") for r in (result.data or [])}
+        except Exception as e:
+            # Only a database without the function falls back; any other error
+            # (constraints, schema) means nothing was committed
+            if not is_missing_rpc(e):
+                raise
+            logger.warning(f"{UPSERT_RPC}() not found ({e}); falling back to upserts. "
+                           f"Run migrate.py to enable atomic writes")
+            # Patches first: if the rows then fail, the next run diffs against them
+            if patches:
+                self.supabase.table(PATCH_TABLE).insert(patches).execute()
+            versions = self._upsert(rows)
+
+        logger.info(f"Committed {len(rows)} indicator row(s) and {len(patches)} patch(es): {versions}")
+        for callback in after:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Post-commit cleanup failed: {e}")
+        return versions
+
+    def _upsert(self, rows):
+        """Plain upserts, one per distinct column set (a missing column must not be nulled)"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        versions = {}
+        for group in groups.values():
+            result = self.supabase.table("indicators").upsert(group, on_conflict="indicator_name").execute()
+            for r in result.data or []:
+                versions[r["indicator_name"]] = r.get("version")
+        return versions
+
+
+def write_indicator(supabase, row, writer=None):
+    """
+    Write one indicators row: queued on writer if given, committed now otherwise.
+
+    Returns:
+        int: The committed version, or None when queued or unknown
+    """
+    if writer is not None:
+        writer.add(row)
+        return None
+    own = IndicatorWriter(supabase)
+    own.add(row)
+    return own.flush().get(row["indicator_name"])
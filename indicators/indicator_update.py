@@ -0,0 +1,135 @@
+"""
+Indicator Updates
+
+The update flow shared by the CI updaters (ci_update_funding.py,
+ci_update_avs.py): fingerprint the inputs and skip unchanged runs, generate
+every period/theme variant in one pass, store the default figure as a patch
+or a new base, and upload the touched tiles and the changed variants through
+one BulkWriter. The indicators row and its fingerprint are committed last.
+When that commit stores a new figure and FLASK_SERVER is set, the indicator
+server is asked to reload the indicator and pre-render its default images.
+"""
+
+import os
+import sys
+import logging
+import urllib.request
+from datetime import datetime
+
+from .downsample import DEFAULT_MAX_POINTS, tile_rows
+from .figure_patches import save_figure
+from .variants import DEFAULT_VARIANT, VARIANT_TABLE, stored_hashes, variant_rows
+from .fingerprint import input_fingerprint, stored_fingerprint
+from .indicator_store import IndicatorWriter
+from .bulk_writer import BulkWriter
+
+logger = logging.getLogger(__name__)
+
+# Modules besides the indicator itself that shape the stored figures
+FIGURE_MODULES = ['indicators.downsample', 'indicators.figure_encoding', 'indicators.figure_patches',
+                  'indicators.variants', __name__]
+
+# Seconds to wait for the indicator server to accept a pre-render request
+PRERENDER_TIMEOUT = 10
+
+
+def request_prerender(indicator_name, server_url=None):
+    """
+    Ask the indicator server to reload an indicator and pre-render its default images.
+
+    Args:
+        indicator_name (str): Name of the indicators row (the server resolves aliases)
+        server_url (str): Server base URL (FLASK_SERVER if omitted)
+
+    Returns:
+        bool: Whether the server accepted the request (False without a server URL)
+    """
+    server_url = server_url or os.environ.get('FLASK_SERVER')
+    if not server_url:
+        return False
+    url = f"{server_url.rstrip('/')}/api/indicators/{indicator_name}/prerender"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method='POST'), timeout=PRERENDER_TIMEOUT):
+            pass
+    except Exception as e:
+        logger.warning(f"{indicator_name}: could not request pre-rendered images from {url}: {e}")
+        return False
+    logger.info(f"{indicator_name}: requested pre-rendered images from {url}")
+    return True
+
+
+def update_indicator(indicator, indicator_name, data=None, force=False, writer=None):
+    """
+    Generate an indicator's figures and store them in Supabase.
+
+    Args:
+        indicator: Indicator instance with load_data() and generate_variants()
+        indicator_name (str): Name of its indicators row
+        data: Preloaded inputs from indicator.load_data() (loaded if omitted)
+        force (bool): Recompute and upload even if the inputs are unchanged
+        writer: IndicatorWriter to queue the indicators row on (committed here if omitted)
+
+    Returns:
+        dict: save_figure()'s result ({} when the inputs were unchanged)
+
+    Raises:
+        RuntimeError: If generating or uploading the figures failed
+    """
+    supabase = indicator.supabase
+
+    # Skip everything when inputs, parameters and code match the last upload
+    if data is None:
+        data = indicator.load_data()
+    params = {"max_points": DEFAULT_MAX_POINTS}
+    fingerprint = input_fingerprint(data, params, FIGURE_MODULES + [sys.modules[type(indicator).__module__]])
+    if not force and stored_fingerprint(supabase, indicator_name) == fingerprint:
+        logger.info(f"{indicator_name}: inputs unchanged (fingerprint {fingerprint[:12]}), nothing to update")
+        return {}
+
+    # Generate every period/theme variant from one computation pass
+    logger.info(f"{indicator_name}: generating indicator variants")
+    result = indicator.generate_variants(params, data=data)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+
+    # The default all/light figure (already a compactly encoded dict) goes in the indicators row
+    today = datetime.now().strftime('%Y-%m-%d')
+    row = {
+        "indicator_name": indicator_name,
+        "date": today,
+        "plotly_json": result["variants"][DEFAULT_VARIANT],
+        "latest_data": result["latest_data"]
+    }
+
+    # Store a small patch on the previous figure when possible, a new base otherwise
+    queued = IndicatorWriter(supabase)
+    stored = save_figure(supabase, row, writer=queued)
+
+    # Tiles and variants go through the shared concurrent bulk writer
+    bulk = BulkWriter(supabase)
+
+    # Full-resolution yearly tiles for zoomed-in views (only the ones a patch touched)
+    tiles = [t for t in result["tiles"] if stored["mode"] == "base" or (stored["since"] and t["x1"] > stored["since"][:10])]
+    if tiles:
+        logger.info(f"{indicator_name}: upserting {len(tiles)} figure tiles")
+        bulk.upsert("indicator_tiles", tile_rows(indicator_name, tiles), on_conflict="indicator_name,level,tile")
+
+    # Only the variants whose content changed since the last upload
+    rows = variant_rows(indicator_name, result["variants"], today,
+                        stored={} if force else stored_hashes(supabase, indicator_name))
+    logger.info(f"{indicator_name}: upserting {len(rows)} of {len(result['variants']) - 1} figure variants")
+    if rows:
+        bulk.upsert(VARIANT_TABLE, rows, on_conflict="indicator_name,period,theme")
+    if any(total["failed"] for total in bulk.totals.values()):
+        raise RuntimeError("some tiles or variants could not be uploaded")
+
+    # Fingerprint recorded last, so a partly failed upload is retried on the next run;
+    # a new figure gets its default images rendered once it's committed
+    changed = stored["mode"] != "unchanged"
+    queued.add({"indicator_name": indicator_name, "input_fingerprint": fingerprint},
+               after=(lambda: request_prerender(indicator_name)) if changed else None)
+    if writer is not None:
+        writer.merge(queued)
+    else:
+        logger.info(f"{indicator_name}: committed version {queued.flush().get(indicator_name)}")
+    return stored
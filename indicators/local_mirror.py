@@ -0,0 +1,225 @@
+"""
+Local Supabase Mirror
+
+A read-through SQLite copy of the tables the Python jobs read: crypto_prices,
+crypto_rankings, tracked_coins and indicators.
+
+Each table is synced incrementally before it is read:
+- crypto_prices and crypto_rankings from their last mirrored date (re-reading
+  the last few days, which the ingest may still rewrite)
+- indicators by the version the versions trigger gives every write (see
+  migrations/), keyed by indicator_name, or by date for the
+  name-less daily crowding rows
+- tracked_coins, which is small and has no watermark, in full
+
+and a table synced less than max_age seconds ago is served without asking
+Supabase at all, so warm reads are local disk reads. Rows deleted upstream
+stay in the incremental tables until the mirror is rebuilt (sync(force=True)
+after deleting the file).
+
+The database runs in WAL mode with a busy timeout and every sync is one
+transaction, so the orchestrator, the indicator server and notebooks can share
+one file: readers are never blocked and concurrent syncs simply both apply the
+same idempotent upserts.
+
+Enable it for the scripts by pointing SUPABASE_MIRROR at a file (or "1" for
+the default path); get_mirror() returns None when it isn't set.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import pandas as pd
+
+from .price_reader import PAGE_SIZE, PRICE_TABLE, fetch_rows
+
+logger = logging.getLogger(__name__)
+
+MIRROR_ENV = "SUPABASE_MIRROR"
+DEFAULT_MIRROR_PATH = os.path.join('.cache', 'supabase_mirror.sqlite')
+
+# Seconds a synced table is served without checking Supabase
+MAX_AGE = 300
+
+# Days re-read behind a date watermark
+DATE_OVERLAP = 3
+
+# How each table is keyed and synced: 'date' (incremental by date), 'version'
+# (incremental by indicators.version) or 'full'. A row's key is the first
+# non-null key column.
+TABLES = {
+    PRICE_TABLE: {'key': ['date'], 'sync': 'date'},
+    'crypto_rankings': {'key': ['date'], 'sync': 'date'},
+    'tracked_coins': {'key': ['symbol'], 'sync': 'full'},
+    'indicators': {'key': ['indicator_name', 'date'], 'sync': 'version'},
+}
+
+
+def _row_key(row, spec):
+    """Mirror key of a row"""
+    return str(next(row[column] for column in spec['key'] if row.get(column) is not None))
+
+
+class LocalMirror:
+    """
+    SQLite mirror of a few Supabase tables.
+
+    Args:
+        supabase: Supabase client used to sync
+        path (str): SQLite file
+        max_age (float): Seconds a synced table is served without syncing
+    """
+
+    def __init__(self, supabase, path=DEFAULT_MIRROR_PATH, max_age=MAX_AGE):
+        self.supabase = supabase
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, watermark TEXT, synced_at REAL)")
+            for table in TABLES:
+                db.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (key TEXT PRIMARY KEY, mark TEXT, row TEXT NOT NULL)')
+            # Mirrors written before name-less indicators rows were keyed by
+            # date hold them all under one 'None' key: resync that table
+            if db.execute('SELECT 1 FROM "indicators" WHERE key = \'None\'').fetchone():
+                db.execute('DELETE FROM "indicators"')
+                db.execute("DELETE FROM sync_state WHERE name = 'indicators'")
+
+    def _connection(self):
+        """One connection per thread (sqlite3 connections aren't shareable)"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _state(self, table):
+        row = self._connection().execute("SELECT watermark, synced_at FROM sync_state WHERE name = ?", (table,)).fetchone()
+        return row if row else (None, 0.0)
+
+    def sync(self, table, force=False):
+        """
+        Bring one table up to date (unless synced within max_age).
+
+        Returns:
+            int: Rows fetched from Supabase
+        """
+        spec = TABLES[table]
+        watermark, synced_at = self._state(table)
+        if not force and time.time() - synced_at < self.max_age:
+            return 0
+
+        if spec['sync'] == 'date':
+            start = None
+            if watermark:
+                start = (pd.Timestamp(watermark) - pd.Timedelta(days=DATE_OVERLAP)).strftime('%Y-%m-%d')
+            rows = fetch_rows(self.supabase, "*", start=start, table=table)
+            marks = [str(row['date']) for row in rows]
+            watermark = max(marks + ([watermark] if watermark else []), default=None)
+        elif spec['sync'] == 'version':
+            rows = self._read_after(table, 'version', int(watermark) if watermark else None)
+            marks = [str(row['version']) for row in rows]
+            watermark = str(max([int(m) for m in marks] + ([int(watermark)] if watermark else []), default=0))
+        else:
+            rows = self._read_after(table, spec['key'][0], None)
+            marks = [None] * len(rows)
+
+        with self._connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            if spec['sync'] == 'full':
+                db.execute(f'DELETE FROM "{table}"')
+            db.executemany(f'INSERT OR REPLACE INTO "{table}" (key, mark, row) VALUES (?, ?, ?)',
+                           [(_row_key(row, spec), mark, json.dumps(row)) for row, mark in zip(rows, marks)])
+            db.execute("INSERT OR REPLACE INTO sync_state (name, watermark, synced_at) VALUES (?, ?, ?)",
+                       (table, watermark, time.time()))
+
+        logger.info(f"Mirror: synced {len(rows)} row(s) of {table} (watermark {watermark})")
+        return len(rows)
+
+    def _read_after(self, table, column, after, page_size=PAGE_SIZE):
+        """Rows with column > after, paging on column"""
+        rows = []
+        while True:
+            query = self.supabase.table(table).select("*")
+            if after is not None:
+                query = query.gt(column, after)
+            page = query.order(column).limit(page_size).execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            after = page[-1][column]
+
+    def _refresh(self, table):
+        """Sync before a read, falling back to the local copy if Supabase can't be reached"""
+        try:
+            self.sync(table)
+        except Exception as e:
+            if not self._state(table)[1]:
+                raise
+            logger.warning(f"Mirror: could not sync {table} ({e}), serving the local copy")
+
+    def rows(self, table, start=None, end=None):
+        """
+        Every mirrored row of a table (synced first), in key order.
+
+        Args:
+            start, end: Optional first/last key (dates for date-keyed tables)
+        """
+        self._refresh(table)
+        sql, args = f'SELECT row FROM "{table}"', []
+        bounds = [("key >= ?", start), ("key <= ?", end)]
+        conditions = [(clause, str(value)) for clause, value in bounds if value is not None]
+        if conditions:
+            sql += " WHERE " + " AND ".join(clause for clause, _ in conditions)
+            args = [value for _, value in conditions]
+        return [json.loads(row) for (row,) in self._connection().execute(sql + " ORDER BY key", args)]
+
+    def count(self, table):
+        self._refresh(table)
+        return self._connection().execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+    # --- The query helpers the scripts use ---
+
+    def price_rows(self, start=None, end=None):
+        """crypto_prices rows ({'date', 'prices'}), like screener_supabase.get_price_rows()"""
+        return [{'date': row['date'], 'prices': row['prices']} for row in self.rows(PRICE_TABLE, start, end)]
+
+    def read_prices(self, symbols, start=None, end=None):
+        """Date x symbol float prices, like price_reader.read_prices() (extracted in SQLite)"""
+        self._refresh(PRICE_TABLE)
+        columns = ", ".join("json_extract(row, ?)" for _ in symbols)
+        sql, args = f'SELECT key, {columns} FROM "{PRICE_TABLE}" WHERE key >= ? AND key <= ? ORDER BY key', \
+            [f'$.prices."{symbol}"' for symbol in symbols] + [str(start or ''), str(end or '\uffff')]
+        rows = self._connection().execute(sql, args).fetchall()
+        if not rows:
+            return pd.DataFrame(columns=list(symbols), dtype=float)
+        index = pd.DatetimeIndex(pd.to_datetime([row[0] for row in rows]), name='date')
+        prices = pd.DataFrame.from_records([row[1:] for row in rows], index=index, columns=list(symbols))
+        return prices.apply(pd.to_numeric, errors='coerce').astype(float)
+
+    def tracked_coins(self, since=None):
+        """tracked_coins rows, optionally only those in the top 100 since a date"""
+        coins = self.rows('tracked_coins')
+        if since is not None:
+            coins = [c for c in coins if c.get('last_in_top100') and str(c['last_in_top100']) >= str(since)]
+        return coins
+
+    def indicator(self, name):
+        """The indicators row of one indicator, or None"""
+        found = self.rows('indicators', name, name)
+        return found[0] if found else None
+
+
+def get_mirror(supabase):
+    """A LocalMirror if SUPABASE_MIRROR is set, None otherwise"""
+    setting = os.environ.get(MIRROR_ENV)
+    if not setting:
+        return None
+    path = DEFAULT_MIRROR_PATH if setting.lower() in ('1', 'true', 'yes') else setting
+    return LocalMirror(supabase, path)
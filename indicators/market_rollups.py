@@ -0,0 +1,164 @@
+"""
+Market Rollups
+
+Weekly and monthly aggregates of crypto_prices, crypto_market_caps and
+crypto_volumes for the long-range chart queries (see
+migrations/006_market_rollups.sql).
+
+Prices and market caps keep each symbol's last, mean, high and low over the
+period, volumes the period's sum. Updates are incremental: the last stored
+period of each kind (which may have been partial) is rebuilt together with
+every later one, from the daily rows since its start, so a nightly run reads a
+few weeks of rows instead of the whole history. The ingest writes a coin's
+whole history when it enters the top 100, so a symbol missing from the last
+stored period triggers a rebuild of that table's rollups.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+from .bulk_writer import BulkWriter
+from .price_reader import fetch_rows
+
+logger = logging.getLogger(__name__)
+
+# Source table -> aggregation ('stats': last/mean/high/low, 'sum')
+ROLLUPS = {
+    'crypto_prices': 'stats',
+    'crypto_market_caps': 'stats',
+    'crypto_volumes': 'sum',
+}
+
+PERIODS = ['week', 'month']
+
+
+def rollup_table(table):
+    """Companion table holding the rollups of a market table"""
+    return f"{table}_rollups"
+
+
+def period_starts(index, period):
+    """Start of the period (Monday of the week, first of the month) of every date"""
+    if period == 'week':
+        return index.normalize() - pd.to_timedelta(index.weekday, unit='D')
+    return index.to_period('M').to_timestamp()
+
+
+def _frame(rows):
+    """Date x symbol floats from {date, prices} rows"""
+    index = pd.DatetimeIndex(pd.to_datetime([row['date'] for row in rows]), name='date')
+    frame = pd.DataFrame.from_records([row['prices'] or {} for row in rows], index=index)
+    return frame.apply(pd.to_numeric, errors='coerce').astype(float).sort_index()
+
+
+def build_rollups(frame, period, how):
+    """
+    Rollup rows of one period kind.
+
+    Args:
+        frame (DataFrame): Date x symbol daily values
+        period (str): 'week' or 'month'
+        how (str): 'stats' or 'sum'
+
+    Returns:
+        list: {'period', 'date', 'last_date', 'days', 'stats'} row dicts
+    """
+    if frame.empty:
+        return []
+
+    keys = period_starts(frame.index, period)
+    groups = frame.groupby(keys)
+    dates = pd.Series(frame.index, index=frame.index).groupby(keys)
+    last_dates, days = dates.max(), dates.count()
+
+    if how == 'sum':
+        aggregates = {None: groups.sum(min_count=1)}
+    else:
+        # last() takes the last non-missing value, so a coin that dropped out
+        # mid-period keeps its final price
+        aggregates = {'last': groups.last(), 'mean': groups.mean(), 'high': groups.max(), 'low': groups.min()}
+
+    symbols = list(frame.columns)
+    arrays = {name: agg.reindex(columns=symbols).to_numpy(dtype=float) for name, agg in aggregates.items()}
+    # Symbols with at least one value in the period
+    present = np.isfinite(next(iter(arrays.values())))
+
+    rows = []
+    for i, start in enumerate(last_dates.index):
+        stats = {}
+        for j in np.flatnonzero(present[i]):
+            if how == 'sum':
+                stats[symbols[j]] = float(arrays[None][i, j])
+            else:
+                stats[symbols[j]] = {name: float(array[i, j]) for name, array in arrays.items()}
+        rows.append({
+            'period': period,
+            'date': start.strftime('%Y-%m-%d'),
+            'last_date': last_dates.iloc[i].strftime('%Y-%m-%d'),
+            'days': int(days.iloc[i]),
+            'stats': stats,
+        })
+    return rows
+
+
+def last_period(supabase, table, period):
+    """The latest stored rollup row ({'date', 'stats'}) of a kind, or None"""
+    rows = supabase.table(rollup_table(table)).select("date, stats").eq("period", period) \
+        .order("date", desc=True).limit(1).execute().data
+    return rows[0] if rows else None
+
+
+def _roll_up(supabase, table, since):
+    """Rollup rows of one table from the daily rows since the period watermarks"""
+    start = None if None in since.values() else min(since.values())
+    rows = fetch_rows(supabase, "date, prices", start=start, table=table)
+    frame = _frame(rows) if rows else pd.DataFrame()
+    rollups = []
+    for period in PERIODS:
+        built = build_rollups(frame, period, ROLLUPS[table])
+        # Periods before this kind's watermark were only partly read
+        rollups.extend(row for row in built if since[period] is None or row['date'] >= since[period])
+    return rows, frame, rollups
+
+
+def update_rollups(supabase, tables=None, full_refresh=False, writer=None):
+    """
+    Bring the weekly and monthly rollups up to date.
+
+    Args:
+        supabase: Supabase client
+        tables (list): Market tables to roll up (all of ROLLUPS if None)
+        full_refresh (bool): Rebuild every period from the whole history
+        writer (BulkWriter): Writer for the upserts (a new one if None)
+
+    Returns:
+        bool: True if every rollup was written
+    """
+    writer = writer or BulkWriter(supabase)
+    ok = True
+    for table in tables or ROLLUPS:
+        try:
+            last = {period: None if full_refresh else last_period(supabase, table, period) for period in PERIODS}
+            since = {period: row['date'] if row else None for period, row in last.items()}
+            rows, frame, rollups = _roll_up(supabase, table, since)
+
+            if last['week'] and not frame.empty:
+                recent = frame[frame.index >= pd.Timestamp(since['week'])].dropna(axis=1, how='all')
+                new = set(recent.columns) - set(last['week']['stats'])
+            else:
+                new = set()
+            if new:
+                logger.info(f"New symbols in {table} ({', '.join(sorted(new))}), rebuilding its rollups")
+                rows, frame, rollups = _roll_up(supabase, table, {period: None for period in PERIODS})
+            if not rows:
+                logger.info(f"No {table} rows to roll up")
+                continue
+
+            stats = writer.upsert(rollup_table(table), rollups, on_conflict="period,date")
+            logger.info(f"Rolled up {len(rows)} {table} rows into {len(rollups)} weekly/monthly rows")
+            ok = ok and not stats['failed']
+        except Exception as e:
+            logger.error(f"Could not update the {table} rollups: {e}")
+            ok = False
+    return ok
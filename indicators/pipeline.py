@@ -0,0 +1,202 @@
+"""
+Indicator Pipeline
+
+A small dependency-graph runner for the nightly refresh. Each node is a
+callable that receives the results of its dependencies in memory, and nodes
+whose dependencies are complete run concurrently in a thread pool. The jobs
+are dominated by network I/O (CoinGecko, Google Sheets, Supabase), so threads
+give the parallelism without pickling DataFrames between processes.
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class Node:
+    """A single pipeline step"""
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class Pipeline:
+    """
+    Run indicator jobs as a DAG.
+
+    Example:
+        pipeline = Pipeline()
+        pipeline.add('sheets', lambda inputs: load())
+        pipeline.add('funding', lambda inputs: build(inputs['sheets']), deps=['sheets'])
+        pipeline.run()
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.nodes = {}
+        self.results = {}
+        self.timings = {}
+        self.failed = {}
+        self.skipped = []
+        self.wall_time = 0.0
+        self._started = 0.0
+
+    def add(self, name, func, deps=()):
+        """
+        Register a node.
+
+        Args:
+            name (str): Unique node name
+            func (callable): Called as func(inputs) where inputs maps each
+                dependency name to its result
+            deps (iterable): Names of nodes that must finish first
+        """
+        if name in self.nodes:
+            raise ValueError(f"Duplicate pipeline node: {name}")
+        self.nodes[name] = Node(name, func, deps)
+        return self
+
+    def select(self, names):
+        """
+        Restrict the pipeline to the given nodes and everything they depend on.
+
+        Args:
+            names (iterable): Node names to keep
+        """
+        keep = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise ValueError(f"Unknown pipeline node: {name}")
+            if name not in keep:
+                keep.add(name)
+                stack.extend(self.nodes[name].deps)
+        self.nodes = {name: node for name, node in self.nodes.items() if name in keep}
+        return self
+
+    def topological_order(self):
+        """Return node names in dependency order, raising on cycles or unknown deps"""
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.nodes[name].deps:
+                if dep not in self.nodes:
+                    raise ValueError(f"Node '{name}' depends on unknown node '{dep}'")
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, [])
+        return order
+
+    def _execute(self, node, inputs):
+        start = time.perf_counter()
+        try:
+            return node.func(inputs)
+        finally:
+            self.timings[node.name] = (start - self._started, time.perf_counter() - self._started)
+
+    def run(self):
+        """
+        Execute every node, starting each one as soon as its dependencies finish.
+
+        A failed node marks all of its dependents as skipped; independent
+        branches keep running.
+
+        Returns:
+            dict: Node name -> result for the nodes that succeeded
+        """
+        order = self.topological_order()
+        pending = {name: set(self.nodes[name].deps) for name in order}
+        self.results, self.timings, self.failed, self.skipped = {}, {}, {}, []
+        self._started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                # Skip nodes whose dependencies failed or were skipped (transitively)
+                blocked = set(self.failed) | set(self.skipped)
+                while True:
+                    newly = [n for n, deps in pending.items() if deps & blocked]
+                    if not newly:
+                        break
+                    for name in newly:
+                        logger.warning(f"Skipping {name}: a dependency did not complete")
+                        self.skipped.append(name)
+                        blocked.add(name)
+                        del pending[name]
+
+                for name in [n for n, deps in pending.items() if not deps]:
+                    node = self.nodes[name]
+                    inputs = {dep: self.results[dep] for dep in node.deps}
+                    logger.info(f"Starting {name}")
+                    running[executor.submit(self._execute, node, inputs)] = name
+                    del pending[name]
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Node {name} failed: {e}")
+                        self.failed[name] = e
+                        continue
+                    start, end = self.timings[name]
+                    logger.info(f"Finished {name} in {end - start:.1f}s")
+                    for deps in pending.values():
+                        deps.discard(name)
+
+        self.wall_time = time.perf_counter() - self._started
+        return self.results
+
+    def critical_path(self):
+        """
+        Longest chain of dependent nodes by measured duration.
+
+        Returns:
+            tuple: (list of node names, total seconds)
+        """
+        best = {}
+        for name in self.topological_order():
+            if name not in self.timings:
+                continue
+            start, end = self.timings[name]
+            previous = max(
+                (best[dep] for dep in self.nodes[name].deps if dep in best),
+                key=lambda item: item[1],
+                default=([], 0.0)
+            )
+            best[name] = (previous[0] + [name], previous[1] + (end - start))
+        if not best:
+            return [], 0.0
+        return max(best.values(), key=lambda item: item[1])
+
+    def report(self):
+        """Log per-node timings, the critical path and the overall wall time"""
+        for name in self.topological_order():
+            if name in self.timings:
+                start, end = self.timings[name]
+                status = 'failed' if name in self.failed else 'ok'
+                logger.info(f"  {name:<24} {status:<7} start {start:7.1f}s  took {end - start:7.1f}s")
+            elif name in self.skipped:
+                logger.info(f"  {name:<24} skipped")
+
+        path, seconds = self.critical_path()
+        logger.info(f"Critical path: {' -> '.join(path) or 'n/a'} ({seconds:.1f}s)")
+        logger.info(f"Wall time: {self.wall_time:.1f}s")
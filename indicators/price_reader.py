@@ -0,0 +1,143 @@
+"""
+Price History Reader
+
+Reads crypto_prices without pulling every coin's JSONB for every date.
+
+- Only the requested symbols are selected, projected server-side out of the
+  prices column (select "date, p0:prices->BTC"), so a single coin's history is
+  a few bytes per day instead of the whole top-100 object.
+- Pages are keyed on date (date > last date read) rather than offsets, and the
+  history is split into date slices that are read concurrently, so nothing is
+  silently cut off at PostgREST's row limit however long the history grows.
+- Values are decoded straight into NumPy arrays and returned as a date x
+  symbol DataFrame, the same shape build_price_matrix() produces.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+PRICE_TABLE = "crypto_prices"
+
+# Rows per request; keep at or below the PostgREST max-rows setting
+PAGE_SIZE = 1000
+
+# Concurrent slice readers
+MAX_WORKERS = 4
+
+
+def _date_bounds(supabase, table, start=None, end=None):
+    """First and last date stored in table (within start/end), or (None, None)"""
+    def edge(desc):
+        query = supabase.table(table).select("date")
+        if start is not None:
+            query = query.gte("date", str(start))
+        if end is not None:
+            query = query.lte("date", str(end))
+        rows = query.order("date", desc=desc).limit(1).execute().data
+        return pd.Timestamp(rows[0]["date"]) if rows else None
+
+    return edge(False), edge(True)
+
+
+def _slices(first, last, days):
+    """Consecutive [lo, hi) date ranges of the given length covering first..last"""
+    edges = list(pd.date_range(first.normalize(), last.normalize() + pd.Timedelta(days=1), freq=f"{days}D"))
+    if edges[-1] <= last:
+        edges.append(last.normalize() + pd.Timedelta(days=1))
+    return [(lo.strftime('%Y-%m-%d'), hi.strftime('%Y-%m-%d')) for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def _read_slice(supabase, table, columns, lo, hi, page_size):
+    """Every row with lo <= date < hi, paging on the last date read"""
+    rows = []
+    after = None
+    while True:
+        query = supabase.table(table).select(columns)
+        query = query.gt("date", after) if after is not None else query.gte("date", lo)
+        page = query.lt("date", hi).order("date").limit(page_size).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        after = page[-1]["date"]
+
+
+def fetch_rows(supabase, columns, start=None, end=None, table=PRICE_TABLE,
+               page_size=PAGE_SIZE, max_workers=MAX_WORKERS):
+    """
+    Read every row of a date-keyed table, in date order.
+
+    Args:
+        supabase: Supabase client
+        columns (str): PostgREST select list (must include date)
+        start, end: Optional first/last date to read (inclusive)
+        table (str): Table to read
+        page_size (int): Rows per request
+        max_workers (int): Date slices read concurrently
+
+    Returns:
+        list: Row dicts sorted by date
+    """
+    first, last = _date_bounds(supabase, table, start, end)
+    if first is None:
+        return []
+
+    # Daily rows, so a slice of page_size days is normally a single request
+    slices = _slices(first, last, page_size)
+    if len(slices) == 1 or max_workers <= 1:
+        parts = [_read_slice(supabase, table, columns, lo, hi, page_size) for lo, hi in slices]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(slices))) as executor:
+            parts = list(executor.map(lambda s: _read_slice(supabase, table, columns, s[0], s[1], page_size), slices))
+
+    rows = [row for part in parts for row in part]
+    logger.info(f"Read {len(rows)} rows of {table} in {len(slices)} slice(s)")
+    return rows
+
+
+def price_columns(symbols, column='prices'):
+    """
+    Select list projecting the given symbols out of a JSONB column.
+
+    Returns:
+        tuple: (select string, {alias: symbol})
+    """
+    aliases = {f"p{i}": symbol for i, symbol in enumerate(symbols)}
+    select = ", ".join(["date"] + [f"{alias}:{column}->{symbol}" for alias, symbol in aliases.items()])
+    return select, aliases
+
+
+def _to_float(values):
+    """Float array from JSON numbers, numeric strings and nulls (NaN)"""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+
+def read_prices(supabase, symbols, start=None, end=None, **kwargs):
+    """
+    Price history of a few symbols.
+
+    Args:
+        supabase: Supabase client
+        symbols (list): Symbols to read, e.g. ['BTC']
+        start, end: Optional first/last date to read (inclusive)
+        **kwargs: Passed to fetch_rows (page_size, max_workers, table)
+
+    Returns:
+        DataFrame: Float prices indexed by date with one column per symbol
+            (NaN where a coin has no price), empty if there is no data
+    """
+    select, aliases = price_columns(symbols)
+    rows = fetch_rows(supabase, select, start=start, end=end, **kwargs)
+    if not rows:
+        return pd.DataFrame(columns=list(symbols), dtype=float)
+
+    index = pd.DatetimeIndex(pd.to_datetime(np.array([row["date"] for row in rows])), name='date')
+    prices = pd.DataFrame({symbol: _to_float([row.get(alias) for row in rows]) for alias, symbol in aliases.items()},
+                          index=index)
+    return prices[~prices.index.duplicated(keep='last')]
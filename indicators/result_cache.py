@@ -0,0 +1,120 @@
+"""
+Result Cache
+
+A small in-process LRU cache with per-entry expiry, used by the indicator
+server. Concurrent requests for a key that is still being computed wait for
+that computation instead of starting their own, so a burst of identical
+requests after a data refresh costs one indicator run.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU/TTL cache with single-flight computation.
+
+    Args:
+        maxsize (int): Maximum number of entries kept
+        ttl (float): Default seconds an entry stays valid (None never expires)
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires is not None and expires <= now:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        """Return a cached value without computing it"""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+        return value if found else default
+
+    def put(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries if full"""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, func, ttl=None):
+        """
+        Return the cached value for key, computing it with func() on a miss.
+
+        Only one caller computes a given key at a time; the others block until
+        it finishes and share its result (or its exception). Exceptions are
+        not cached.
+        """
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            value = func()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.set_exception(e)
+            raise
+
+        self.put(key, value, ttl)
+        with self._lock:
+            self._inflight.pop(key, None)
+        call.set_result(value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """Drop every entry (or those whose key matches predicate)"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,198 @@
+"""
+Multi-window Rolling Statistics Engine
+
+Computes rolling mean, standard deviation and Z-score for many window lengths
+with vectorized array arithmetic instead of a pandas .rolling() pass per
+window. Short windows are summed row by row (mean first, then squared
+deviations from it); longer ones come from prefix sums of the values and
+their squares, restarted every window's worth of rows and centred on those
+rows' own mean, so the sums stay close to the local variance even on series
+that trend over several orders of magnitude.
+
+Semantics match pandas .rolling(window).mean()/.std() with the default
+min_periods: a window containing any NaN produces NaN, and std uses ddof=1.
+Windows whose variance is within rounding error of zero (e.g. constant ones)
+get exactly 0.
+"""
+
+import numpy as np
+import pandas as pd
+
+EPS = np.finfo(float).eps
+
+# Windows up to this length are summed directly (two passes, O(n * window))
+DIRECT_WINDOW = 16
+
+# Fewest window starts sharing one centring shift in the prefix sums
+MIN_BLOCK = 128
+
+
+def _direct_sums(values, w, with_squares=True):
+    """Mean and sum of squared deviations of every full window, by summing its rows"""
+    starts = values.shape[0] - w + 1
+    total = np.zeros((starts,) + values.shape[1:])
+    for k in range(w):
+        total += values[k:k + starts]
+    mean = total / w
+    if not with_squares:
+        return mean, None
+    m2 = np.zeros_like(mean)
+    for k in range(w):
+        deviation = values[k:k + starts] - mean
+        m2 += deviation * deviation
+    # Rounding error of the mean is up to w * EPS * |mean| per deviation
+    tolerance = w * (w * EPS * mean) ** 2
+    return mean, np.where(m2 > tolerance, m2, 0.0)
+
+
+def _prefix_sums(values, w, with_squares=True):
+    """
+    Mean and sum of squared deviations of every full window, from prefix sums.
+
+    Window starts are processed in blocks of max(w, MIN_BLOCK); the rows a
+    block's windows cover are centred on their own mean before summing, so rounding
+    error scales with the local spread of the values rather than with their
+    distance from a global mean. Sums of squares within that error of zero
+    are set to 0.
+    """
+    starts = values.shape[0] - w + 1
+    mean = np.empty((starts,) + values.shape[1:])
+    m2 = np.empty_like(mean) if with_squares else None
+    pad = np.zeros((1,) + values.shape[1:])
+
+    block = max(w, MIN_BLOCK)
+    for first in range(0, starts, block):
+        last = min(first + block, starts)
+        rows = values[first:last + w - 1]
+        shift = rows.mean(axis=0)
+        centered = rows - shift
+
+        s1 = np.concatenate([pad, np.cumsum(centered, axis=0)])
+        total = s1[w:] - s1[:-w]
+        mean[first:last] = shift + total / w
+
+        if with_squares:
+            s2 = np.concatenate([pad, np.cumsum(centered * centered, axis=0)])
+            window_m2 = (s2[w:] - s2[:-w]) - total * total / w
+            # Worst-case rounding error of the prefix sums the difference comes from
+            tolerance = len(rows) * EPS * s2[w:]
+            m2[first:last] = np.where(window_m2 > tolerance, window_m2, 0.0)
+
+    return mean, m2
+
+
+def _window_sums(values, w, with_squares=True):
+    """
+    Mean and sum of squared deviations (None unless with_squares) of every
+    full window of w rows, one row per window end. values must be finite.
+    """
+    if w <= DIRECT_WINDOW:
+        return _direct_sums(values, w, with_squares)
+    return _prefix_sums(values, w, with_squares)
+
+
+def rolling_moments(values, windows, ddof=1, with_std=True):
+    """
+    Rolling mean and standard deviation for several windows at once.
+
+    Args:
+        values (array-like): 1-D series or 2-D (dates x series) matrix
+        windows (iterable): Window lengths
+        ddof (int): Delta degrees of freedom for the standard deviation
+        with_std (bool): Skip the standard deviation when False
+
+    Returns:
+        tuple: (mean, std) arrays shaped (len(windows),) + values.shape;
+            std is None when with_std is False
+    """
+    values = np.asarray(values, dtype=float)
+    windows = [int(w) for w in windows]
+    n = values.shape[0]
+    missing = ~np.isfinite(values)
+    counts = None
+    if missing.any():
+        # Zeroed here and masked out of the result below
+        pad = np.zeros((1,) + values.shape[1:], dtype=np.int32)
+        counts = np.concatenate([pad, np.cumsum(missing, axis=0, dtype=np.int32)])
+        values = np.where(missing, 0.0, values)
+
+    mean = np.full((len(windows),) + values.shape, np.nan)
+    std = np.full((len(windows),) + values.shape, np.nan) if with_std else None
+
+    for i, w in enumerate(windows):
+        if w < 1 or w > n:
+            continue
+        with_squares = with_std and w > ddof
+        window_mean, m2 = _window_sums(values, w, with_squares)
+        if with_squares:
+            # Constant windows (to rounding) have their value as the mean, as in pandas
+            window_mean = np.where(m2 == 0, values[w - 1:], window_mean)
+            std[i, w - 1:] = np.sqrt(m2 / (w - ddof))
+        mean[i, w - 1:] = window_mean
+
+        # Windows that contain a missing value are undefined, as in pandas
+        if counts is not None:
+            incomplete = (counts[w:] - counts[:-w]) > 0
+            mean[i, w - 1:][incomplete] = np.nan
+            if with_std:
+                std[i, w - 1:][incomplete] = np.nan
+
+    return mean, std
+
+
+def rolling_mean(values, window):
+    """Rolling mean for a single window (same shape as values)"""
+    return rolling_moments(values, [window], with_std=False)[0][0]
+
+
+def rolling_std(values, window, ddof=1):
+    """Rolling standard deviation for a single window (same shape as values)"""
+    return rolling_moments(values, [window], ddof=ddof)[1][0]
+
+
+def rolling_zscore(values, windows):
+    """
+    Rolling Z-score for several windows at once.
+
+    Zero standard deviations (constant windows, see rolling_moments) are
+    replaced by machine epsilon, like the crowding indicator does.
+
+    Returns:
+        ndarray: Shaped (len(windows),) + values.shape
+    """
+    values = np.asarray(values, dtype=float)
+    mean, std = rolling_moments(values, windows)
+    std = np.where(std == 0, EPS, std)
+    return (values[np.newaxis] - mean) / std
+
+
+def crowding_surface(prices, windows, roc_period=90, rsi_period=14):
+    """
+    Crowding index computed for every Z-score window.
+
+    RSI and ROC don't depend on the Z-score window, so they are computed once
+    and only the rolling statistics fan out across windows.
+
+    Args:
+        prices (Series): Price series indexed by date
+        windows (iterable): Z-score window lengths
+        roc_period (int): Rate of change length
+        rsi_period (int): RSI length
+
+    Returns:
+        DataFrame: Crowding values with one row per window and one column per date
+    """
+    windows = [int(w) for w in windows]
+    close = prices.to_numpy(dtype=float)
+
+    delta = np.diff(close, prepend=np.nan)
+    avg_gain = rolling_mean(np.clip(delta, 0, None), rsi_period)
+    avg_loss = rolling_mean(-np.clip(delta, None, 0), rsi_period)
+    avg_loss = np.where(avg_loss == 0, EPS, avg_loss)
+    rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    shifted = np.concatenate([np.full(roc_period, np.nan), close[:-roc_period]])
+    roc = (close / shifted - 1) * 100
+
+    surface = rsi[np.newaxis] * rolling_zscore(roc, windows)
+    return pd.DataFrame(surface, index=pd.Index(windows, name='window'), columns=prices.index)
@@ -0,0 +1,203 @@
+"""
+Schema Migrations
+
+Applies the versioned SQL files in migrations/ (NNN_description.sql) to the
+Postgres database behind Supabase, and checks that the hot queries use the
+indexes and partitions they were written for.
+
+- Each migration runs in its own transaction and is recorded in
+  schema_migrations with a checksum; a recorded file that has since been
+  edited is reported instead of silently re-run.
+- maintain_partitions() gives the current and the next year their own
+  partition of every market table (run after each migration pass).
+- verify() runs EXPLAIN on the queries in CHECKS with sequential scans
+  disabled, so it fails whenever the planner has no index or partition to use
+  for them, even on a small local database where a sequential scan would be
+  cheapest anyway.
+
+psycopg2 is only needed here, so it is imported on first use.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+from .supabase_client import read_env_local
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+DB_URL_KEYS = ["DATABASE_URL", "SUPABASE_DB_URL"]
+
+# Tables partitioned by year (003_partition_market_tables.sql)
+PARTITIONED_TABLES = ['crypto_prices', 'crypto_market_caps', 'crypto_volumes']
+
+# (description, query, tables that must not be scanned sequentially,
+#  {partitioned table: most partitions the query may read})
+CHECKS = [
+    ("price range read",
+     "SELECT date, prices->'BTC' FROM crypto_prices WHERE date >= '2024-01-01' AND date < '2024-03-01' ORDER BY date",
+     ['crypto_prices'], {'crypto_prices': 1}),
+    ("price keyset page",
+     "SELECT date, prices->'BTC' FROM crypto_prices WHERE date > '2024-06-30' ORDER BY date LIMIT 1000",
+     ['crypto_prices'], {}),
+    ("dates with a coin",
+     "SELECT date FROM crypto_prices WHERE prices ? 'SOL'",
+     ['crypto_prices'], {}),
+    ("single day merge target",
+     "SELECT prices FROM crypto_volumes WHERE date = '2024-05-01'",
+     ['crypto_volumes'], {'crypto_volumes': 1}),
+    ("rankings range read",
+     "SELECT date, rankings FROM crypto_rankings WHERE date >= '2024-01-01'",
+     ['crypto_rankings'], {}),
+    ("recently tracked coins",
+     "SELECT symbol, id FROM tracked_coins WHERE last_in_top100 >= '2024-01-01'",
+     ['tracked_coins'], {}),
+]
+
+
+def database_url():
+    """Postgres connection string from the environment or .env.local"""
+    url = next((os.environ[k] for k in DB_URL_KEYS if os.environ.get(k)), None)
+    if not url:
+        local = read_env_local()
+        url = next((local[k] for k in DB_URL_KEYS if local.get(k)), None)
+    if not url:
+        raise ValueError(f"Set one of {DB_URL_KEYS} to the database connection string")
+    return url
+
+
+def connect(url=None):
+    """psycopg2 connection (autocommit off)"""
+    import psycopg2
+    return psycopg2.connect(url or database_url())
+
+
+def load_migrations(path=MIGRATIONS_DIR):
+    """
+    The migration files in version order.
+
+    Returns:
+        list: (version, name, sql, checksum) tuples
+    """
+    migrations = []
+    for filename in sorted(os.listdir(path)):
+        match = re.match(r'^(\d+)_(.+)\.sql$', filename)
+        if not match:
+            continue
+        with open(os.path.join(path, filename), 'r', encoding='utf-8') as f:
+            sql = f.read()
+        migrations.append((match.group(1), match.group(2), sql, hashlib.sha256(sql.encode('utf-8')).hexdigest()))
+    return migrations
+
+
+def applied_migrations(conn):
+    """{version: checksum} of the migrations recorded in schema_migrations"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version TEXT PRIMARY KEY,
+              name TEXT NOT NULL,
+              checksum TEXT NOT NULL,
+              applied_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )""")
+        cur.execute("SELECT version, checksum FROM schema_migrations")
+        rows = dict(cur.fetchall())
+    conn.commit()
+    return rows
+
+
+def migrate(conn, path=MIGRATIONS_DIR, dry_run=False):
+    """
+    Apply every pending migration.
+
+    Returns:
+        list: Versions applied (or that would be, for a dry run)
+    """
+    applied = applied_migrations(conn)
+    pending = []
+    for version, name, sql, checksum in load_migrations(path):
+        if version in applied:
+            if applied[version] != checksum:
+                logger.warning(f"Migration {version}_{name} was edited after it was applied; not re-running it")
+            continue
+        pending.append(version)
+        if dry_run:
+            logger.info(f"Would apply {version}_{name}")
+            continue
+
+        logger.info(f"Applying {version}_{name}")
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                            (version, name, checksum))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {version}_{name} failed; rolled back")
+            raise
+
+    if not pending:
+        logger.info("Schema is up to date")
+    return pending
+
+
+def maintain_partitions(conn, years_ahead=1):
+    """Make sure the current and the next year(s) have their own partitions"""
+    year = datetime.now().year
+    with conn.cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            for y in range(year, year + years_ahead + 1):
+                cur.execute("SELECT create_yearly_partition(%s, %s)", (table, y))
+    conn.commit()
+
+
+def _plan_nodes(plan):
+    """Every node of an EXPLAIN (FORMAT JSON) plan"""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def _partition_of(relation, tables):
+    """The partitioned table a relation belongs to, or None"""
+    for table in tables:
+        if relation == table or re.match(rf'^{table}_(\d{{4}}|default)$', relation):
+            return table
+    return None
+
+
+def verify(conn, checks=CHECKS):
+    """
+    EXPLAIN each check with sequential scans disabled.
+
+    Returns:
+        list: (description, ok, message) per check
+    """
+    results = []
+    with conn.cursor() as cur:
+        for description, query, no_seq_scan, max_partitions in checks:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            cur.execute("EXPLAIN (FORMAT JSON) " + query)
+            plan = cur.fetchone()[0]
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+            nodes = list(_plan_nodes(plan))
+
+            seq_scans = sorted({n['Relation Name'] for n in nodes if n['Node Type'] == 'Seq Scan' and
+                                _partition_of(n['Relation Name'], no_seq_scan)})
+            problems = [f"sequential scan on {', '.join(seq_scans)}"] if seq_scans else []
+            for table, limit in max_partitions.items():
+                scanned = {n['Relation Name'] for n in nodes if n.get('Relation Name') and
+                           _partition_of(n['Relation Name'], [table])}
+                if len(scanned) > limit:
+                    problems.append(f"{len(scanned)} partitions of {table} read ({', '.join(sorted(scanned))})")
+
+            used = sorted({n['Index Name'] for n in nodes if n.get('Index Name')})
+            message = "; ".join(problems) if problems else f"uses {', '.join(used) or 'no index'}"
+            results.append((description, not problems, message))
+            conn.rollback()
+    return results
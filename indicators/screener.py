@@ -0,0 +1,197 @@
+"""
+Cross-sectional Indicator Screener
+
+Computes the crowding index family (RSI, ROC, rolling Z-score, crowding signal)
+together with realized volatility and drawdown for every tracked coin at once.
+Everything runs on a date x coin price matrix, so screening the whole universe
+costs about the same number of vectorized operations as a single coin does.
+"""
+
+import json
+import logging
+import numpy as np
+import pandas as pd
+from .rolling_stats import EPS, rolling_mean, rolling_moments, rolling_std
+
+logger = logging.getLogger(__name__)
+
+# Same settings the BTC crowding index uses
+DEFAULT_PARAMS = {
+    'rsi_period': 14,          # RSI length
+    'roc_period': 90,          # Rate of change length
+    'window': 100,             # Rolling window for the ROC Z-score
+    'volatility_window': 30,   # Window for realized volatility
+}
+
+# Order of the metrics in the latest-values table and per-coin series
+METRICS = ['price', 'rsi', 'roc', 'z_score', 'crowding', 'volatility', 'drawdown']
+
+
+def build_price_matrix(rows, column='prices'):
+    """
+    Turn crypto_prices style rows into a date x coin matrix.
+
+    Args:
+        rows (list): Records with a 'date' and a JSONB column of {symbol: value}
+        column (str): Name of the JSONB column
+
+    Returns:
+        DataFrame: Prices indexed by date with one column per symbol
+    """
+    if not rows:
+        return pd.DataFrame()
+
+    dates = pd.to_datetime([row['date'] for row in rows])
+    values = [row[column] if isinstance(row[column], dict) else json.loads(row[column]) for row in rows]
+
+    matrix = pd.DataFrame.from_records(values, index=dates).apply(pd.to_numeric, errors='coerce')
+    matrix = matrix[~matrix.index.duplicated(keep='last')].sort_index()
+    matrix.index.name = 'date'
+    return matrix
+
+
+def _like(frame, values):
+    """Wrap an array in a DataFrame shaped like frame"""
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns)
+
+
+def calculate_rsi(prices, period=14):
+    """RSI from simple rolling averages of gains and losses, per column"""
+    delta = prices.diff().to_numpy()
+    avg_gain = rolling_mean(np.clip(delta, 0, None), period)
+    avg_loss = rolling_mean(-np.clip(delta, None, 0), period)
+
+    # Handle division by zero
+    avg_loss = np.where(avg_loss == 0, EPS, avg_loss)
+
+    return _like(prices, 100 - (100 / (1 + avg_gain / avg_loss)))
+
+
+def calculate_roc(prices, period=90):
+    """Rate of change in percent, per column"""
+    return (prices / prices.shift(period) - 1) * 100
+
+
+def calculate_zscore(values, window=100):
+    """Rolling Z-score, per column"""
+    mean, std = rolling_moments(values.to_numpy(), [window])
+    std = np.where(std[0] == 0, EPS, std[0])
+    return _like(values, (values.to_numpy() - mean[0]) / std)
+
+
+def calculate_volatility(prices, window=30):
+    """Annualized realized volatility of daily log returns, per column"""
+    log_returns = np.log(prices / prices.shift(1)).to_numpy()
+    return _like(prices, rolling_std(log_returns, window) * np.sqrt(365))
+
+
+def calculate_drawdown(prices):
+    """Drawdown from the running all-time high, per column"""
+    return prices / prices.cummax() - 1
+
+
+def compute_screener(prices, params=None):
+    """
+    Compute every screener metric for all coins in the matrix.
+
+    Args:
+        prices (DataFrame): Date x coin price matrix
+        params (dict, optional): Overrides for DEFAULT_PARAMS
+
+    Returns:
+        dict: Metric name -> date x coin DataFrame, in METRICS order
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+
+    rsi = calculate_rsi(prices, params['rsi_period'])
+    roc = calculate_roc(prices, params['roc_period'])
+    z_score = calculate_zscore(roc, params['window'])
+
+    return {
+        'price': prices,
+        'rsi': rsi,
+        'roc': roc,
+        'z_score': z_score,
+        'crowding': rsi * z_score,
+        'volatility': calculate_volatility(prices, params['volatility_window']),
+        'drawdown': calculate_drawdown(prices),
+    }
+
+
+def _last_valid_positions(prices):
+    """Row position of the last non-NaN price in each column (-1 if none)"""
+    valid = prices.notna().to_numpy()
+    positions = len(valid) - 1 - np.argmax(valid[::-1], axis=0)
+    positions[~valid.any(axis=0)] = -1
+    return positions
+
+
+def _to_json_values(array, decimals=8):
+    """Round an array and convert NaN/inf to None for JSON"""
+    array = np.round(np.asarray(array, dtype=float), decimals)
+    return [None if not np.isfinite(v) else float(v) for v in array]
+
+
+def latest_values(metrics):
+    """
+    Build the compact latest-values table.
+
+    Each coin is read at its own last available price date, so coins that
+    stopped updating are still reported with their final values.
+
+    Args:
+        metrics (dict): Output of compute_screener
+
+    Returns:
+        DataFrame: One row per symbol with the date and every metric
+    """
+    prices = metrics['price']
+    positions = _last_valid_positions(prices)
+    has_data = positions >= 0
+    rows = positions[has_data]
+    cols = np.flatnonzero(has_data)
+
+    latest = pd.DataFrame(
+        {name: frame.to_numpy()[rows, cols] for name, frame in metrics.items()},
+        index=prices.columns[cols]
+    )
+    latest.insert(0, 'date', prices.index[rows])
+    latest.index.name = 'symbol'
+    return latest
+
+
+def prepare_latest_records(latest):
+    """Convert the latest-values table into screener_latest rows"""
+    records = []
+    columns = {name: _to_json_values(latest[name]) for name in METRICS}
+    dates = latest['date'].dt.strftime('%Y-%m-%d')
+    for i, symbol in enumerate(latest.index):
+        record = {'symbol': symbol, 'date': dates.iloc[i]}
+        record.update({name: columns[name][i] for name in METRICS})
+        records.append(record)
+    return records
+
+
+def prepare_series_records(metrics):
+    """
+    Convert the metric matrices into one screener_series row per coin.
+
+    Series are stored column-wise ({'dates': [...], 'rsi': [...], ...}) and
+    start at the coin's first available price.
+    """
+    prices = metrics['price']
+    valid = prices.notna().to_numpy()
+    first = np.argmax(valid, axis=0)
+    last = _last_valid_positions(prices)
+    dates = prices.index.strftime('%Y-%m-%d')
+    arrays = {name: frame.to_numpy() for name, frame in metrics.items()}
+
+    records = []
+    for j, symbol in enumerate(prices.columns):
+        if last[j] < 0:
+            continue
+        rows = slice(first[j], last[j] + 1)
+        series = {'dates': list(dates[rows])}
+        series.update({name: _to_json_values(arrays[name][rows, j]) for name in METRICS})
+        records.append({'symbol': symbol, 'series': series})
+    return records
@@ -0,0 +1,381 @@
+"""
+Shared Google Sheets Loader
+
+One loader for every indicator that reads Google Sheets:
+
+- Credentials and API clients are built once per credentials file and reused
+  (the Sheets discovery document is the static copy bundled with
+  google-api-python-client, so building a client never hits the network).
+- All ranges an indicator needs are fetched with a single values.batchGet.
+- The raw values are kept in a local snapshot cache that is validated by the
+  spreadsheet's Drive modifiedTime. An unchanged sheet costs one small
+  metadata request and no value reads; with max_age set, a fresh snapshot is
+  used without any request at all.
+- The input sheets are append-only, so when a sheet has changed each cached
+  range is refreshed with a tail read ("fr2!A{n}:F") that re-reads a few
+  overlapping rows to confirm nothing before them moved, and the new rows are
+  appended to the snapshot. Sheet I/O stays constant as the sheets grow; a
+  full read happens only when the overlap doesn't match, for new ranges, or
+  on the periodic full refresh that catches edits further back.
+- A fixture backend reads CSV files from a directory, for tests and offline
+  development (set SHEETS_FIXTURE_DIR to use it automatically).
+"""
+
+import os
+import csv
+import json
+import glob
+import re
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'sheets')
+
+# (creds_file) -> (sheets service, drive service, lock)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _column_number(letters):
+    """Convert a column name like 'A' or 'AB' to a 1-based number"""
+    number = 0
+    for char in letters.upper():
+        number = number * 26 + (ord(char) - ord('A') + 1)
+    return number
+
+
+def _column_letters(number):
+    """Convert a 1-based column number to its name ('A', 'AB', ...)"""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def parse_a1_range(range_name):
+    """
+    Split an A1 range into its parts.
+
+    Examples: "fr2!A:F", "fr2!A120:F", "'Complete AVS'"
+
+    Returns:
+        dict: sheet, first_col, last_col, first_row, last_row (1-based;
+            None means unbounded)
+    """
+    sheet, _, cells = range_name.partition('!')
+    sheet = sheet.strip()
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+
+    parts = {'sheet': sheet, 'first_col': None, 'last_col': None, 'first_row': None, 'last_row': None}
+    if not cells:
+        return parts
+
+    start, _, end = cells.partition(':')
+    for cell, col_key, row_key in ((start, 'first_col', 'first_row'), (end or start, 'last_col', 'last_row')):
+        match = re.match(r'^([A-Za-z]*)(\d*)$', cell.strip())
+        if not match:
+            raise ValueError(f"Unsupported A1 range: {range_name}")
+        letters, digits = match.groups()
+        parts[col_key] = _column_number(letters) if letters else None
+        parts[row_key] = int(digits) if digits else None
+    return parts
+
+
+def quote_sheet_name(name):
+    """Quote a worksheet name for use in an A1 range"""
+    return "'" + name.replace("'", "''") + "'"
+
+
+def _trim_row(row):
+    """Drop trailing empty cells"""
+    end = len(row)
+    while end and row[end - 1] == '':
+        end -= 1
+    return row[:end]
+
+
+class GoogleSheetsBackend:
+    """Reads values through the Google Sheets and Drive APIs"""
+
+    def __init__(self, spreadsheet_id, creds_file):
+        self.spreadsheet_id = spreadsheet_id
+        self.creds_file = creds_file
+
+    def _client(self):
+        with _clients_lock:
+            if self.creds_file not in _clients:
+                from google.oauth2 import service_account
+                from googleapiclient.discovery import build
+
+                logger.info(f"Authorizing Google API client for {self.creds_file}")
+                creds = service_account.Credentials.from_service_account_file(self.creds_file, scopes=SCOPES)
+                sheets = build('sheets', 'v4', credentials=creds, static_discovery=True, cache_discovery=False)
+                drive = build('drive', 'v3', credentials=creds, static_discovery=True, cache_discovery=False)
+                _clients[self.creds_file] = (sheets, drive, threading.Lock())
+            return _clients[self.creds_file]
+
+    def modified_time(self):
+        """Drive modifiedTime of the spreadsheet, or None if it can't be read"""
+        _, drive, lock = self._client()
+        try:
+            with lock:
+                meta = drive.files().get(fileId=self.spreadsheet_id, fields='modifiedTime',
+                                         supportsAllDrives=True).execute()
+            return meta.get('modifiedTime')
+        except Exception as e:
+            logger.warning(f"Could not read modifiedTime for {self.spreadsheet_id}: {e}")
+            return None
+
+    def batch_get(self, ranges):
+        """Fetch several ranges in one request, returning {range: rows}"""
+        sheets, _, lock = self._client()
+        with lock:
+            result = sheets.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id, ranges=list(ranges)
+            ).execute()
+        value_ranges = result.get('valueRanges', [])
+        return {name: value_range.get('values', []) for name, value_range in zip(ranges, value_ranges)}
+
+
+class FixtureSheetBackend:
+    """
+    Reads values from '<directory>/<sheet name>.csv' files.
+
+    The modified time is the newest CSV mtime, so editing a fixture invalidates
+    the snapshot cache just like editing the real sheet.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def modified_time(self):
+        paths = glob.glob(os.path.join(self.directory, '*.csv'))
+        return str(max(os.path.getmtime(p) for p in paths)) if paths else None
+
+    def _read_sheet(self, sheet):
+        path = os.path.join(self.directory, f"{sheet}.csv")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No fixture for sheet '{sheet}' at {path}")
+        with open(path, newline='', encoding='utf-8') as f:
+            return [row for row in csv.reader(f)]
+
+    def batch_get(self, ranges):
+        values = {}
+        for range_name in ranges:
+            parts = parse_a1_range(range_name)
+            rows = self._read_sheet(parts['sheet'])
+
+            first_row = (parts['first_row'] or 1) - 1
+            last_row = parts['last_row'] or len(rows)
+            first_col = (parts['first_col'] or 1) - 1
+            last_col = parts['last_col']
+
+            # Like the API, drop trailing empty cells and rows
+            selected = [_trim_row(row[first_col:last_col]) for row in rows[first_row:last_row]]
+            while selected and not selected[-1]:
+                selected.pop()
+            values[range_name] = selected
+        return values
+
+
+class SheetLoader:
+    """
+    Batched, cached reader for one spreadsheet.
+
+    Args:
+        spreadsheet_id (str): Spreadsheet key
+        creds_file (str): Service account JSON file
+        backend: Optional backend override (defaults to Google, or the fixture
+            backend when SHEETS_FIXTURE_DIR is set)
+        cache_dir (str): Directory for snapshot files (None disables the cache)
+        max_age (float): Seconds during which a snapshot is trusted without
+            checking modifiedTime (None always checks)
+        incremental (bool): Refresh changed ranges with tail reads
+        overlap (int): Cached rows re-read at the start of each tail read
+        full_refresh_days (float): Force a full read of a range this often
+    """
+
+    def __init__(self, spreadsheet_id, creds_file=None, backend=None, cache_dir=DEFAULT_CACHE_DIR, max_age=None,
+                 incremental=True, overlap=3, full_refresh_days=7):
+        self.spreadsheet_id = spreadsheet_id
+        if backend is None:
+            fixture_dir = os.environ.get('SHEETS_FIXTURE_DIR')
+            backend = FixtureSheetBackend(fixture_dir) if fixture_dir else GoogleSheetsBackend(spreadsheet_id, creds_file)
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.incremental = incremental
+        self.overlap = overlap
+        self.full_refresh_days = full_refresh_days
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.cache_dir, f"{self.spreadsheet_id}.json")
+
+    def _read_snapshot(self):
+        if not self.cache_dir or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable sheet snapshot {self.snapshot_path}: {e}")
+            return None
+
+    def _write_snapshot(self, snapshot):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def version(self):
+        """The spreadsheet version last seen by load() (its modifiedTime)"""
+        snapshot = self._read_snapshot()
+        return snapshot.get('modified_time') if snapshot else None
+
+    def load(self, ranges):
+        """
+        Load raw values for several ranges.
+
+        Args:
+            ranges (list): A1 ranges, e.g. ['cleaned_price_data!A:E', 'fr2!A:F']
+
+        Returns:
+            dict: range -> list of rows (first row is the header)
+        """
+        ranges = list(ranges)
+        with self._lock:
+            snapshot = self._read_snapshot() or {'modified_time': None, 'ranges': {}}
+            cached = snapshot.get('ranges', {})
+            have_all = all(r in cached for r in ranges)
+
+            if have_all and self.max_age is not None:
+                age = time.time() - os.path.getmtime(self.snapshot_path)
+                if age < self.max_age:
+                    logger.info(f"Using sheet snapshot ({age:.0f}s old) for {ranges}")
+                    return {r: cached[r] for r in ranges}
+
+            modified = self.backend.modified_time()
+            if have_all and modified is not None and modified == snapshot.get('modified_time'):
+                logger.info(f"Sheet unchanged since {modified}, using snapshot for {ranges}")
+                os.utime(self.snapshot_path)
+                return {r: cached[r] for r in ranges}
+
+            # Sheet changed (or unknown): bring every cached range up to date in one request
+            wanted = ranges + [r for r in cached if r not in ranges]
+            values, state = self._refresh(wanted, cached, snapshot.get('state', {}))
+
+            self._write_snapshot({'modified_time': modified, 'ranges': values, 'state': state})
+            return {r: values[r] for r in ranges}
+
+    def load_tail(self, ranges, rows):
+        """
+        Load the header and the last rows of several ranges.
+
+        Goes through load(), so an unchanged sheet is served from the snapshot
+        and a changed one costs only a tail read, but callers parse just the
+        trailing window instead of the whole history.
+
+        Returns:
+            dict: range -> header row followed by at most rows data rows
+        """
+        values = self.load(ranges)
+        return {r: v[:1] + v[max(1, len(v) - rows):] for r, v in values.items()}
+
+    def _tail_range(self, range_name, values, state, now):
+        """
+        The A1 range covering the overlap rows and anything appended after
+        them, or None when the range has to be read in full.
+        """
+        if not self.incremental or not values or not state:
+            return None
+        if now - state.get('full_read_at', 0) > self.full_refresh_days * 86400:
+            return None
+
+        parts = parse_a1_range(range_name)
+        if parts['first_row'] not in (None, 1) or parts['last_row'] is not None:
+            return None
+
+        start_row = len(values) - self.overlap + 1
+        if start_row < 2:
+            return None
+
+        first_col = parts['first_col'] or 1
+        last_col = parts['last_col'] or (first_col + len(values[0]) - 1)
+        sheet = range_name.partition('!')[0]
+        return f"{sheet}!{_column_letters(first_col)}{start_row}:{_column_letters(last_col)}"
+
+    def _merge_tail(self, values, tail):
+        """Append the rows after the overlap, or None if the overlap changed"""
+        if len(tail) < self.overlap or tail[:self.overlap] != values[-self.overlap:]:
+            return None
+        return values + tail[self.overlap:]
+
+    def _refresh(self, wanted, cached, state):
+        """
+        Read the given ranges, using tail reads where the cache allows it.
+
+        The overlap check in _merge_tail() is what detects a rewritten tail;
+        the per-range state only records when the range was last read in full.
+
+        Returns:
+            tuple: (range -> rows, range -> {'full_read_at': ...})
+        """
+        now = time.time()
+        tails = {r: self._tail_range(r, cached.get(r), state.get(r), now) for r in wanted}
+        request = [tails[r] or r for r in wanted]
+        logger.info(f"Loading data from Google Sheets: {request}")
+        fetched = self.backend.batch_get(request)
+
+        values, new_state, full = {}, {}, []
+        for r in wanted:
+            if tails[r] is None:
+                values[r] = fetched[r]
+                new_state[r] = {'full_read_at': now}
+                continue
+
+            merged = self._merge_tail(cached[r], fetched[tails[r]])
+            if merged is None:
+                full.append(r)
+                continue
+            appended = len(merged) - len(cached[r])
+            logger.info(f"{r}: {appended} new row(s) after row {len(cached[r])}")
+            values[r] = merged
+            new_state[r] = {'full_read_at': state[r]['full_read_at']}
+
+        if full:
+            logger.info(f"Earlier rows changed, re-reading in full: {full}")
+            fetched = self.backend.batch_get(full)
+            for r in full:
+                values[r] = fetched[r]
+                new_state[r] = {'full_read_at': now}
+
+        return values, new_state
+
+
+def pad_rows(values):
+    """
+    Split header and rows, padding short rows to the header width.
+
+    The API omits trailing empty cells, so rows can be ragged.
+    """
+    if not values:
+        return [], []
+    header = values[0]
+    width = len(header)
+    rows = [row[:width] + [''] * (width - len(row)) for row in values[1:]]
+    return header, rows
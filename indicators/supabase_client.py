@@ -0,0 +1,73 @@
+"""
+Shared Supabase client helper
+
+Resolves Supabase credentials the same way the indicator modules do: first from
+the environment (CI secrets), then from a local .env.local file.
+"""
+
+import os
+import re
+import logging
+from supabase import create_client
+
+logger = logging.getLogger(__name__)
+
+URL_KEYS = ["SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_URL"]
+KEY_KEYS = ["SUPABASE_KEY", "SUPABASE_SERVICE_ROLE_KEY", "NEXT_PUBLIC_SUPABASE_ANON_KEY"]
+
+
+def read_env_local(path='.env.local'):
+    """
+    Read KEY=value pairs from a .env.local file.
+
+    Args:
+        path (str): Path to the env file
+
+    Returns:
+        dict: The variables found in the file (empty if the file is missing)
+    """
+    values = {}
+    if not os.path.exists(path):
+        return values
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    match = re.match(r'^([A-Za-z0-9_]+)=(.*)$', line)
+                    if match:
+                        key, value = match.groups()
+                        values[key] = value
+    except Exception as e:
+        logger.warning(f"Error reading {path} file: {e}")
+    return values
+
+
+def get_supabase_credentials():
+    """
+    Look up the Supabase URL and key.
+
+    Returns:
+        tuple: (url, key), either of which may be None
+    """
+    supabase_url = next((os.environ[k] for k in URL_KEYS if os.environ.get(k)), None)
+    supabase_key = next((os.environ[k] for k in KEY_KEYS if os.environ.get(k)), None)
+
+    if not supabase_url or not supabase_key:
+        logger.info("Trying to read Supabase credentials from .env.local")
+        local = read_env_local()
+        supabase_url = supabase_url or next((local[k] for k in URL_KEYS if local.get(k)), None)
+        supabase_key = supabase_key or next((local[k] for k in KEY_KEYS if local.get(k)), None)
+
+    return supabase_url, supabase_key
+
+
+def get_supabase_client():
+    """Create and return a Supabase client using environment variables or .env.local"""
+    supabase_url, supabase_key = get_supabase_credentials()
+    if not supabase_url or not supabase_key:
+        logger.error("Supabase credentials not found in environment variables or .env.local")
+        raise ValueError("Supabase credentials required")
+
+    logger.info(f"Creating Supabase client with URL: {supabase_url[:20]}...")
+    return create_client(supabase_url, supabase_key)
@@ -0,0 +1,142 @@
+"""
+Indicator Variants
+
+Helpers for producing every period/theme combination of an indicator from a
+single computation pass.
+
+- The indicator series are computed once over the full history; each period is
+  a positional slice found with a binary search on the (sorted) date index.
+  Periods end at the data's last timestamp rather than the wall clock, so the
+  figures depend only on the inputs (see fingerprint.py).
+- Figures are built theme-neutral and each theme is applied afterwards as an
+  overlay of layout properties and a few per-trace properties, so the data
+  arrays are shared between the light and dark variants.
+- variant_rows() turns the result into rows for one bulk upsert into
+  indicator_variants, keeping only the variants whose content hash differs
+  from the stored one. The default all/light figure is the indicators row's
+  own plotly_json and is not stored again.
+"""
+
+import hashlib
+import logging
+import pandas as pd
+from datetime import datetime, timedelta
+
+from .figure_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_TABLE = "indicator_variants"
+
+PERIODS = ('7d', '14d', '30d', '90d', '180d', '1y', 'all')
+THEMES = ('light', 'dark')
+
+# Stored as the indicators row's figure, not in indicator_variants
+DEFAULT_VARIANT = ('all', 'light')
+
+# Look-back of each period (None = the whole history)
+PERIOD_DAYS = {'7d': 7, '14d': 14, '30d': 30, '90d': 90, '180d': 180, '1y': 365, 'all': None}
+
+
+def data_end(frame):
+    """Last timestamp of a date-indexed frame, the end of its periods (now if empty)"""
+    return datetime.now() if frame.empty else frame.index[-1]
+
+
+def period_start(period, now=None):
+    """First timestamp of a period ending at now (the current time if None; None for 'all')"""
+    days = PERIOD_DAYS.get(period)
+    if days is None:
+        return None
+    return (now or datetime.now()) - timedelta(days=days)
+
+
+def slice_from(frame, start):
+    """
+    Rows of a date-indexed frame from start onwards.
+
+    Uses a binary search on a sorted index and falls back to a mask otherwise.
+    """
+    if start is None or frame.empty:
+        return frame
+    start = pd.Timestamp(start)
+    if frame.index.is_monotonic_increasing:
+        return frame.iloc[frame.index.searchsorted(start):]
+    return frame[frame.index >= start]
+
+
+def period_slices(frame, periods=PERIODS, now=None):
+    """{period: rows of frame in that period}, all sharing the frame's data and ending at its last row"""
+    now = now or data_end(frame)
+    return {period: slice_from(frame, period_start(period, now)) for period in periods}
+
+
+def _merge(base, overlay):
+    """Recursively merge overlay into a copy of base"""
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def apply_theme(figure, overlay):
+    """
+    A themed copy of a figure dict.
+
+    Args:
+        figure (dict): Theme-neutral figure dict
+        overlay (dict): {'layout': {...}, 'traces': {trace index: {...}}}
+
+    Returns:
+        dict: Figure with the overlay merged in; untouched traces and all data
+            arrays are shared with the input
+    """
+    data = list(figure.get('data', []))
+    for index, props in overlay.get('traces', {}).items():
+        data[index] = _merge(data[index], props)
+    return {**figure, 'data': data, 'layout': _merge(figure.get('layout', {}), overlay.get('layout', {}))}
+
+
+def content_hash(figure):
+    """Short hash of a figure dict's JSON encoding"""
+    return hashlib.sha256(dumps(figure).encode('utf-8')).hexdigest()[:16]
+
+
+def stored_hashes(supabase, indicator_name):
+    """{(period, theme): content_hash} of the stored variants ({} if unreadable)"""
+    try:
+        rows = supabase.table(VARIANT_TABLE).select("period,theme,content_hash") \
+            .eq("indicator_name", indicator_name).execute().data
+    except Exception as e:
+        logger.warning(f"Could not read the stored variant hashes for {indicator_name}: {e}")
+        return {}
+    return {(row['period'], row['theme']): row.get('content_hash') for row in rows}
+
+
+def variant_rows(indicator_name, variants, date, stored=None):
+    """
+    Rows for the indicator_variants table.
+
+    Args:
+        indicator_name (str): Indicator the variants belong to
+        variants (dict): {(period, theme): figure dict}
+        date (str): Date to store with the rows
+        stored (dict): {(period, theme): content_hash} already stored; the
+            variants matching it are left out
+
+    Returns:
+        list: One row per changed variant, without DEFAULT_VARIANT
+    """
+    stored = stored or {}
+    rows = []
+    for (period, theme), figure in variants.items():
+        if (period, theme) == DEFAULT_VARIANT:
+            continue
+        digest = content_hash(figure)
+        if stored.get((period, theme)) != digest:
+            rows.append({'indicator_name': indicator_name, 'period': period, 'theme': theme, 'date': date,
+                         'plotly_json': figure, 'content_hash': digest})
+    return rows
@@ -0,0 +1,35 @@
+import axios from 'axios'
+
+// Precomputed first-load view of the dashboard, rewritten by every ingest run
+// (see indicators/dashboard_snapshot.py): the default coins' series, the
+// ranked coin list and the coins' stats in one document.
+
+export interface DashboardSnapshot {
+  version: string
+  generated_at: string
+  default: { coins: string[]; range: string; start: string; end: string }
+  coins: { symbol: string; rank: number }[]
+  series: { prices: any[]; 'market-caps': any[]; volumes: any[] }
+  stats: { [symbol: string]: any }
+}
+
+let snapshotRequest: Promise<DashboardSnapshot | null> | null = null
+
+// Fetched once per page load and shared by everything that can use it;
+// null if there is no snapshot
+export function getSnapshot(): Promise<DashboardSnapshot | null> {
+  if (!snapshotRequest) {
+    snapshotRequest = axios
+      .get('/api/crypto/snapshot')
+      .then(response => response.data as DashboardSnapshot)
+      .catch(() => null)
+  }
+  return snapshotRequest
+}
+
+// Whether the snapshot holds the data of this selection
+export function snapshotCovers(snapshot: DashboardSnapshot | null, coins: string[], range: string): boolean {
+  if (!snapshot || snapshot.default.range !== range) return false
+  const defaultCoins = snapshot.default.coins
+  return defaultCoins.length === coins.length && defaultCoins.every((coin, i) => coin === coins[i])
+}
@@ -0,0 +1,92 @@
+import { supabase } from './supabase'
+
+// Indicator figures are stored as a base figure (indicators.plotly_json, which
+// includes every patch up to figure_seq) plus small daily patches in
+// `indicator_figure_patches`. This mirrors indicators/figure_patches.py.
+
+interface TraceChange {
+  trace: number
+  path: string
+  start: number
+  values: any
+}
+
+interface FigurePatch {
+  traces: TraceChange[]
+  layout: Record<string, any>
+}
+
+const TYPED_ARRAYS: Record<string, any> = {
+  f4: Float32Array,
+  f8: Float64Array,
+  i1: Int8Array,
+  u1: Uint8Array,
+  i2: Int16Array,
+  u2: Uint16Array,
+  i4: Int32Array,
+  u4: Uint32Array,
+}
+
+function decode(value: any): any[] {
+  if (!value || typeof value !== 'object' || !('bdata' in value)) return value || []
+  const binary = atob(value.bdata)
+  const bytes = new Uint8Array(binary.length)
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i)
+  return Array.from(new TYPED_ARRAYS[value.dtype](bytes.buffer))
+}
+
+// value[:start] + tail, as a plain array (plotly.js accepts either form)
+function splice(value: any, start: number, tail: any) {
+  return decode(value).slice(0, start).concat(decode(tail))
+}
+
+export function applyPatch(figure: any, patch: FigurePatch) {
+  const data = [...figure.data]
+  for (const change of patch.traces || []) {
+    const path = change.path.split('.')
+    const trace = { ...data[change.trace] }
+    let target = trace
+    for (const key of path.slice(0, -1)) {
+      target[key] = { ...(target[key] || {}) }
+      target = target[key]
+    }
+    const key = path[path.length - 1]
+    target[key] = splice(target[key], change.start, change.values)
+    data[change.trace] = trace
+  }
+
+  const layout = { ...figure.layout }
+  for (const [key, value] of Object.entries(patch.layout || {})) {
+    if (value === null) delete layout[key]
+    else layout[key] = value
+  }
+  return { ...figure, data, layout }
+}
+
+export function reassemble(base: any, patches: FigurePatch[]) {
+  return patches.reduce(applyPatch, base)
+}
+
+// The indicators row with its figure brought up to date
+export async function fetchIndicatorRow(indicatorName: string) {
+  const { data: row, error } = await supabase
+    .from('indicators')
+    .select('*')
+    .eq('indicator_name', indicatorName)
+    .order('date', { ascending: false })
+    .limit(1)
+    .single()
+
+  if (error) throw error
+
+  const { data: patches, error: patchError } = await supabase
+    .from('indicator_figure_patches')
+    .select('seq, patch')
+    .eq('indicator_name', indicatorName)
+    .gt('seq', row.figure_seq || 0)
+    .order('seq', { ascending: true })
+
+  if (patchError) throw patchError
+  if (!patches || !patches.length) return row
+  return { ...row, plotly_json: reassemble(row.plotly_json, patches.map((p: any) => p.patch)) }
+}
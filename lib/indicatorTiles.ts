@@ -0,0 +1,105 @@
+import { useCallback, useEffect, useRef, useState } from 'react'
+import { supabase } from './supabase'
+
+// Stored indicator figures hold a downsampled overview of the full history.
+// Full-resolution yearly tiles live in `indicator_tiles` and are swapped in
+// when the user zooms into a range short enough to benefit from them.
+
+export interface FigureTile {
+  tile: number
+  x0: string
+  x1: string
+  traces: Record<string, any>[]
+}
+
+// Zoom spans wider than this keep using the overview
+const MAX_TILE_SPAN_DAYS = 3 * 366
+
+// Fetch the tiles overlapping [start, end)
+export async function fetchTiles(indicatorName: string, start: string, end: string): Promise<FigureTile[]> {
+  const { data, error } = await supabase
+    .from('indicator_tiles')
+    .select('tile, x0, x1, traces')
+    .eq('indicator_name', indicatorName)
+    .lt('x0', end)
+    .gt('x1', start)
+    .order('tile', { ascending: true })
+
+  if (error) throw error
+  return (data || []) as FigureTile[]
+}
+
+function concatPoints(parts: Record<string, any>[]) {
+  const merged: Record<string, any> = {}
+  for (const part of parts) {
+    for (const [key, value] of Object.entries(part)) {
+      if (Array.isArray(value)) {
+        merged[key] = (merged[key] || []).concat(value)
+      } else if (value && typeof value === 'object') {
+        merged[key] = concatPoints([merged[key] || {}, value])
+      }
+    }
+  }
+  return merged
+}
+
+// Replace each trace's points with the points from the given tiles
+export function applyTiles(figure: any, tiles: FigureTile[]) {
+  if (!tiles.length) return figure
+  const data = figure.data.map((trace: any, i: number) => {
+    const points = concatPoints(tiles.map((tile) => tile.traces[i] || {}))
+    if (!points.x) return trace
+    const { marker, ...rest } = points
+    return {
+      ...trace,
+      ...rest,
+      ...(marker ? { marker: { ...(trace.marker || {}), ...marker } } : {}),
+    }
+  })
+  return { ...figure, data }
+}
+
+function relayoutRange(event: Record<string, any>): [string, string] | null | undefined {
+  for (const axis of ['xaxis', 'xaxis2']) {
+    if (event[`${axis}.autorange`]) return null
+    const range = event[`${axis}.range`] || [event[`${axis}.range[0]`], event[`${axis}.range[1]`]]
+    if (range[0] !== undefined && range[1] !== undefined) return [String(range[0]), String(range[1])]
+  }
+  return undefined
+}
+
+// Overview figure that swaps in full-resolution tiles on zoom
+export function useFigureTiles(indicatorName: string, overview: any) {
+  const [figure, setFigure] = useState(overview)
+  const request = useRef(0)
+
+  useEffect(() => setFigure(overview), [overview])
+
+  const onRelayout = useCallback(async (event: Record<string, any>) => {
+    if (!overview) return
+    const range = relayoutRange(event)
+    if (range === undefined) return
+
+    const id = ++request.current
+    if (range === null) {
+      setFigure(overview)
+      return
+    }
+
+    const [start, end] = range.map((value) => value.slice(0, 10))
+    const spanDays = (Date.parse(end) - Date.parse(start)) / 86400000
+    if (!(spanDays < MAX_TILE_SPAN_DAYS)) {
+      setFigure(overview)
+      return
+    }
+
+    try {
+      const tiles = await fetchTiles(indicatorName, start, end)
+      if (id === request.current) setFigure(applyTiles(overview, tiles))
+    } catch (err) {
+      console.error(`Error fetching tiles for ${indicatorName}:`, err)
+    }
+  }, [indicatorName, overview])
+
+  return { figure, onRelayout }
+}
@@ -0,0 +1,90 @@
+import { supabase } from './supabase'
+
+// The daily market tables have weekly and monthly rollups in
+// `<table>_rollups` (see migrations/006_market_rollups.sql, maintained by
+// indicators/market_rollups.py). Ranges longer than a year are served from
+// them, 7-30x fewer rows than the daily series.
+
+export type MarketTable = 'crypto_prices' | 'crypto_market_caps' | 'crypto_volumes'
+export type Interval = 'day' | 'week' | 'month'
+
+// Ranges longer than these (in days) use weekly / monthly points
+const WEEKLY_AFTER_DAYS = 366
+const MONTHLY_AFTER_DAYS = 3 * 366
+
+// The explicitly requested interval, or one that suits the range
+export function pickInterval(start: string, end: string, requested?: string | null): Interval {
+  if (requested === 'day' || requested === 'week' || requested === 'month') return requested
+  const days = (Date.parse(end) - Date.parse(start)) / 86400000
+  if (days > MONTHLY_AFTER_DAYS) return 'month'
+  if (days > WEEKLY_AFTER_DAYS) return 'week'
+  return 'day'
+}
+
+async function fetchDaily(table: MarketTable, coins: string[], start: string, end: string) {
+  const { data, error } = await supabase
+    .from(table)
+    .select('date, prices')
+    .gte('date', start)
+    .lte('date', end)
+    .order('date', { ascending: true })
+
+  if (error) throw error
+
+  // Extract only the requested coins
+  return (data || []).map(row => {
+    const point: any = { date: row.date }
+    coins.forEach(coin => {
+      if (row.prices[coin] !== undefined) {
+        point[coin] = row.prices[coin]
+      }
+    })
+    return point
+  })
+}
+
+async function fetchRollups(table: MarketTable, coins: string[], start: string, end: string, interval: Interval) {
+  const { data, error } = await supabase
+    .from(`${table}_rollups`)
+    .select('last_date, days, stats')
+    .eq('period', interval)
+    .gte('last_date', start)
+    .lte('date', end)
+    .order('date', { ascending: true })
+
+  if (error) throw error
+
+  // One point per period, on its last day: the closing price / market cap,
+  // and volumes as the period's daily average so the scale matches the
+  // daily series
+  return (data || []).map(row => {
+    const point: any = { date: row.last_date }
+    coins.forEach(coin => {
+      const value = row.stats[coin]
+      if (value !== undefined) {
+        point[coin] = typeof value === 'object' ? value.last : value / row.days
+      }
+    })
+    return point
+  })
+}
+
+// { date, [coin]: value } points of a market table between start and end
+export async function fetchMarketSeries(
+  table: MarketTable,
+  coins: string[],
+  start: string,
+  end: string,
+  interval: Interval
+): Promise<Record<string, any>[]> {
+  if (interval !== 'day') {
+    try {
+      const points = await fetchRollups(table, coins, start, end, interval)
+      if (points.length > 0) return points
+    } catch (error) {
+      // Rollups not set up yet: fall back to the daily rows
+      console.error(`Failed to read ${table} rollups:`, error)
+    }
+  }
+  return fetchDaily(table, coins, start, end)
+}
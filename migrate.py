@@ -0,0 +1,73 @@
+import sys
+import logging
+import argparse
+
+from indicators.schema import (connect, load_migrations, applied_migrations, migrate,
+                               maintain_partitions, verify)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger("migrate")
+
+
+def show_status(conn):
+    """Log which migrations are applied"""
+    applied = applied_migrations(conn)
+    for version, name, _, checksum in load_migrations():
+        if version not in applied:
+            state = "pending"
+        elif applied[version] != checksum:
+            state = "applied (file changed since)"
+        else:
+            state = "applied"
+        logger.info(f"{version}_{name}: {state}")
+
+
+def run_checks(conn):
+    """Log the EXPLAIN checks; True if all of them pass"""
+    results = verify(conn)
+    for description, ok, message in results:
+        (logger.info if ok else logger.error)(f"{'OK  ' if ok else 'FAIL'} {description}: {message}")
+    return all(ok for _, ok, _ in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the schema migrations in migrations/")
+    parser.add_argument("--status", action="store_true", help="Only show which migrations are applied")
+    parser.add_argument("--dry-run", action="store_true", help="Show the pending migrations without applying them")
+    parser.add_argument("--verify", action="store_true",
+                        help="Check with EXPLAIN that the hot queries use their indexes and partitions")
+    args = parser.parse_args()
+
+    try:
+        conn = connect()
+    except Exception as e:
+        logger.error(f"Could not connect to the database: {e}")
+        return False
+
+    try:
+        if args.status:
+            show_status(conn)
+            return True
+
+        migrate(conn, dry_run=args.dry_run)
+        if args.dry_run:
+            return True
+        maintain_partitions(conn)
+
+        if args.verify:
+            return run_checks(conn)
+        return True
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,43 @@
+-- Tables the ingest and indicator jobs read and write, as they exist in the
+-- production database. Everything here is IF NOT EXISTS, so this is a no-op
+-- there and creates a working schema on a fresh database or a local stand-in.
+
+CREATE TABLE IF NOT EXISTS crypto_prices (
+  date DATE PRIMARY KEY,
+  prices JSONB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS crypto_market_caps (
+  date DATE PRIMARY KEY,
+  prices JSONB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS crypto_volumes (
+  date DATE PRIMARY KEY,
+  prices JSONB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS crypto_rankings (
+  date DATE PRIMARY KEY,
+  rankings JSONB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tracked_coins (
+  symbol TEXT PRIMARY KEY,
+  id TEXT NOT NULL,
+  first_tracked DATE,
+  last_in_top100 DATE,
+  active BOOLEAN DEFAULT true
+);
+
+-- Keyed by date (upload_indicators upserts on it); indicator_name, version,
+-- figure_seq and input_fingerprint come with the later migrations
+CREATE TABLE IF NOT EXISTS indicators (
+  date DATE PRIMARY KEY,
+  indicator_name TEXT,
+  data JSONB,
+  plotly_json JSONB,
+  latest_data JSONB,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
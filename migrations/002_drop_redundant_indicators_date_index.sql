@@ -0,0 +1,5 @@
+-- better_indicators_table.sql created idx_indicators_date on top of the
+-- primary key on date, which already is a btree index on that column. The
+-- second index only costs space and write time.
+
+DROP INDEX IF EXISTS idx_indicators_date;
@@ -0,0 +1,91 @@
+-- Yearly range partitions for the wide market tables.
+--
+-- crypto_prices, crypto_market_caps and crypto_volumes become tables
+-- partitioned by RANGE (date), with one partition per year and a default
+-- partition for anything outside them. Date-range reads only touch the years
+-- they ask for. The tables keep their names, columns, primary key on date, row
+-- level security settings and policies, so readers and writers (including
+-- merge_market_rows()) don't change.
+--
+-- create_yearly_partition() is also called by migrate.py on every run, so the
+-- current and the next year always have their own partition.
+
+CREATE OR REPLACE FUNCTION create_yearly_partition(p_table TEXT, p_year INT)
+RETURNS VOID AS $$
+DECLARE
+  part TEXT := format('%s_%s', p_table, p_year);
+  lo DATE := make_date(p_year, 1, 1);
+  hi DATE := make_date(p_year + 1, 1, 1);
+BEGIN
+  IF to_regclass(format('public.%I', part)) IS NOT NULL THEN
+    RETURN;
+  END IF;
+
+  EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', part, p_table);
+  EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', part);
+
+  -- Rows of that year that landed in the default partition move over first
+  IF to_regclass(format('public.%I', p_table || '_default')) IS NOT NULL THEN
+    EXECUTE format('WITH moved AS (DELETE FROM %I WHERE date >= %L AND date < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                   p_table || '_default', lo, hi, part);
+  END IF;
+
+  EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', p_table, part, lo, hi);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION partition_by_year(p_table TEXT)
+RETURNS VOID AS $$
+DECLARE
+  old TEXT := p_table || '_unpartitioned';
+  pkey TEXT;
+  rls BOOLEAN;
+  pol RECORD;
+  first_year INT;
+  last_year INT;
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = format('public.%I', p_table)::regclass) THEN
+    RETURN;
+  END IF;
+
+  -- Keep the old table aside (its primary key name must be freed as well)
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, old);
+  SELECT conname INTO pkey FROM pg_constraint WHERE conrelid = format('public.%I', old)::regclass AND contype = 'p';
+  IF pkey IS NOT NULL THEN
+    EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', old, pkey, old || '_pkey');
+  END IF;
+
+  EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE (date)', p_table, old);
+  EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (date)', p_table);
+  EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p_table || '_default', p_table);
+  EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', p_table || '_default');
+
+  EXECUTE format('SELECT extract(year FROM min(date))::int, extract(year FROM max(date))::int FROM %I', old)
+    INTO first_year, last_year;
+  FOR y IN COALESCE(first_year, extract(year FROM now())::int)
+        .. GREATEST(COALESCE(last_year, 0), extract(year FROM now())::int + 1) LOOP
+    PERFORM create_yearly_partition(p_table, y);
+  END LOOP;
+
+  EXECUTE format('INSERT INTO %I SELECT * FROM %I', p_table, old);
+
+  -- Same row level security and policies as before
+  SELECT relrowsecurity INTO rls FROM pg_class WHERE oid = format('public.%I', old)::regclass;
+  IF rls THEN
+    EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', p_table);
+  END IF;
+  FOR pol IN SELECT * FROM pg_policies WHERE schemaname = 'public' AND tablename = old LOOP
+    EXECUTE format('CREATE POLICY %I ON %I AS %s FOR %s TO %s%s%s',
+                   pol.policyname, p_table, pol.permissive, pol.cmd,
+                   (SELECT string_agg(quote_ident(r), ', ') FROM unnest(pol.roles) AS r),
+                   CASE WHEN pol.qual IS NOT NULL THEN format(' USING (%s)', pol.qual) ELSE '' END,
+                   CASE WHEN pol.with_check IS NOT NULL THEN format(' WITH CHECK (%s)', pol.with_check) ELSE '' END);
+  END LOOP;
+
+  EXECUTE format('DROP TABLE %I', old);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT partition_by_year('crypto_prices');
+SELECT partition_by_year('crypto_market_caps');
+SELECT partition_by_year('crypto_volumes');
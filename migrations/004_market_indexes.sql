@@ -0,0 +1,18 @@
+-- Indexes for the read patterns of the jobs and the dashboard.
+--
+-- - BRIN on date: rows arrive in date order, so a block-range index answers
+--   date-range scans for a few kilobytes (next to the primary key btree, which
+--   serves the point lookups and ON CONFLICT).
+-- - GIN on the JSONB columns: "which dates have this coin" (prices ? 'SOL')
+--   and containment lookups no longer read every row.
+-- - last_in_top100: get_all_active_coins() filters tracked_coins on it.
+
+CREATE INDEX IF NOT EXISTS crypto_prices_date_brin ON crypto_prices USING brin (date);
+CREATE INDEX IF NOT EXISTS crypto_market_caps_date_brin ON crypto_market_caps USING brin (date);
+CREATE INDEX IF NOT EXISTS crypto_volumes_date_brin ON crypto_volumes USING brin (date);
+CREATE INDEX IF NOT EXISTS crypto_rankings_date_brin ON crypto_rankings USING brin (date);
+
+CREATE INDEX IF NOT EXISTS crypto_prices_prices_gin ON crypto_prices USING gin (prices);
+CREATE INDEX IF NOT EXISTS crypto_rankings_rankings_gin ON crypto_rankings USING gin (rankings);
+
+CREATE INDEX IF NOT EXISTS tracked_coins_last_in_top100_idx ON tracked_coins (last_in_top100);
@@ -0,0 +1,41 @@
+-- JSONB merge upsert for the wide market tables
+-- (crypto_prices, crypto_market_caps, crypto_volumes; called by
+-- indicators/bulk_writer.py from top100_supabase.py)
+--
+-- p_rows is a JSON array of {"date": ..., "prices": {symbol: value}} patches.
+-- Each patch is merged into the stored row (prices = prices || patch), so
+-- backfilling one coin or correcting one value only sends those numbers and
+-- coins missing from a patch keep their stored values. Returns the number of
+-- rows written.
+
+CREATE OR REPLACE FUNCTION merge_market_rows(p_table TEXT, p_rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  n INTEGER;
+BEGIN
+  IF p_table NOT IN ('crypto_prices', 'crypto_market_caps', 'crypto_volumes') THEN
+    RAISE EXCEPTION 'merge_market_rows: unsupported table %', p_table;
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO %1$I AS t (date, prices)
+     SELECT date, prices FROM jsonb_populate_recordset(NULL::%1$I, $1)
+     ON CONFLICT (date) DO UPDATE SET prices = COALESCE(t.prices, ''{}''::jsonb) || EXCLUDED.prices',
+    p_table)
+  USING p_rows;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Writes are for the ingest (service role) only
+REVOKE EXECUTE ON FUNCTION merge_market_rows(TEXT, JSONB) FROM PUBLIC;
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+    REVOKE EXECUTE ON FUNCTION merge_market_rows(TEXT, JSONB) FROM anon, authenticated;
+    GRANT EXECUTE ON FUNCTION merge_market_rows(TEXT, JSONB) TO service_role;
+  END IF;
+END;
+$$;
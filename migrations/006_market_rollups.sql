@@ -0,0 +1,32 @@
+-- Weekly and monthly rollups of the wide market tables, maintained by
+-- indicators/market_rollups.py after each ingest and read by the dashboard's
+-- market routes for ranges over a year.
+--
+-- One row per period ('week' starting Monday, or 'month') and period start
+-- date. last_date is the last day the period has data for and days the
+-- number of daily rows behind it. stats holds, per symbol:
+-- - crypto_prices_rollups, crypto_market_caps_rollups:
+--   {"last": ..., "mean": ..., "high": ..., "low": ...}
+-- - crypto_volumes_rollups: the period's total volume
+
+DO $$
+DECLARE
+  t TEXT;
+BEGIN
+  FOREACH t IN ARRAY ARRAY['crypto_prices_rollups', 'crypto_market_caps_rollups', 'crypto_volumes_rollups'] LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS %1$I (
+         period TEXT NOT NULL CHECK (period IN (''week'', ''month'')),
+         date DATE NOT NULL,
+         last_date DATE NOT NULL,
+         days INTEGER NOT NULL,
+         stats JSONB NOT NULL,
+         PRIMARY KEY (period, date)
+       )', t);
+
+    EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', t);
+    EXECUTE format('DROP POLICY IF EXISTS "Allow public read access to %1$s" ON %1$I', t);
+    EXECUTE format('CREATE POLICY "Allow public read access to %1$s" ON %1$I FOR SELECT USING (true)', t);
+  END LOOP;
+END;
+$$;
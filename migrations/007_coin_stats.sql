@@ -0,0 +1,28 @@
+-- Per-coin summary behind the dashboard's statistics cards, written by the
+-- ingest (indicators/coin_stats.py) and read by symbol (/api/crypto/stats).
+--
+-- changes holds the percentage change per value and dashboard range:
+-- {"price": {"7d": ..., "1m": ..., "3m": ..., "6m": ..., "1y": ..., "all": ...},
+--  "market_cap": {...}, "volume": {...}}
+-- drawdown is price / ath - 1 and volatility_30d the annualized volatility
+-- of the last 30 daily log returns.
+
+CREATE TABLE IF NOT EXISTS coin_stats (
+  symbol TEXT PRIMARY KEY,
+  date DATE NOT NULL,
+  price DOUBLE PRECISION,
+  market_cap DOUBLE PRECISION,
+  volume DOUBLE PRECISION,
+  changes JSONB NOT NULL DEFAULT '{}'::jsonb,
+  ath DOUBLE PRECISION,
+  ath_date DATE,
+  drawdown DOUBLE PRECISION,
+  volatility_30d DOUBLE PRECISION
+);
+
+ALTER TABLE coin_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to coin_stats" ON coin_stats;
+CREATE POLICY "Allow public read access to coin_stats"
+  ON coin_stats FOR SELECT
+  USING (true);
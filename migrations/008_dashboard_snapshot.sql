@@ -0,0 +1,19 @@
+-- Precomputed documents served to the dashboard in a single read, written by
+-- the ingest (indicators/dashboard_snapshot.py) and read by
+-- /api/crypto/snapshot. 'default' holds the first-load view: the default
+-- coins' series, the ranked coin list and their stats. version is a content
+-- hash (also in the payload), used as the ETag.
+
+CREATE TABLE IF NOT EXISTS dashboard_snapshots (
+  name TEXT PRIMARY KEY,
+  version TEXT NOT NULL,
+  payload JSONB NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+ALTER TABLE dashboard_snapshots ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to dashboard_snapshots" ON dashboard_snapshots;
+CREATE POLICY "Allow public read access to dashboard_snapshots"
+  ON dashboard_snapshots FOR SELECT
+  USING (true);
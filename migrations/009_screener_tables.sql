@@ -0,0 +1,36 @@
+-- Tables for the cross-sectional screener (screener_supabase.py)
+
+-- Latest value of every screener metric, one row per coin
+CREATE TABLE IF NOT EXISTS screener_latest (
+  symbol TEXT PRIMARY KEY,
+  date DATE NOT NULL,
+  price DOUBLE PRECISION,
+  rsi DOUBLE PRECISION,
+  roc DOUBLE PRECISION,
+  z_score DOUBLE PRECISION,
+  crowding DOUBLE PRECISION,
+  volatility DOUBLE PRECISION,
+  drawdown DOUBLE PRECISION,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- Full per-coin history stored column-wise:
+-- {"dates": [...], "price": [...], "rsi": [...], ...}
+CREATE TABLE IF NOT EXISTS screener_series (
+  symbol TEXT PRIMARY KEY,
+  series JSONB NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+ALTER TABLE screener_latest ENABLE ROW LEVEL SECURITY;
+ALTER TABLE screener_series ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to screener_latest" ON screener_latest;
+CREATE POLICY "Allow public read access to screener_latest"
+  ON screener_latest FOR SELECT
+  USING (true);
+
+DROP POLICY IF EXISTS "Allow public read access to screener_series" ON screener_series;
+CREATE POLICY "Allow public read access to screener_series"
+  ON screener_series FOR SELECT
+  USING (true);
@@ -0,0 +1,24 @@
+-- Full-resolution figure tiles for the funding and AVS indicators
+-- (ci_update_funding.py / ci_update_avs.py)
+--
+-- The plotly_json stored in `indicators` is a downsampled overview of the full
+-- history. Each row here holds the points of every trace for one calendar year:
+-- {"traces": [{"x": [...], "y": [...], ...}, ...]} in figure trace order.
+
+CREATE TABLE IF NOT EXISTS indicator_tiles (
+  indicator_name TEXT NOT NULL,
+  level SMALLINT NOT NULL,
+  tile INTEGER NOT NULL,
+  x0 DATE NOT NULL,
+  x1 DATE NOT NULL,
+  traces JSONB NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  PRIMARY KEY (indicator_name, level, tile)
+);
+
+ALTER TABLE indicator_tiles ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to indicator_tiles" ON indicator_tiles;
+CREATE POLICY "Allow public read access to indicator_tiles"
+  ON indicator_tiles FOR SELECT
+  USING (true);
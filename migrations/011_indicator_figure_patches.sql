@@ -0,0 +1,24 @@
+-- Daily figure patches for the funding and AVS indicators
+-- (indicators/figure_patches.py, read by lib/figurePatches.ts)
+--
+-- The plotly_json in `indicators` is a base figure that includes every patch up
+-- to its figure_seq. Each row here is one later update: the new tail of every
+-- trace array that changed plus any changed layout keys. Readers apply the
+-- patches with seq > figure_seq in order.
+
+ALTER TABLE indicators ADD COLUMN IF NOT EXISTS figure_seq INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS indicator_figure_patches (
+  indicator_name TEXT NOT NULL,
+  seq INTEGER NOT NULL,
+  patch JSONB NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  PRIMARY KEY (indicator_name, seq)
+);
+
+ALTER TABLE indicator_figure_patches ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to indicator_figure_patches" ON indicator_figure_patches;
+CREATE POLICY "Allow public read access to indicator_figure_patches"
+  ON indicator_figure_patches FOR SELECT
+  USING (true);
@@ -0,0 +1,22 @@
+-- Precomputed period/theme variants of the funding and AVS indicator figures
+-- (ci_update_funding.py / ci_update_avs.py, indicators/variants.py)
+--
+-- One row per indicator, period ('7d' ... '1y', 'all') and theme ('light',
+-- 'dark'), all written in a single bulk upsert per update.
+
+CREATE TABLE IF NOT EXISTS indicator_variants (
+  indicator_name TEXT NOT NULL,
+  period TEXT NOT NULL,
+  theme TEXT NOT NULL,
+  date DATE NOT NULL,
+  plotly_json JSONB NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  PRIMARY KEY (indicator_name, period, theme)
+);
+
+ALTER TABLE indicator_variants ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to indicator_variants" ON indicator_variants;
+CREATE POLICY "Allow public read access to indicator_variants"
+  ON indicator_variants FOR SELECT
+  USING (true);
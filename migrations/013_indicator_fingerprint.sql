@@ -0,0 +1,7 @@
+-- Input fingerprint of the stored funding and AVS indicators
+-- (ci_update_funding.py / ci_update_avs.py, indicators/fingerprint.py)
+--
+-- SHA-256 of the loaded sheet data, the parameters and the source of the code
+-- that produced the row. An update whose fingerprint matches is skipped.
+
+ALTER TABLE indicators ADD COLUMN IF NOT EXISTS input_fingerprint TEXT;
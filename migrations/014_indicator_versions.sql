@@ -0,0 +1,62 @@
+-- Atomic, versioned writes of indicators rows
+-- (indicators/indicator_store.py, used by run_indicators.py and the CI updaters)
+--
+-- Every insert or update of an indicators row takes the next value of
+-- indicators_version_seq, so readers can tell which commit they are looking at.
+-- upsert_indicators() writes a whole run's rows in one call: the statement runs
+-- in a single transaction, so readers see either all the old rows or all the
+-- new ones, never a missing row. Keys a row leaves out keep their stored values.
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_indicators_indicator_name ON indicators(indicator_name);
+
+CREATE SEQUENCE IF NOT EXISTS indicators_version_seq;
+
+ALTER TABLE indicators ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_indicator_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.version := nextval('indicators_version_seq');
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS indicators_version ON indicators;
+CREATE TRIGGER indicators_version
+  BEFORE INSERT OR UPDATE ON indicators
+  FOR EACH ROW EXECUTE FUNCTION bump_indicator_version();
+
+CREATE OR REPLACE FUNCTION upsert_indicators(p_rows JSONB)
+RETURNS TABLE(indicator_name TEXT, version BIGINT) AS $$
+#variable_conflict use_column
+DECLARE
+  r JSONB;
+  rec indicators;
+BEGIN
+  FOR r IN SELECT * FROM jsonb_array_elements(p_rows) LOOP
+    rec := jsonb_populate_record(NULL::indicators, r);
+    RETURN QUERY
+    INSERT INTO indicators AS i (indicator_name, date, plotly_json, latest_data, figure_seq, input_fingerprint)
+    VALUES (rec.indicator_name, rec.date, rec.plotly_json, rec.latest_data,
+            COALESCE(rec.figure_seq, 0), rec.input_fingerprint)
+    ON CONFLICT (indicator_name) DO UPDATE SET
+      date = CASE WHEN r ? 'date' THEN EXCLUDED.date ELSE i.date END,
+      plotly_json = CASE WHEN r ? 'plotly_json' THEN EXCLUDED.plotly_json ELSE i.plotly_json END,
+      latest_data = CASE WHEN r ? 'latest_data' THEN EXCLUDED.latest_data ELSE i.latest_data END,
+      figure_seq = CASE WHEN r ? 'figure_seq' THEN EXCLUDED.figure_seq ELSE i.figure_seq END,
+      input_fingerprint = CASE WHEN r ? 'input_fingerprint' THEN EXCLUDED.input_fingerprint ELSE i.input_fingerprint END
+    RETURNING i.indicator_name::TEXT, i.version;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Writes are for the updaters (service role) only
+REVOKE EXECUTE ON FUNCTION upsert_indicators(JSONB) FROM PUBLIC;
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+    REVOKE EXECUTE ON FUNCTION upsert_indicators(JSONB) FROM anon, authenticated;
+    GRANT EXECUTE ON FUNCTION upsert_indicators(JSONB) TO service_role;
+  END IF;
+END;
+$$;
@@ -0,0 +1,19 @@
+-- Static settings and descriptions of indicators stored as daily rows
+-- (indicators/crowding_records.py)
+--
+-- The daily BTC crowding rows in `indicators` carry only that day's values;
+-- the periods, window and description texts that used to be repeated in every
+-- row are stored here once, under name 'crowding'.
+
+CREATE TABLE IF NOT EXISTS indicator_metadata (
+  name TEXT PRIMARY KEY,
+  metadata JSONB NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+ALTER TABLE indicator_metadata ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to indicator_metadata" ON indicator_metadata;
+CREATE POLICY "Allow public read access to indicator_metadata"
+  ON indicator_metadata FOR SELECT
+  USING (true);
@@ -0,0 +1,41 @@
+-- Row keys of `indicators`
+--
+-- The table holds two kinds of rows that share dates:
+-- - one row per named indicator (funding_rate, avs_average,
+--   crowding_sensitivity, ...), written by upsert_indicators() with
+--   indicator_name as the key and the run's date;
+-- - the name-less daily BTC crowding rows (indicators/crowding_records.py),
+--   one per date.
+-- With the primary key on date, the second row dated today failed (and
+-- aborted the run's upsert_indicators() call), while a daily crowding upsert
+-- on date overwrote whichever named row had that date.
+--
+-- Rows get a surrogate id instead. Named rows stay unique by
+-- idx_indicators_indicator_name (014); idx_indicators_name_date makes
+-- (indicator_name, date) unique with NULL names compared as equal, so there
+-- is one daily row per date and the crowding uploads can upsert with
+-- on_conflict=indicator_name,date.
+
+ALTER TABLE indicators ADD COLUMN IF NOT EXISTS id BIGINT GENERATED BY DEFAULT AS IDENTITY;
+
+DO $$
+DECLARE
+  pkey TEXT;
+BEGIN
+  SELECT conname INTO pkey FROM pg_constraint
+  WHERE conrelid = 'indicators'::regclass AND contype = 'p'
+    AND conkey <> ARRAY[(SELECT attnum FROM pg_attribute WHERE attrelid = 'indicators'::regclass AND attname = 'id')];
+  IF pkey IS NOT NULL THEN
+    EXECUTE format('ALTER TABLE indicators DROP CONSTRAINT %I', pkey);
+  END IF;
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'indicators'::regclass AND contype = 'p') THEN
+    ALTER TABLE indicators ADD PRIMARY KEY (id);
+  END IF;
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_indicators_name_date
+  ON indicators(indicator_name, date) NULLS NOT DISTINCT;
+
+-- Date-ordered reads of the daily rows (the primary key used to serve them)
+CREATE INDEX IF NOT EXISTS idx_indicators_date ON indicators(date);
@@ -0,0 +1,50 @@
+-- Figure patches committed together with their indicators rows
+-- (indicators/indicator_store.py, indicators/figure_patches.py)
+--
+-- A daily patch used to be inserted into indicator_figure_patches as soon as
+-- it was computed, before the run committed the indicators row (latest_data,
+-- input_fingerprint) it belongs to, so readers could see a new figure tail
+-- next to the previous row, or a tail whose update later failed.
+-- upsert_indicators() now takes the run's patch rows as well and writes both
+-- in the same transaction.
+
+DROP FUNCTION IF EXISTS upsert_indicators(JSONB);
+
+CREATE OR REPLACE FUNCTION upsert_indicators(p_rows JSONB, p_patches JSONB DEFAULT '[]'::jsonb)
+RETURNS TABLE(indicator_name TEXT, version BIGINT) AS $$
+#variable_conflict use_column
+DECLARE
+  r JSONB;
+  rec indicators;
+BEGIN
+  INSERT INTO indicator_figure_patches (indicator_name, seq, patch)
+  SELECT p.indicator_name, p.seq, p.patch
+  FROM jsonb_to_recordset(COALESCE(p_patches, '[]'::jsonb)) AS p(indicator_name TEXT, seq INTEGER, patch JSONB);
+
+  FOR r IN SELECT * FROM jsonb_array_elements(p_rows) LOOP
+    rec := jsonb_populate_record(NULL::indicators, r);
+    RETURN QUERY
+    INSERT INTO indicators AS i (indicator_name, date, plotly_json, latest_data, figure_seq, input_fingerprint)
+    VALUES (rec.indicator_name, rec.date, rec.plotly_json, rec.latest_data,
+            COALESCE(rec.figure_seq, 0), rec.input_fingerprint)
+    ON CONFLICT (indicator_name) DO UPDATE SET
+      date = CASE WHEN r ? 'date' THEN EXCLUDED.date ELSE i.date END,
+      plotly_json = CASE WHEN r ? 'plotly_json' THEN EXCLUDED.plotly_json ELSE i.plotly_json END,
+      latest_data = CASE WHEN r ? 'latest_data' THEN EXCLUDED.latest_data ELSE i.latest_data END,
+      figure_seq = CASE WHEN r ? 'figure_seq' THEN EXCLUDED.figure_seq ELSE i.figure_seq END,
+      input_fingerprint = CASE WHEN r ? 'input_fingerprint' THEN EXCLUDED.input_fingerprint ELSE i.input_fingerprint END
+    RETURNING i.indicator_name::TEXT, i.version;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Writes are for the updaters (service role) only
+REVOKE EXECUTE ON FUNCTION upsert_indicators(JSONB, JSONB) FROM PUBLIC;
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+    REVOKE EXECUTE ON FUNCTION upsert_indicators(JSONB, JSONB) FROM anon, authenticated;
+    GRANT EXECUTE ON FUNCTION upsert_indicators(JSONB, JSONB) TO service_role;
+  END IF;
+END;
+$$;
@@ -0,0 +1,12 @@
+-- Content hashes of the indicator variants
+-- (indicators/indicator_update.py, indicators/variants.py)
+--
+-- Every update used to re-upload all 14 period/theme variants, including an
+-- all/light copy of the figure already stored in the indicators row. Each
+-- variant now carries a hash of its figure and the updaters only upload the
+-- variants whose hash changed; all/light is read from the indicators row
+-- (with its figure patches) and no longer stored here.
+
+ALTER TABLE indicator_variants ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+DELETE FROM indicator_variants WHERE period = 'all' AND theme = 'light';
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Nightly refresh orchestrator
+
+Runs market data ingestion and every indicator update as one dependency graph
+in a single process:
+
+    ingest -> price_history -> crowding, screener, crowding_sensitivity
+    ingest -> rollups
+    funding_sheets -> funding
+    avs_sheets -> avs
+
+Inputs are handed between nodes in memory, the Supabase client is shared, and
+independent branches run concurrently, so the whole refresh takes about as
+long as its slowest branch. The indicators rows of all nodes are committed
+together at the end, in one atomic upsert.
+
+Usage:
+    python run_indicators.py                    # everything
+    python run_indicators.py --only funding avs # just the Sheets indicators
+    python run_indicators.py --force            # even if the sheets are unchanged
+    python run_indicators.py --full-refresh     # re-upload the whole crowding history, rebuild the rollups
+"""
+
+import argparse
+import logging
+
+from indicators.pipeline import Pipeline
+from indicators.indicator_store import IndicatorWriter
+from indicators.supabase_client import get_supabase_client
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("run_indicators")
+
+
+def _require(ok, name):
+    """The update scripts report failure by returning False"""
+    if not ok:
+        raise RuntimeError(f"{name} update failed")
+    return ok
+
+
+def build_pipeline(supabase, max_workers=4, force=False, writer=None, full_refresh=False):
+    """
+    Declare the nightly refresh graph.
+
+    force: update the Sheets indicators even if unchanged
+    full_refresh: re-upload every crowding day, not just the new ones, and
+        rebuild every market rollup period
+    writer: IndicatorWriter the indicators rows are queued on, for one commit
+        after the run (each node commits its own row if omitted)
+    """
+    pipeline = Pipeline(max_workers=max_workers)
+
+    # --- Market data branch ---
+    def ingest(inputs):
+        from top100_supabase import run_ingest
+        return run_ingest(supabase)
+
+    def price_history(inputs):
+        from indicators.screener import build_price_matrix
+        from screener_supabase import get_price_rows
+        return build_price_matrix(get_price_rows(supabase))
+
+    def crowding(inputs):
+        from indicators_uploader import calculate_indicators, prepare_indicators_data, upload_indicators
+        from indicators.crowding_records import last_stored_date, upload_metadata
+        prices = inputs['price_history']
+        indicators_df = calculate_indicators(prices[['BTC']].dropna())
+        since = None if full_refresh else last_stored_date(supabase)
+        indicators = prepare_indicators_data(indicators_df, since=since)
+        _require(indicators, 'crowding')
+        upload_indicators(supabase, indicators)
+        upload_metadata(supabase)
+        return len(indicators)
+
+    def screener(inputs):
+        from screener_supabase import process_screener
+        return _require(process_screener(supabase, prices=inputs['price_history']), 'screener')
+
+    def crowding_sensitivity(inputs):
+        from crowding_sensitivity import process_crowding_sensitivity
+        prices = inputs['price_history']['BTC'].dropna()
+        return _require(process_crowding_sensitivity(supabase, prices=prices, writer=writer), 'crowding_sensitivity')
+
+    def rollups(inputs):
+        from indicators.market_rollups import update_rollups
+        return _require(update_rollups(supabase, full_refresh=full_refresh), 'rollups')
+
+    pipeline.add('ingest', ingest)
+    pipeline.add('price_history', price_history, deps=['ingest'])
+    pipeline.add('rollups', rollups, deps=['ingest'])
+    pipeline.add('crowding', crowding, deps=['price_history'])
+    pipeline.add('screener', screener, deps=['price_history'])
+    pipeline.add('crowding_sensitivity', crowding_sensitivity, deps=['price_history'])
+
+    # --- Google Sheets branches ---
+    def funding_sheets(inputs):
+        from indicators.funding_indicator_ci import FundingIndicator
+        return FundingIndicator(supabase=supabase).load_data()
+
+    def funding(inputs):
+        from ci_update_funding import update_funding_indicator
+        return _require(update_funding_indicator(supabase, data=inputs['funding_sheets'], force=force, writer=writer), 'funding')
+
+    def avs_sheets(inputs):
+        from indicators.avs_indicator_ci import AVSIndicator
+        return AVSIndicator(supabase=supabase).load_data()
+
+    def avs(inputs):
+        from ci_update_avs import update_avs_indicator
+        return _require(update_avs_indicator(supabase, data=inputs['avs_sheets'], force=force, writer=writer), 'avs')
+
+    pipeline.add('funding_sheets', funding_sheets)
+    pipeline.add('funding', funding, deps=['funding_sheets'])
+    pipeline.add('avs_sheets', avs_sheets)
+    pipeline.add('avs', avs, deps=['avs_sheets'])
+
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the nightly indicator refresh")
+    parser.add_argument('--only', nargs='+', metavar='NODE',
+                        help="Run only these nodes (and their dependencies)")
+    parser.add_argument('--workers', type=int, default=4, help="Maximum concurrent nodes")
+    parser.add_argument('--force', action='store_true',
+                        help="Update the Sheets indicators even if their inputs are unchanged")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Re-upload the whole crowding history and rebuild the market rollups")
+    args = parser.parse_args()
+
+    supabase = get_supabase_client()
+    writer = IndicatorWriter(supabase)
+    pipeline = build_pipeline(supabase, max_workers=args.workers, force=args.force, writer=writer,
+                              full_refresh=args.full_refresh)
+    if args.only:
+        pipeline.select(args.only)
+
+    pipeline.run()
+    pipeline.report()
+
+    # Every indicators row of the run lands in one atomic upsert
+    try:
+        writer.flush()
+    except Exception as e:
+        logger.error(f"Committing the indicators rows failed: {e}")
+        return 1
+
+    if pipeline.failed or pipeline.skipped:
+        logger.error(f"Refresh incomplete: failed={list(pipeline.failed)} skipped={pipeline.skipped}")
+        return 1
+    logger.info("✅ Nightly refresh complete")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,65 @@
+import logging
+from indicators.supabase_client import get_supabase_client
+from indicators.price_reader import fetch_rows
+from indicators.local_mirror import get_mirror
+from indicators.bulk_writer import bulk_upsert
+from indicators.screener import (
+    build_price_matrix,
+    compute_screener,
+    latest_values,
+    prepare_latest_records,
+    prepare_series_records,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger("screener")
+
+PAGE_SIZE = 1000
+
+# Get the full date x coin price history from Supabase
+def get_price_rows(supabase):
+    mirror = get_mirror(supabase)
+    rows = mirror.price_rows() if mirror else fetch_rows(supabase, "date, prices", page_size=PAGE_SIZE)
+    logger.info(f"Retrieved {len(rows)} days of price data")
+    return rows
+
+# Upsert records keyed by symbol (batched by size, uploaded concurrently)
+def upload_records(supabase, table_name, records):
+    bulk_upsert(supabase, table_name, records, on_conflict="symbol")
+
+# Main process function
+def process_screener(supabase=None, prices=None):
+    try:
+        logger.info("Starting screener process...")
+        supabase = supabase or get_supabase_client()
+
+        if prices is None:
+            prices = build_price_matrix(get_price_rows(supabase))
+        if prices.empty:
+            logger.error("No price data available")
+            return False
+
+        logger.info(f"Computing screener for {prices.shape[1]} coins over {prices.shape[0]} days...")
+        metrics = compute_screener(prices)
+        latest = latest_values(metrics)
+
+        upload_records(supabase, "screener_latest", prepare_latest_records(latest))
+        upload_records(supabase, "screener_series", prepare_series_records(metrics))
+        logger.info(f"Screener updated for {len(latest)} coins")
+        return True
+    except Exception:
+        logger.exception("Error in process_screener")
+        return False
+
+if __name__ == "__main__":
+    success = process_screener()
+    if success:
+        logger.info("Successfully processed and uploaded screener")
+    else:
+        logger.error("Failed to process screener")
+        exit(1)
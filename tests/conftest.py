@@ -0,0 +1,11 @@
+"""
+Shared test setup
+
+The indicator modules are imported as the 'indicators' package from the
+repository root, the same way the scripts there import them.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,176 @@
+"""
+In-memory stand-in for the parts of the Supabase client the indicator code uses
+
+Tables are lists of row dicts. Queries support select (column projection),
+the comparison filters, is_/not_.is_, order, limit, upsert (on the given
+conflict columns, updating only the columns a row carries), insert and
+delete. RPCs are plain functions registered in FakeSupabase.rpcs; calling an
+unregistered one fails the way PostgREST does for a missing function.
+"""
+
+import copy
+
+
+class Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _compare(op):
+    def test(value, target):
+        if value is None:
+            return False
+        return op(str(value) if isinstance(target, str) else value, target)
+    return test
+
+
+OPERATORS = {
+    'eq': lambda value, target: value == target or (value is not None and str(value) == str(target)),
+    'neq': lambda value, target: not (value == target or (value is not None and str(value) == str(target))),
+    'gt': _compare(lambda a, b: a > b),
+    'gte': _compare(lambda a, b: a >= b),
+    'lt': _compare(lambda a, b: a < b),
+    'lte': _compare(lambda a, b: a <= b),
+}
+
+
+class Negation:
+    def __init__(self, query):
+        self.query = query
+
+    def is_(self, column, value):
+        return self.query._filter(lambda row: not (value == 'null' and row.get(column) is None))
+
+
+class Query:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.columns = None
+        self.ordering = []
+        self.limit_rows = None
+        self.action = 'select'
+        self.payload = None
+        self.on_conflict = None
+
+    # Filters
+    def _filter(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def __getattr__(self, name):
+        if name in OPERATORS:
+            return lambda column, target: self._filter(lambda row: OPERATORS[name](row.get(column), target))
+        raise AttributeError(name)
+
+    def is_(self, column, value):
+        return self._filter(lambda row: value == 'null' and row.get(column) is None)
+
+    def in_(self, column, values):
+        return self._filter(lambda row: row.get(column) in values)
+
+    @property
+    def not_(self):
+        return Negation(self)
+
+    # Shape
+    def select(self, columns='*', count=None):
+        self.columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_rows = n
+        return self
+
+    # Writes
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        self.action, self.payload, self.on_conflict = 'upsert', rows, on_conflict
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+        if self.action in ('upsert', 'insert'):
+            return Result(self.client._write(self.table, self.payload, self.on_conflict, self.action == 'upsert'))
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.action == 'delete':
+            self.client.tables[self.table] = [row for row in rows if row not in matched]
+            return Result(copy.deepcopy(matched))
+        for column, desc in reversed(self.ordering):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self.limit_rows is not None:
+            matched = matched[:self.limit_rows]
+        if self.columns is not None:
+            matched = [{c: row.get(c) for c in self.columns} for row in matched]
+        return Result(copy.deepcopy(matched), count=len(matched))
+
+
+class RpcCall:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        self.client.calls.append((self.name, copy.deepcopy(self.params)))
+        if self.name not in self.client.rpcs:
+            raise Exception({'code': 'PGRST202', 'message': f'Could not find the function public.{self.name}'})
+        return Result(self.client.rpcs[self.name](self.client, **self.params))
+
+
+class FakeSupabase:
+    """In-memory Supabase client; tables maps table name -> list of row dicts"""
+
+    def __init__(self, tables=None, rpcs=None):
+        self.tables = copy.deepcopy(tables or {})
+        self.rpcs = dict(rpcs or {})
+        self.calls = []
+        self.writes = []
+
+    def table(self, name):
+        return Query(self, name)
+
+    def rpc(self, name, params):
+        return RpcCall(self, name, params)
+
+    def _write(self, table, payload, on_conflict, upsert):
+        rows = self.tables.setdefault(table, [])
+        payload = payload if isinstance(payload, list) else [payload]
+        self.writes.append((table, 'upsert' if upsert else 'insert', copy.deepcopy(payload)))
+        keys = [k.strip() for k in on_conflict.split(',')] if on_conflict else None
+        written = []
+        for new in copy.deepcopy(payload):
+            existing = next((row for row in rows if keys and all(row.get(k) == new.get(k) for k in keys)), None)
+            if existing is not None and upsert:
+                existing.update(new)
+                written.append(existing)
+            elif existing is not None:
+                raise Exception(f'duplicate key value violates unique constraint on {table} ({on_conflict})')
+            else:
+                rows.append(new)
+                written.append(new)
+        return copy.deepcopy(written)
+
+
+def upsert_indicators(client, p_rows, p_patches=()):
+    """The upsert_indicators() RPC: patches and rows in one call, versions from a counter"""
+    if p_patches:
+        client._write('indicator_figure_patches', list(p_patches), 'indicator_name,seq', upsert=False)
+    written = client._write('indicators', p_rows, 'indicator_name', upsert=True)
+    client.version = getattr(client, 'version', 0)
+    versions = []
+    for row in written:
+        client.version += 1
+        versions.append({'indicator_name': row['indicator_name'], 'version': client.version})
+    return versions
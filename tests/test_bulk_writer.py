@@ -0,0 +1,161 @@
+"""
+BulkWriter batching, retries and the compressed-upload fallback
+"""
+
+import gzip
+import json
+
+import pytest
+
+from fake_supabase import FakeSupabase
+from indicators import bulk_writer
+from indicators.bulk_writer import BulkWriter, pack_batches
+
+
+class Response:
+    def __init__(self, status_code=201, text=''):
+        self.status_code = status_code
+        self.text = text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"{self.status_code}: {self.text}")
+
+
+class Session:
+    """Records the POSTs of a PostgREST session and answers compressed ones with `gzip_response`"""
+
+    def __init__(self, gzip_response=None):
+        self.gzip_response = gzip_response
+        self.posts = []
+
+    def post(self, path, params=None, content=b'', headers=None):
+        compressed = headers.get('Content-Encoding') == 'gzip'
+        rows = json.loads(gzip.decompress(content) if compressed else content)
+        self.posts.append({'path': path, 'params': params, 'compressed': compressed, 'rows': rows})
+        if compressed and self.gzip_response is not None:
+            return self.gzip_response
+        return Response()
+
+
+class Client:
+    def __init__(self, session):
+        self.postgrest = type('PostgREST', (), {'session': session})()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(bulk_writer.time, 'sleep', lambda seconds: None)
+
+
+def rows(n, **extra):
+    return [{'date': f'2024-01-{day + 1:02d}', 'value': day, **extra} for day in range(n)]
+
+
+def test_batches_are_packed_by_encoded_size():
+    encoded = [(row, json.dumps(row).encode('utf-8')) for row in rows(10)]
+    size = len(encoded[0][1]) + 1
+
+    batches = pack_batches(encoded, max_bytes=3 * size)
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [item for batch in batches for item in batch] == encoded
+
+
+def test_rows_with_different_columns_go_in_different_batches():
+    session = Session()
+    writer = BulkWriter(Client(session))
+
+    stats = writer.upsert('t', rows(3) + rows(2, extra=1), on_conflict='date')
+
+    assert stats['rows'] == 5 and stats['batches'] == 2
+    assert sorted(len(post['rows']) for post in session.posts) == [2, 3]
+    assert all(post['compressed'] and post['params'] == {'on_conflict': 'date'} for post in session.posts)
+
+
+@pytest.mark.parametrize('response', [
+    Response(415, 'Unsupported Media Type'),
+    Response(400, '{"message": "Content-Encoding gzip is not supported"}'),
+])
+def test_rejected_compression_falls_back_to_plain_bodies(response):
+    session = Session(gzip_response=response)
+    writer = BulkWriter(Client(session), max_workers=1)
+
+    writer.upsert('t', rows(2))
+    writer.upsert('t', rows(2))
+
+    assert [post['compressed'] for post in session.posts] == [True, False, False]
+    assert writer.totals['t']['failed'] == 0
+
+
+def test_other_bad_requests_fail_without_dropping_compression():
+    session = Session(gzip_response=Response(400, '{"message": "column \\"value\\" does not exist"}'))
+    writer = BulkWriter(Client(session), retries=2)
+
+    stats = writer.upsert('t', rows(2))
+
+    assert stats['failed'] == 2
+    assert [post['compressed'] for post in session.posts] == [True, True]
+    assert writer.compress
+
+
+def test_failed_batches_are_retried_on_their_own():
+    supabase = FakeSupabase()
+    original = supabase._write
+    failures = iter([True])
+
+    def flaky(table, payload, on_conflict, upsert):
+        if next(failures, False):
+            raise Exception('connection reset')
+        return original(table, payload, on_conflict, upsert)
+
+    supabase._write = flaky
+    stats = BulkWriter(supabase, max_batch_rows=2, max_workers=1).upsert('t', rows(4), on_conflict='date')
+
+    assert stats == {**stats, 'rows': 4, 'failed': 0, 'batches': 2}
+    assert len(supabase.tables['t']) == 4
+    assert [len(payload) for _, _, payload in supabase.writes] == [2, 2]
+
+
+def merge_market_rows(client, p_table, p_rows):
+    """The merge_market_rows() RPC: merges each patch's prices into the stored row"""
+    rows = client.tables.setdefault(p_table, [])
+    for patch in p_rows:
+        row = next((r for r in rows if r['date'] == patch['date']), None)
+        if row is None:
+            rows.append({'date': patch['date'], 'prices': dict(patch['prices'])})
+        else:
+            row['prices'].update(patch['prices'])
+
+
+def test_merge_combines_patches_and_keeps_other_symbols():
+    supabase = FakeSupabase({'crypto_prices': [{'date': '2024-01-01', 'prices': {'BTC': 1, 'ETH': 2}}]},
+                            rpcs={'merge_market_rows': merge_market_rows})
+
+    stats = BulkWriter(supabase).merge('crypto_prices', [
+        {'date': '2024-01-01', 'prices': {'BTC': 10}},
+        {'date': '2024-01-01', 'prices': {'SOL': 3}},
+        {'date': '2024-01-02', 'prices': {'BTC': 11}},
+        {'date': '2024-01-03', 'prices': {}},
+    ])
+
+    assert stats['rows'] == 2
+    assert [name for name, _ in supabase.calls] == ['merge_market_rows']
+    assert supabase.tables['crypto_prices'] == [
+        {'date': '2024-01-01', 'prices': {'BTC': 10, 'ETH': 2, 'SOL': 3}},
+        {'date': '2024-01-02', 'prices': {'BTC': 11}},
+    ]
+
+
+def test_merge_without_the_rpc_writes_nothing_unless_allowed():
+    supabase = FakeSupabase()
+    writer = BulkWriter(supabase)
+    patches = [{'date': '2024-01-01', 'prices': {'BTC': 10}}]
+
+    assert writer.merge('crypto_prices', patches)['failed'] == 1
+    assert supabase.tables.get('crypto_prices', []) == []
+
+    assert writer.merge('crypto_prices', patches, fallback_upsert=True)['rows'] == 1
+    assert supabase.tables['crypto_prices'] == patches
+    # The missing function is only asked for once per writer
+    assert len(supabase.calls) == 1
@@ -0,0 +1,66 @@
+"""
+Per-coin statistics for the dashboard cards
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fake_supabase import FakeSupabase
+from indicators.coin_stats import STATS_TABLE, compute_coin_stats, range_changes, upload_coin_stats
+
+DATES = pd.date_range('2023-01-01', '2024-06-30')
+
+
+def ingest_frame(values):
+    """An ingest frame: a 'Date' column plus one column per coin"""
+    return pd.DataFrame({'Date': DATES.strftime('%Y-%m-%d'), **values})
+
+
+def test_range_changes_start_at_the_first_value_in_the_range():
+    prices = pd.DataFrame({'BTC': np.arange(1.0, len(DATES) + 1)}, index=DATES)
+    prices.loc['2024-06-23', 'BTC'] = np.nan     # the 7d range starts on a missing day
+
+    changes = range_changes(prices).loc['BTC']
+
+    last = float(len(DATES))
+    assert changes['7d'] == pytest.approx((last / (last - 6) - 1) * 100)
+    # Calendar ranges: a month back from June 30th is May 30th
+    assert changes['1m'] == pytest.approx((last / (last - 31) - 1) * 100)
+    assert changes['all'] == pytest.approx((last - 1) * 100)
+
+
+def test_coin_stats_rows():
+    n = len(DATES)
+    btc = np.concatenate([np.linspace(100, 200, n - 100), np.linspace(200, 150, 100)])
+    late = np.full(n, np.nan)
+    late[-10:] = np.arange(1.0, 11.0)
+    stopped = np.where(np.arange(n) < n - 5, 50.0, np.nan)
+
+    rows = {row['symbol']: row for row in compute_coin_stats(
+        ingest_frame({'BTC': btc, 'NEW': late, 'OLD': stopped, 'NONE': np.full(n, np.nan)}),
+        market_caps=ingest_frame({'BTC': btc * 19e6}),
+        volumes=None,
+    )}
+
+    assert set(rows) == {'BTC', 'NEW', 'OLD'}
+    row = rows['BTC']
+    assert row['date'] == '2024-06-30' and row['price'] == pytest.approx(150)
+    assert row['ath'] == pytest.approx(200) and row['ath_date'] == DATES[n - 101].strftime('%Y-%m-%d')
+    assert row['drawdown'] == pytest.approx(-0.25)
+    assert row['market_cap'] == pytest.approx(150 * 19e6) and row['volume'] is None
+    assert set(row['changes']) == {'price', 'market_cap'}
+    assert row['volatility_30d'] > 0
+
+    # A coin listed ten days ago changes from its first price; one that stopped keeps its last date
+    assert rows['NEW']['changes']['price']['1y'] == pytest.approx(900)
+    assert rows['OLD']['date'] == DATES[-6].strftime('%Y-%m-%d') and rows['OLD']['drawdown'] == 0
+
+
+def test_upload_coin_stats():
+    supabase = FakeSupabase()
+    rows = compute_coin_stats(ingest_frame({'BTC': np.linspace(1, 2, len(DATES))}))
+
+    assert upload_coin_stats(supabase, rows)
+    assert [row['symbol'] for row in supabase.tables[STATS_TABLE]] == ['BTC']
+    assert not upload_coin_stats(supabase, [])
@@ -0,0 +1,69 @@
+"""
+The precomputed default dashboard snapshot
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from fake_supabase import FakeSupabase
+from indicators.coin_stats import compute_coin_stats
+from indicators.dashboard_snapshot import SNAPSHOT_TABLE, build_snapshot, publish_snapshot
+
+DATES = pd.date_range('2022-01-01', '2024-06-30')
+TOP = [{'Symbol': 'BTC'}, {'Symbol': 'ETH'}, {'Symbol': 'DOGE'}]
+
+
+def ingest_frame(scale=1.0):
+    n = len(DATES)
+    return pd.DataFrame({'Date': DATES.strftime('%Y-%m-%d'),
+                         'BTC': np.linspace(100, 200, n) * scale,
+                         'ETH': np.linspace(10, 20, n) * scale,
+                         'DOGE': np.linspace(1, 2, n) * scale})
+
+
+def snapshot(**kwargs):
+    prices = ingest_frame()
+    return build_snapshot(prices, ingest_frame(1e6), ingest_frame(1e3), TOP, compute_coin_stats(prices), **kwargs)
+
+
+def test_default_view():
+    doc = snapshot(coins=['BTC', 'ETH', 'SOL'], range_name='3m')
+
+    assert doc['default'] == {'coins': ['BTC', 'ETH', 'SOL'], 'range': '3m', 'start': '2024-03-30', 'end': '2024-06-30'}
+    assert doc['coins'] == [{'symbol': 'BTC', 'rank': 1}, {'symbol': 'ETH', 'rank': 2}, {'symbol': 'DOGE', 'rank': 3}]
+    prices = doc['series']['prices']
+    assert prices[0]['date'] == '2024-03-30' and prices[-1]['date'] == '2024-06-30'
+    # Coins without data are left out of the points rather than stored as nulls
+    assert set(prices[-1]) == {'date', 'BTC', 'ETH'} and prices[-1]['BTC'] == 200.0
+    assert set(doc['series']) == {'prices', 'market-caps', 'volumes'}
+    assert set(doc['stats']) == {'BTC', 'ETH'}
+
+
+def test_long_ranges_are_thinned_keeping_the_last_day():
+    points = snapshot(range_name='all')['series']['prices']
+
+    assert len(points) == 366
+    assert points[0]['date'] == '2022-01-01' and points[-1]['date'] == '2024-06-30'
+
+
+def test_version_follows_the_content_only():
+    first, second = snapshot(), snapshot()
+
+    assert first['version'] == second['version']
+    assert snapshot(coins=['BTC'])['version'] != first['version']
+    assert build_snapshot(pd.DataFrame(), None, None, TOP, []) is None
+
+
+def test_publish_writes_the_row_and_the_static_file(tmp_path):
+    supabase = FakeSupabase()
+    doc = snapshot()
+    path = tmp_path / 'public' / 'dashboard-snapshot.json'
+
+    assert publish_snapshot(supabase, doc, path=str(path))
+
+    row = supabase.tables[SNAPSHOT_TABLE][0]
+    assert (row['name'], row['version']) == ('default', doc['version'])
+    assert json.loads(path.read_text()) == json.loads(json.dumps(doc))
+    assert not publish_snapshot(supabase, None, path=str(path))
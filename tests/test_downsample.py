@@ -0,0 +1,89 @@
+"""
+LTTB/bucket downsampling of indicator figures and the yearly tile pyramid
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from indicators.downsample import bucket_indices, build_pyramid, downsample_figure, lttb_indices
+
+
+def series(days=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2016-01-01', periods=days)
+    return dates, 100 + rng.normal(size=days).cumsum()
+
+
+def figure(days=3000, signals=()):
+    dates, close = series(days)
+    signals = list(signals)
+    return go.Figure([
+        go.Scatter(x=dates, y=close, mode='lines', name='Price'),
+        go.Bar(x=dates, y=np.sin(np.arange(days) / 7.0), name='Funding'),
+        go.Scatter(x=dates[signals], y=close[signals], mode='markers', name='Buy'),
+    ]).to_plotly_json()
+
+
+def test_lttb_keeps_the_ends_and_the_extremes():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50.0)
+    y[377] = 25.0
+
+    index = lttb_indices(x, y, threshold=100)
+
+    assert len(index) <= 100
+    assert index[0] == 0 and index[-1] == 999
+    assert 377 in index
+    assert 500 in lttb_indices(x, y, threshold=100, keep=np.array([500]))
+
+
+def test_bar_buckets_keep_the_largest_magnitude():
+    y = np.zeros(100)
+    y[42] = -9.0
+    y[43] = 3.0
+
+    index = bucket_indices(y, threshold=10)
+
+    assert len(index) == 10
+    assert 42 in index and 43 not in index
+
+
+def test_downsampled_figure_fits_max_points_and_keeps_signals():
+    signals = [5, 1234, 2999]
+    full = figure(signals=signals)
+
+    small = downsample_figure(full, max_points=300)
+
+    # One point per calendar bucket (the span needs 301 of them), plus the last point and the signals
+    line, bar, markers = small['data']
+    assert len(bar['y']) == 301
+    assert len(line['y']) <= 301 + 1 + len(signals)
+    assert len(markers['x']) == len(signals)
+    assert set(pd.to_datetime(markers['x'])) <= set(pd.to_datetime(line['x']))
+    assert small['layout'] == full['layout']
+
+
+def test_appending_a_day_only_changes_the_tail():
+    before = downsample_figure(figure(3000), max_points=300)['data'][0]
+    after = downsample_figure(figure(3001), max_points=300)['data'][0]
+
+    # Calendar buckets don't move, so everything but the last couple of points is unchanged
+    n = len(before['x']) - 2
+    assert np.array_equal(before['x'][:n], after['x'][:n])
+    assert np.array_equal(before['y'][:n], after['y'][:n])
+
+
+def test_yearly_tiles_cover_the_full_resolution_series():
+    dates, close = series(800)
+    fig = go.Figure([go.Scatter(x=dates, y=close, mode='lines')])
+
+    overview, tiles = build_pyramid(fig, max_points=100)
+
+    assert len(overview['data'][0]['y']) <= 100
+    assert [tile['tile'] for tile in tiles] == [2016, 2017, 2018]
+    assert tiles[0]['x0'] == '2016-01-01' and tiles[0]['x1'] == '2017-01-01'
+    x = [day for tile in tiles for day in tile['traces'][0]['x']]
+    y = [value for tile in tiles for value in tile['traces'][0]['y']]
+    assert x == list(dates.strftime('%Y-%m-%d'))
+    np.testing.assert_allclose(y, close, rtol=1e-5)
@@ -0,0 +1,72 @@
+"""
+Compact figure encoding: typed arrays, dates and the JSON round trip
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from indicators.downsample import _as_array
+from indicators.figure_encoding import compact_figure, decode_arrays, dumps, encode_array
+
+
+def test_float_arrays_become_float32_typed_arrays():
+    values = np.linspace(0, 1, 50)
+
+    encoded = encode_array(values)
+
+    assert encoded['dtype'] == 'f4'
+    np.testing.assert_allclose(_as_array(encoded), values, rtol=1e-7)
+    assert encode_array(values, float32=False)['dtype'] == 'f8'
+    np.testing.assert_array_equal(_as_array(encode_array(values, decimals=2)).astype(float),
+                                  np.round(values, 2).astype(np.float32))
+
+
+def test_short_and_non_numeric_arrays_stay_lists():
+    assert encode_array([1.5, float('nan'), 3.0]) == [1.5, None, 3.0]
+    assert encode_array(np.array(['a', 'b'])) == ['a', 'b']
+    assert encode_array(np.arange(20) > 5) == [False] * 6 + [True] * 14
+    assert encode_array(np.arange(20))['dtype'] == 'i4'
+
+
+def test_dates_are_plain_strings():
+    daily = pd.date_range('2024-01-01', periods=3)
+    hourly = pd.date_range('2024-01-01', periods=2, freq='h')
+
+    assert encode_array(daily.values) == ['2024-01-01', '2024-01-02', '2024-01-03']
+    assert encode_array(hourly.values) == ['2024-01-01T00:00:00', '2024-01-01T01:00:00']
+    assert encode_array(np.array(['2024-01-01', 'NaT'], dtype='datetime64[ns]')) == ['2024-01-01', None]
+
+
+def test_compact_figure_round_trips_through_json():
+    dates = pd.date_range('2024-01-01', periods=100)
+    close = 100 * np.exp(np.random.default_rng(0).normal(0, 0.02, 100).cumsum())
+    fig = go.Figure([go.Scatter(x=dates, y=close, name='Price', marker={'color': ['red'] * 100})])
+    fig.update_layout(title='BTC', shapes=[{'type': 'line', 'x0': pd.Timestamp('2024-02-01'), 'x1': dates[-1]}])
+
+    compact = compact_figure(fig)
+    parsed = json.loads(dumps(compact))
+
+    assert parsed == compact
+    trace = parsed['data'][0]
+    assert trace['x'][0] == '2024-01-01' and trace['y']['dtype'] == 'f4'
+    assert trace['marker']['color'] == ['red'] * 100
+    assert parsed['layout']['shapes'][0]['x0'] == '2024-02-01T00:00:00'
+    assert len(dumps(trace['y'])) < len(json.dumps(close.tolist())) / 2
+
+
+def test_decode_arrays_gives_plain_lists():
+    compact = compact_figure({'data': [{'type': 'scatter', 'y': np.arange(10, dtype=float)}], 'layout': {}})
+
+    decoded = decode_arrays(compact)
+
+    assert decoded['data'][0]['y'] == [float(v) for v in range(10)]
+    assert go.Figure(decoded).data[0].y == tuple(float(v) for v in range(10))
+
+
+def test_dumps_handles_numpy_and_timestamps():
+    payload = {'n': np.int64(3), 'x': np.float32(0.5), 'when': pd.Timestamp('2024-01-01'), 'a': np.arange(3)}
+
+    assert json.loads(dumps(payload)) == {'n': 3, 'x': 0.5, 'when': '2024-01-01T00:00:00', 'a': [0, 1, 2]}
@@ -0,0 +1,122 @@
+"""
+diff_figures() / apply_patch() round trips and save_figure() commits
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from fake_supabase import FakeSupabase, upsert_indicators
+from indicators.figure_encoding import compact_figure
+from indicators.figure_patches import apply_patch, diff_figures, patched_since, reassemble, save_figure
+from indicators.indicator_store import IndicatorWriter
+
+
+def figure(days, last_close=None, title='BTC'):
+    dates = pd.date_range('2024-01-01', periods=days)
+    close = 100 + np.arange(days, dtype=float)
+    if last_close is not None:
+        close[-1] = last_close
+    fig = go.Figure([
+        go.Scatter(x=dates, y=close, name='Price'),
+        go.Scatter(x=dates, y=close * 0.95, name='Buy Line'),
+    ])
+    fig.update_layout(title=title, xaxis={'range': [str(dates[0].date()), str(dates[-1].date())]})
+    return compact_figure(fig, decimals=2)
+
+
+def test_appended_day_round_trips():
+    old, new = figure(300), figure(301)
+
+    patch = diff_figures(old, new)
+
+    assert patch is not None
+    assert {change['start'] for change in patch['traces']} == {300}
+    assert set(patch['layout']) == {'xaxis'}
+    assert apply_patch(old, patch) == new
+    assert patched_since(patch, new) == '2024-10-27'
+
+
+def test_revised_last_point_and_append_round_trip():
+    old = figure(300)
+    new = figure(301, last_close=123.45)
+
+    patch = diff_figures(old, new)
+
+    assert patch is not None
+    assert apply_patch(old, patch) == new
+
+
+def test_patches_chain_with_reassemble():
+    figures = [figure(days) for days in range(300, 305)]
+    patches = [diff_figures(a, b) for a, b in zip(figures, figures[1:])]
+
+    assert reassemble(figures[0], patches) == figures[-1]
+
+
+def test_identical_figures_give_an_empty_patch():
+    patch = diff_figures(figure(300), figure(300))
+
+    assert patch == {'traces': [], 'layout': {}}
+
+
+def test_history_rewrite_is_not_a_patch():
+    old = figure(300)
+    new = figure(301)
+    new['data'][0]['name'] = 'Close'
+
+    assert diff_figures(old, new) is None
+    assert diff_figures(figure(300), figure(400), max_changed=64) is not None
+    assert diff_figures(figure(400), figure(300), max_changed=64) is None
+
+
+def stored_figure(supabase, name='funding_rate'):
+    """The figure a reader reassembles: the base plus the patches after its figure_seq"""
+    row = next(r for r in supabase.tables['indicators'] if r['indicator_name'] == name)
+    patches = sorted((p for p in supabase.tables.get('indicator_figure_patches', [])
+                      if p['indicator_name'] == name and p['seq'] > row['figure_seq']), key=lambda p: p['seq'])
+    return reassemble(row['plotly_json'], [p['patch'] for p in patches])
+
+
+def row(days):
+    return {'indicator_name': 'funding_rate', 'date': '2024-12-31', 'plotly_json': figure(days),
+            'latest_data': {'days': days}}
+
+
+def test_save_figure_writes_a_base_then_patches():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+
+    first = save_figure(supabase, row(300))
+    second = save_figure(supabase, row(301))
+    third = save_figure(supabase, row(301))
+
+    assert (first['mode'], second['mode'], third['mode']) == ('base', 'patch', 'unchanged')
+    assert second['seq'] == 2 and second['bytes'] < first['bytes']
+    assert stored_figure(supabase) == figure(301)
+
+
+def test_queued_patch_is_invisible_until_the_writer_commits():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+    save_figure(supabase, row(300))
+
+    writer = IndicatorWriter(supabase)
+    result = save_figure(supabase, row(301), writer=writer)
+
+    # e.g. the tiles or variants upload fails here and the writer is never flushed
+    assert result['mode'] == 'patch'
+    assert supabase.tables.get('indicator_figure_patches', []) == []
+    assert stored_figure(supabase) == figure(300)
+
+    writer.flush()
+    assert stored_figure(supabase) == figure(301)
+    assert next(r for r in supabase.tables['indicators'])['latest_data'] == {'days': 301}
+
+
+def test_compaction_writes_a_new_base_and_drops_patches():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+    for days in range(300, 304):
+        result = save_figure(supabase, row(days), compact_every=2)
+
+    assert result['mode'] == 'base'
+    assert supabase.tables['indicator_figure_patches'] == []
+    assert stored_figure(supabase) == figure(303)
@@ -0,0 +1,67 @@
+"""
+Input fingerprints of the indicator updates
+"""
+
+import numpy as np
+import pandas as pd
+
+from fake_supabase import FakeSupabase
+from indicators import variants
+from indicators.fingerprint import code_version, input_fingerprint, stored_fingerprint
+
+MODULES = ['indicators.fingerprint']
+
+
+def frames():
+    dates = pd.date_range('2024-01-01', periods=50)
+    return {
+        'funding': pd.DataFrame({'rate': np.linspace(-0.01, 0.02, 50)}, index=dates),
+        'prices': pd.DataFrame({'BTC': np.arange(50, dtype=float)}, index=dates),
+    }
+
+
+def test_same_inputs_give_the_same_fingerprint():
+    assert input_fingerprint(frames(), {'a': 1, 'b': 2}, MODULES) == \
+        input_fingerprint(dict(reversed(list(frames().items()))), {'b': 2, 'a': 1}, MODULES)
+
+
+def test_any_input_change_changes_the_fingerprint():
+    base = input_fingerprint(frames(), {'max_points': 600}, MODULES)
+
+    revised = frames()
+    revised['prices'].iloc[3, 0] = 3.5
+    appended = frames()
+    appended['funding'].loc[pd.Timestamp('2024-02-20')] = 0.0
+    retyped = frames()
+    retyped['prices'] = retyped['prices'].astype('float32')
+
+    changed = [
+        input_fingerprint(revised, {'max_points': 600}, MODULES),
+        input_fingerprint(appended, {'max_points': 600}, MODULES),
+        input_fingerprint(retyped, {'max_points': 600}, MODULES),
+        input_fingerprint(frames(), {'max_points': 300}, MODULES),
+        input_fingerprint(frames(), {'max_points': 600}, MODULES + [variants]),
+        input_fingerprint(frames()['prices'], {'max_points': 600}, MODULES),
+    ]
+    assert len({base, *changed}) == len(changed) + 1
+
+
+def test_code_version_accepts_modules_and_names():
+    import indicators.fingerprint as module
+
+    assert code_version(module) == code_version('indicators.fingerprint')
+
+
+def test_stored_fingerprint():
+    supabase = FakeSupabase({'indicators': [{'indicator_name': 'funding_rate', 'input_fingerprint': 'abc'}]})
+
+    assert stored_fingerprint(supabase, 'funding_rate') == 'abc'
+    assert stored_fingerprint(supabase, 'avs_average') is None
+
+
+def test_unreadable_fingerprint_means_recompute():
+    class Broken:
+        def table(self, name):
+            raise Exception('connection refused')
+
+    assert stored_fingerprint(Broken(), 'funding_rate') is None
@@ -0,0 +1,41 @@
+"""
+Indicator server routes against a stub service
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("supabase")
+from indicator_server import IndicatorService, create_app  # noqa: E402
+
+
+class StubService(IndicatorService):
+    """Resolves names like the real service and records refreshes instead of loading sheets"""
+
+    def __init__(self):
+        self.refreshed = []
+        self.done = threading.Event()
+
+    def refresh(self, name):
+        self.refreshed.append(name)
+        self.done.set()
+
+
+def test_prerender_refreshes_the_resolved_indicator():
+    service = StubService()
+    client = create_app(service, refresh_interval=0).test_client()
+
+    response = client.post('/api/indicators/avs_average/prerender')
+
+    assert response.status_code == 202
+    assert response.get_json() == {"indicator": "avs", "status": "scheduled"}
+    assert service.done.wait(5)
+    assert service.refreshed == ['avs']
+
+
+def test_prerender_of_an_unknown_indicator_is_a_404():
+    client = create_app(StubService(), refresh_interval=0).test_client()
+
+    assert client.post('/api/indicators/nope/prerender').status_code == 404
+    assert client.get('/api/indicators/avs/prerender').status_code == 405
@@ -0,0 +1,81 @@
+"""
+IndicatorWriter commits and its fallback for unmigrated databases
+"""
+
+import pytest
+
+from fake_supabase import FakeSupabase, upsert_indicators
+from indicators.indicator_store import IndicatorWriter, write_indicator
+
+
+def migrated():
+    return FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+
+
+def test_flush_commits_rows_and_patches_in_one_rpc():
+    supabase = migrated()
+    writer = IndicatorWriter(supabase)
+    writer.add({"indicator_name": "funding_rate", "plotly_json": {}})
+    writer.add({"indicator_name": "avs_average", "latest_data": {}})
+    writer.add({"indicator_name": "funding_rate", "input_fingerprint": "abc"})
+    writer.add_patch({"indicator_name": "funding_rate", "seq": 3, "patch": {}})
+
+    versions = writer.flush()
+
+    assert versions == {"funding_rate": 1, "avs_average": 2}
+    assert [name for name, _ in supabase.calls] == ["upsert_indicators"]
+    assert supabase.calls[0][1]["p_rows"][0] == {"indicator_name": "funding_rate", "plotly_json": {},
+                                                 "input_fingerprint": "abc"}
+    assert supabase.tables["indicator_figure_patches"] == [{"indicator_name": "funding_rate", "seq": 3, "patch": {}}]
+
+
+def test_missing_function_falls_back_to_upserts():
+    supabase = FakeSupabase()
+    writer = IndicatorWriter(supabase)
+    writer.add({"indicator_name": "funding_rate", "plotly_json": {}})
+    writer.add({"indicator_name": "avs_average", "plotly_json": {}})
+    writer.add({"indicator_name": "crowding_sensitivity", "latest_data": {}})
+    writer.add_patch({"indicator_name": "funding_rate", "seq": 1, "patch": {}})
+
+    writer.flush()
+
+    # Patches first, then one upsert per column set so a column a row leaves out isn't nulled
+    assert [(table, action, len(rows)) for table, action, rows in supabase.writes] == [
+        ("indicator_figure_patches", "insert", 1), ("indicators", "upsert", 2), ("indicators", "upsert", 1)]
+
+
+def test_other_errors_propagate_without_writing():
+    def violation(client, p_rows, p_patches=()):
+        raise Exception('duplicate key value violates unique constraint "indicators_pkey"')
+
+    supabase = FakeSupabase(rpcs={'upsert_indicators': violation})
+    writer = IndicatorWriter(supabase)
+    cleaned = []
+    writer.add({"indicator_name": "funding_rate", "plotly_json": {}}, after=lambda: cleaned.append(1))
+
+    with pytest.raises(Exception, match="indicators_pkey"):
+        writer.flush()
+
+    assert supabase.writes == [] and cleaned == []
+
+
+def test_merge_moves_rows_patches_and_callbacks():
+    supabase = migrated()
+    run_writer, own = IndicatorWriter(supabase), IndicatorWriter(supabase)
+    cleaned = []
+    own.add({"indicator_name": "avs_average", "plotly_json": {}}, after=lambda: cleaned.append(1))
+    own.add_patch({"indicator_name": "avs_average", "seq": 1, "patch": {}})
+
+    run_writer.merge(own)
+    assert own.flush() == {}
+    run_writer.flush()
+
+    assert cleaned == [1]
+    assert len(supabase.tables["indicator_figure_patches"]) == 1
+
+
+def test_write_indicator_commits_without_a_writer():
+    supabase = migrated()
+
+    assert write_indicator(supabase, {"indicator_name": "crowding_sensitivity", "latest_data": {}}) == 1
+    assert write_indicator(supabase, {"indicator_name": "x"}, writer=IndicatorWriter(supabase)) is None
@@ -0,0 +1,111 @@
+"""
+update_indicator(): fingerprint skips, variant uploads and pre-render requests
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from fake_supabase import FakeSupabase, upsert_indicators
+from indicators.figure_encoding import compact_figure
+from indicators import indicator_update
+from indicators.indicator_update import update_indicator
+from indicators.variants import PERIODS, THEMES, VARIANT_TABLE, apply_theme, period_slices
+
+OVERLAYS = {'light': {'layout': {'template': 'plotly_white'}}, 'dark': {'layout': {'template': 'plotly_dark'}}}
+
+
+class FakeIndicator:
+    """Just enough of an indicator for the update flow: one close series per period and theme"""
+
+    def __init__(self, supabase, data):
+        self.supabase = supabase
+        self.data = data
+
+    def load_data(self):
+        return self.data
+
+    def generate_variants(self, params=None, data=None):
+        variants = {}
+        for period, frame in period_slices(data, PERIODS).items():
+            figure = compact_figure(go.Figure([go.Scatter(x=frame.index, y=frame['close'], name='Close')]))
+            for theme in THEMES:
+                variants[(period, theme)] = apply_theme(figure, OVERLAYS[theme])
+        return {'variants': variants, 'latest_data': {'close': float(data['close'].iloc[-1])}, 'tiles': []}
+
+
+def prices(days=400, first=100.0):
+    close = 100 + np.arange(days, dtype=float)
+    close[0] = first
+    return pd.DataFrame({'close': close}, index=pd.date_range('2024-01-01', periods=days))
+
+
+def run(supabase, data, force=False):
+    return update_indicator(FakeIndicator(supabase, data), 'test_indicator', force=force)
+
+
+def variant_writes(supabase):
+    return [row for table, _, rows in supabase.writes if table == VARIANT_TABLE for row in rows]
+
+
+def test_first_run_stores_every_variant_but_the_default_once():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+
+    stored = run(supabase, prices())
+
+    keys = {(row['period'], row['theme']) for row in supabase.tables[VARIANT_TABLE]}
+    assert stored['mode'] == 'base'
+    assert len(keys) == len(PERIODS) * len(THEMES) - 1
+    assert ('all', 'light') not in keys
+    assert all(row['content_hash'] for row in supabase.tables[VARIANT_TABLE])
+    row = supabase.tables['indicators'][0]
+    assert row['latest_data'] == {'close': 499.0} and row['input_fingerprint']
+
+
+def test_unchanged_inputs_skip_the_update():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+    run(supabase, prices())
+    writes, calls = len(supabase.writes), len(supabase.calls)
+
+    assert run(supabase, prices()) == {}
+    assert (len(supabase.writes), len(supabase.calls)) == (writes, calls)
+
+
+def test_only_changed_variants_are_uploaded():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+    run(supabase, prices())
+    supabase.writes.clear()
+
+    # A revised first day only changes the whole-history figures
+    run(supabase, prices(first=50.0))
+
+    assert {(row['period'], row['theme']) for row in variant_writes(supabase)} == {('all', 'dark')}
+
+
+def test_force_uploads_every_variant():
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+    run(supabase, prices())
+    supabase.writes.clear()
+
+    run(supabase, prices(), force=True)
+
+    assert len(variant_writes(supabase)) == len(PERIODS) * len(THEMES) - 1
+
+
+def test_new_figures_request_prerendering_after_the_commit(monkeypatch):
+    supabase = FakeSupabase(rpcs={'upsert_indicators': upsert_indicators})
+    requested = []
+    monkeypatch.setattr(indicator_update, 'request_prerender',
+                        lambda name: requested.append((name, len(supabase.tables.get('indicators', [])))))
+
+    run(supabase, prices())
+    run(supabase, prices(), force=True)
+
+    # Once for the new base, after its row was committed; not for the unchanged figure
+    assert requested == [('test_indicator', 1)]
+
+
+def test_prerender_needs_a_server(monkeypatch):
+    monkeypatch.delenv('FLASK_SERVER', raising=False)
+
+    assert indicator_update.request_prerender('test_indicator') is False
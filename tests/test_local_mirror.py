@@ -0,0 +1,111 @@
+"""
+SQLite read-through mirror against an in-memory Supabase
+"""
+
+import pytest
+
+from fake_supabase import FakeSupabase
+from indicators.local_mirror import LocalMirror, get_mirror
+
+
+class CountingSupabase(FakeSupabase):
+    """Counts table reads, and fails them all while offline is set"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+        self.offline = False
+
+    def table(self, name):
+        if self.offline:
+            raise Exception('connection refused')
+        self.reads += 1
+        return super().table(name)
+
+
+def price(day, **prices):
+    return {'date': f'2024-01-{day:02d}', 'prices': prices}
+
+
+@pytest.fixture
+def supabase():
+    return CountingSupabase({
+        'crypto_prices': [price(day, BTC=40000 + day, ETH=2000 + day) for day in range(1, 11)],
+        'tracked_coins': [{'symbol': 'BTC', 'last_in_top100': '2024-01-10'},
+                          {'symbol': 'LUNA', 'last_in_top100': '2022-05-01'}],
+        'indicators': [
+            {'indicator_name': 'funding_rate', 'date': '2024-01-10', 'version': 3, 'latest_data': {'signal': 'buy'}},
+            {'indicator_name': None, 'date': '2024-01-09', 'version': 1, 'data': {'crowding': 1.0}},
+            {'indicator_name': None, 'date': '2024-01-10', 'version': 2, 'data': {'crowding': 2.0}},
+        ],
+    })
+
+
+def mirror(supabase, tmp_path, max_age=300):
+    return LocalMirror(supabase, str(tmp_path / 'mirror.sqlite'), max_age=max_age)
+
+
+def test_prices_are_served_locally_once_synced(supabase, tmp_path):
+    local = mirror(supabase, tmp_path)
+
+    prices = local.read_prices(['BTC', 'DOGE'], start='2024-01-05')
+    reads = supabase.reads
+    again = local.read_prices(['ETH'])
+
+    assert list(prices.columns) == ['BTC', 'DOGE'] and len(prices) == 6
+    assert prices['BTC'].iloc[0] == 40005.0 and prices['DOGE'].isna().all()
+    assert len(again) == 10 and supabase.reads == reads
+
+
+def test_syncs_fetch_from_the_watermark_with_an_overlap(supabase, tmp_path):
+    local = mirror(supabase, tmp_path, max_age=0)
+    assert local.sync('crypto_prices') == 10
+
+    # The ingest rewrites a recent day and appends one
+    supabase.tables['crypto_prices'][-2] = price(9, BTC=1.0)
+    supabase.tables['crypto_prices'].append(price(11, BTC=50000))
+
+    assert local.sync('crypto_prices') == 5     # 2024-01-07 .. 2024-01-11
+    rows = local.price_rows(start='2024-01-09')
+    assert [row['prices'].get('BTC') for row in rows] == [1.0, 40010, 50000]
+
+
+def test_indicators_sync_by_version_and_keep_daily_rows_apart(supabase, tmp_path):
+    local = mirror(supabase, tmp_path, max_age=0)
+
+    assert local.indicator('funding_rate')['latest_data'] == {'signal': 'buy'}
+    assert local.count('indicators') == 3
+
+    supabase.tables['indicators'][0].update(version=4, latest_data={'signal': 'sell'})
+    assert local.sync('indicators') == 1
+    assert local.indicator('funding_rate')['latest_data'] == {'signal': 'sell'}
+    assert [row['data'] for row in local.rows('indicators', '2024-01-01', '2024-12-31')] == \
+        [{'crowding': 1.0}, {'crowding': 2.0}]
+
+
+def test_full_tables_are_replaced(supabase, tmp_path):
+    local = mirror(supabase, tmp_path, max_age=0)
+    assert [coin['symbol'] for coin in local.tracked_coins(since='2024-01-01')] == ['BTC']
+
+    supabase.tables['tracked_coins'].pop()
+    assert [coin['symbol'] for coin in local.tracked_coins()] == ['BTC']
+
+
+def test_offline_reads_fall_back_to_the_local_copy(supabase, tmp_path):
+    local = mirror(supabase, tmp_path, max_age=0)
+    supabase.offline = True
+    with pytest.raises(Exception):
+        local.price_rows()
+
+    supabase.offline = False
+    local.price_rows()
+    supabase.offline = True
+    assert len(local.price_rows()) == 10
+
+
+def test_get_mirror_follows_the_environment(supabase, tmp_path, monkeypatch):
+    monkeypatch.delenv('SUPABASE_MIRROR', raising=False)
+    assert get_mirror(supabase) is None
+
+    monkeypatch.setenv('SUPABASE_MIRROR', str(tmp_path / 'custom.sqlite'))
+    assert get_mirror(supabase).path == str(tmp_path / 'custom.sqlite')
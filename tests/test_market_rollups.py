@@ -0,0 +1,78 @@
+"""
+Weekly/monthly market rollups and their incremental updates
+"""
+
+import numpy as np
+import pandas as pd
+
+from fake_supabase import FakeSupabase
+from indicators.market_rollups import build_rollups, period_starts, update_rollups
+
+DATES = pd.date_range('2024-01-01', '2024-03-31')   # 2024-01-01 is a Monday
+
+
+def daily_rows(dates=DATES, symbols=('BTC', 'ETH')):
+    return [{'date': day.strftime('%Y-%m-%d'),
+             'prices': {symbol: float(i + 1) * (10 if symbol == 'ETH' else 1) for symbol in symbols}}
+            for i, day in enumerate(dates)]
+
+
+def rollups(supabase, table='crypto_prices', period='week'):
+    rows = supabase.tables.get(f'{table}_rollups', [])
+    return {row['date']: row for row in rows if row['period'] == period}
+
+
+def test_period_starts():
+    index = pd.DatetimeIndex(['2024-01-03', '2024-01-07', '2024-01-08', '2024-02-29'])
+
+    assert list(period_starts(index, 'week').strftime('%Y-%m-%d')) == \
+        ['2024-01-01', '2024-01-01', '2024-01-08', '2024-02-26']
+    assert list(period_starts(index, 'month').strftime('%Y-%m-%d')) == \
+        ['2024-01-01', '2024-01-01', '2024-01-01', '2024-02-01']
+
+
+def test_stats_and_sums_per_period():
+    frame = pd.DataFrame({'BTC': np.arange(1.0, 11.0), 'NEW': [np.nan] * 9 + [5.0]},
+                         index=pd.date_range('2024-01-01', periods=10))
+    frame.loc['2024-01-07', 'BTC'] = np.nan
+
+    weeks = build_rollups(frame, 'week', 'stats')
+    volumes = build_rollups(frame, 'week', 'sum')
+
+    first = weeks[0]
+    assert (first['date'], first['last_date'], first['days']) == ('2024-01-01', '2024-01-07', 7)
+    # last() skips the missing final day
+    assert first['stats'] == {'BTC': {'last': 6.0, 'mean': 3.5, 'high': 6.0, 'low': 1.0}}
+    assert weeks[1]['stats']['NEW'] == {'last': 5.0, 'mean': 5.0, 'high': 5.0, 'low': 5.0}
+    assert volumes[0]['stats'] == {'BTC': 21.0}
+    assert build_rollups(pd.DataFrame(), 'month', 'sum') == []
+
+
+def test_update_rebuilds_only_the_last_stored_period_onwards():
+    supabase = FakeSupabase({'crypto_prices': daily_rows(DATES[:40])})
+    assert update_rollups(supabase, tables=['crypto_prices'])
+    before = rollups(supabase)
+
+    supabase.tables['crypto_prices'] = daily_rows(DATES)
+    supabase.writes.clear()
+    assert update_rollups(supabase, tables=['crypto_prices'])
+
+    # Day 40 (2024-02-09) sits in the week of 2024-02-05: that week and later ones are rewritten
+    written = {row['date'] for _, _, rows in supabase.writes for row in rows if row['period'] == 'week'}
+    assert min(written) == '2024-02-05'
+    after = rollups(supabase)
+    assert after['2024-01-29'] == before['2024-01-29']
+    assert after['2024-02-05']['days'] == 7 and after['2024-03-25']['last_date'] == '2024-03-31'
+    assert rollups(supabase, period='month')['2024-03-01']['stats']['ETH']['high'] == 910.0
+
+
+def test_a_new_symbol_rebuilds_the_table():
+    supabase = FakeSupabase({'crypto_volumes': daily_rows(DATES[:40], symbols=('BTC',))})
+    update_rollups(supabase, tables=['crypto_volumes'])
+
+    # A coin entering the top 100 arrives with its whole history
+    supabase.tables['crypto_volumes'] = daily_rows(DATES[:41], symbols=('BTC', 'ETH'))
+    update_rollups(supabase, tables=['crypto_volumes'])
+
+    weeks = rollups(supabase, 'crypto_volumes')
+    assert weeks['2024-01-01']['stats'] == {'BTC': 28.0, 'ETH': 280.0}
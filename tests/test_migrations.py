@@ -0,0 +1,117 @@
+"""
+Migrations against a scratch Postgres database
+
+Needs TEST_DATABASE_URL pointing at a server where the user may create
+databases (e.g. postgresql://postgres@localhost:5432/postgres); skipped
+otherwise. Each test module run creates and drops its own database.
+"""
+
+import os
+import uuid
+import json
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2 import extensions  # noqa: E402
+
+URL = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not URL, reason="TEST_DATABASE_URL is not set")
+
+TODAY = "2030-01-01"
+
+
+@pytest.fixture(scope="module")
+def conn():
+    from indicators.schema import migrate
+
+    name = f"test_migrations_{uuid.uuid4().hex[:8]}"
+    admin = psycopg2.connect(URL)
+    admin.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE "{name}"')
+
+    params = extensions.parse_dsn(URL)
+    params["dbname"] = name
+    connection = psycopg2.connect(**params)
+    try:
+        migrate(connection)
+        yield connection
+    finally:
+        connection.close()
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE "{name}"')
+        admin.close()
+
+
+def upsert_indicators(cur, rows):
+    cur.execute("SELECT indicator_name, version FROM upsert_indicators(%s::jsonb)", (json.dumps(rows),))
+    return dict(cur.fetchall())
+
+
+def upsert_daily(cur, date, data):
+    """What bulk_upsert(..., on_conflict=DAILY_CONFLICT) sends for one crowding row"""
+    cur.execute("""
+        INSERT INTO indicators (indicator_name, date, data) VALUES (NULL, %s, %s)
+        ON CONFLICT (indicator_name, date) DO UPDATE SET data = EXCLUDED.data""", (date, json.dumps(data)))
+
+
+def rows_on(cur, date):
+    cur.execute("SELECT indicator_name, data FROM indicators WHERE date = %s ORDER BY indicator_name NULLS LAST",
+                (date,))
+    return cur.fetchall()
+
+
+def test_named_and_daily_rows_share_a_date(conn):
+    with conn.cursor() as cur:
+        versions = upsert_indicators(cur, [
+            {"indicator_name": "funding_rate", "date": TODAY, "latest_data": {"signal": "buy"}},
+            {"indicator_name": "avs_average", "date": TODAY, "latest_data": {"avs": 1.2}},
+            {"indicator_name": "crowding_sensitivity", "date": TODAY},
+        ])
+        upsert_daily(cur, TODAY, {"BTC": {"price": 1}})
+    conn.commit()
+
+    assert set(versions) == {"funding_rate", "avs_average", "crowding_sensitivity"}
+    with conn.cursor() as cur:
+        assert rows_on(cur, TODAY) == [
+            ("avs_average", None),
+            ("crowding_sensitivity", None),
+            ("funding_rate", None),
+            (None, {"BTC": {"price": 1}}),
+        ]
+
+
+def test_reruns_update_rows_in_place(conn):
+    with conn.cursor() as cur:
+        upsert_daily(cur, TODAY, {"BTC": {"price": 2}})
+        upsert_indicators(cur, [{"indicator_name": "funding_rate", "date": TODAY, "latest_data": {"signal": "sell"}}])
+        upsert_indicators(cur, [{"indicator_name": "funding_rate", "date": "2030-01-02"}])
+        cur.execute("SELECT date::text, latest_data FROM indicators WHERE indicator_name = 'funding_rate'")
+        funding = cur.fetchall()
+        daily = [data for name, data in rows_on(cur, TODAY) if name is None]
+    conn.commit()
+
+    # One row per name, moved to its latest date; one daily row per date
+    assert funding == [("2030-01-02", {"signal": "sell"})]
+    assert daily == [{"BTC": {"price": 2}}]
+
+
+def test_patches_commit_with_their_rows(conn):
+    patch = {"indicator_name": "avs_average", "seq": 1, "patch": {"traces": [], "layout": {"title": "x"}}}
+    with conn.cursor() as cur:
+        cur.execute("SELECT * FROM upsert_indicators(%s::jsonb, %s::jsonb)",
+                    (json.dumps([{"indicator_name": "avs_average", "date": TODAY, "figure_seq": 0}]), json.dumps([patch])))
+    conn.commit()
+
+    # A failing row takes its patch down with it
+    with conn.cursor() as cur:
+        with pytest.raises(psycopg2.Error):
+            cur.execute("SELECT * FROM upsert_indicators(%s::jsonb, %s::jsonb)",
+                        (json.dumps([{"indicator_name": "avs_average", "date": "not a date"}]),
+                         json.dumps([{**patch, "seq": 2}])))
+    conn.rollback()
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT seq FROM indicator_figure_patches WHERE indicator_name = 'avs_average'")
+        assert cur.fetchall() == [(1,)]
@@ -0,0 +1,88 @@
+"""
+Pipeline ordering, failure handling and critical path
+"""
+
+import time
+
+import pytest
+
+from indicators.pipeline import Pipeline
+
+
+def sleeper(seconds, result=None):
+    def run(inputs):
+        time.sleep(seconds)
+        return result if result is not None else sorted(inputs)
+    return run
+
+
+def build():
+    # ingest -> screener -> upload, ingest -> rollups, sheets -> funding
+    pipeline = Pipeline(max_workers=4)
+    pipeline.add('upload', sleeper(0.01), deps=['screener'])
+    pipeline.add('screener', sleeper(0.15), deps=['ingest'])
+    pipeline.add('rollups', sleeper(0.01), deps=['ingest'])
+    pipeline.add('ingest', sleeper(0.05))
+    pipeline.add('sheets', sleeper(0.02))
+    pipeline.add('funding', sleeper(0.02), deps=['sheets'])
+    return pipeline
+
+
+def test_topological_order_puts_dependencies_first():
+    pipeline = build()
+    order = pipeline.topological_order()
+
+    assert sorted(order) == sorted(pipeline.nodes)
+    for name, node in pipeline.nodes.items():
+        for dep in node.deps:
+            assert order.index(dep) < order.index(name)
+
+
+def test_cycles_and_unknown_dependencies_raise():
+    cyclic = Pipeline().add('a', sleeper(0), deps=['b']).add('b', sleeper(0), deps=['a'])
+    with pytest.raises(ValueError, match='Cycle'):
+        cyclic.topological_order()
+
+    dangling = Pipeline().add('a', sleeper(0), deps=['missing'])
+    with pytest.raises(ValueError, match='unknown node'):
+        dangling.topological_order()
+
+
+def test_run_passes_dependency_results():
+    results = build().run()
+
+    assert results['upload'] == ['screener']
+    assert results['screener'] == ['ingest']
+    assert results['ingest'] == []
+
+
+def test_critical_path_is_the_longest_chain():
+    pipeline = build()
+    pipeline.run()
+
+    path, seconds = pipeline.critical_path()
+
+    assert path == ['ingest', 'screener', 'upload']
+    assert seconds >= 0.2
+    # Independent branches overlapped
+    assert pipeline.wall_time < 0.2 + 0.05 + 0.01 + 0.02 + 0.02 + 0.01
+
+
+def test_failed_node_skips_its_dependents_only():
+    pipeline = build()
+
+    def fail(inputs):
+        raise RuntimeError('CoinGecko down')
+
+    pipeline.nodes['screener'].func = fail
+    results = pipeline.run()
+
+    assert set(pipeline.failed) == {'screener'}
+    assert pipeline.skipped == ['upload']
+    assert set(results) == {'ingest', 'rollups', 'sheets', 'funding'}
+
+
+def test_select_keeps_dependencies():
+    pipeline = build().select(['upload'])
+
+    assert set(pipeline.nodes) == {'ingest', 'screener', 'upload'}
@@ -0,0 +1,98 @@
+"""
+ResultCache single-flight computation, expiry and eviction
+"""
+
+import threading
+import time
+
+import pytest
+
+from indicators.result_cache import ResultCache
+
+THREADS = 8
+
+
+def run_concurrently(cache, key, func):
+    """Call get_or_compute from THREADS threads at once; returns (results, errors)"""
+    results, errors = [], []
+    barrier = threading.Barrier(THREADS)
+
+    def call():
+        barrier.wait()
+        try:
+            results.append(cache.get_or_compute(key, func))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'figure': 'x'}
+
+    results, errors = run_concurrently(cache, 'funding', compute)
+
+    assert errors == []
+    assert len(calls) == 1
+    assert len(results) == THREADS and all(r is results[0] for r in results)
+    stats = cache.stats()
+    assert stats['misses'] == 1 and stats['hits'] + stats['coalesced'] == THREADS - 1
+
+
+def test_exceptions_are_shared_but_not_cached():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        raise RuntimeError('sheet unavailable')
+
+    results, errors = run_concurrently(cache, 'avs', compute)
+
+    assert results == []
+    assert len(errors) == THREADS and len(calls) == 1
+    assert cache.get_or_compute('avs', lambda: 'recovered') == 'recovered'
+
+
+def test_entries_expire():
+    cache = ResultCache(ttl=0.05)
+    cache.put('key', 1)
+    assert cache.get('key') == 1
+
+    time.sleep(0.06)
+
+    assert cache.get('key') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get('b') is None
+
+
+@pytest.mark.parametrize('predicate, kept', [(None, set()), (lambda key: key[0] == 'funding', {('avs', 1)})])
+def test_invalidate(predicate, kept):
+    cache = ResultCache()
+    for key in [('funding', 1), ('funding', 2), ('avs', 1)]:
+        cache.put(key, key)
+
+    cache.invalidate(predicate)
+
+    assert {key for key in [('funding', 1), ('funding', 2), ('avs', 1)] if cache.get(key)} == kept
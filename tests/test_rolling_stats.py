@@ -0,0 +1,88 @@
+"""
+Multi-window rolling statistics against pandas and exact window sums
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators.rolling_stats import crowding_surface, rolling_moments, rolling_zscore
+
+WINDOWS = [2, 7, 14, 30, 100, 365]
+
+
+def random_walk(n, columns=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1000 + rng.normal(size=(n, columns)).cumsum(axis=0)
+
+
+# pandas' running sums drift by ~1e-11 of the price level; the exact check is below
+PANDAS_ATOL = 1e-8
+
+
+def test_moments_match_pandas():
+    values = random_walk(800)
+    mean, std = rolling_moments(values, WINDOWS)
+    frame = pd.DataFrame(values)
+
+    for i, w in enumerate(WINDOWS):
+        np.testing.assert_allclose(mean[i], frame.rolling(w).mean().to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(std[i], frame.rolling(w).std().to_numpy(), rtol=1e-9, atol=PANDAS_ATOL)
+
+
+def test_missing_values_match_pandas():
+    values = random_walk(400)
+    values[50, 0] = np.nan
+    values[:30, 1] = np.nan
+    values[200:210, 2] = np.nan
+    mean, std = rolling_moments(values, [5, 20, 90])
+    frame = pd.DataFrame(values)
+
+    for i, w in enumerate([5, 20, 90]):
+        expected_mean = frame.rolling(w).mean().to_numpy()
+        expected_std = frame.rolling(w).std().to_numpy()
+        assert np.array_equal(np.isnan(mean[i]), np.isnan(expected_mean))
+        assert np.array_equal(np.isnan(std[i]), np.isnan(expected_std))
+        np.testing.assert_allclose(mean[i], expected_mean, rtol=1e-12)
+        np.testing.assert_allclose(std[i], expected_std, rtol=1e-9, atol=PANDAS_ATOL)
+
+
+@pytest.mark.parametrize('w', [2, 14, 30, 365])
+def test_std_is_accurate_on_a_trending_series(w):
+    # 100 -> 100,000 over 4,000 days
+    rng = np.random.default_rng(1)
+    values = np.geomspace(100, 100_000, 4000) * np.exp(rng.normal(0, 0.002, 4000).cumsum())
+    _, std = rolling_moments(values, [w])
+
+    windows = sliding_window_view(values, w)
+    exact = np.sqrt(((windows - windows.mean(axis=1, keepdims=True)) ** 2).sum(axis=1) / (w - 1))
+    np.testing.assert_allclose(std[0][w - 1:], exact, rtol=1e-12)
+
+
+def test_constant_windows_have_zero_std_and_zscore():
+    rng = np.random.default_rng(2)
+    values = np.concatenate([rng.normal(size=50), np.full(300, 12345.678), rng.normal(size=50)])
+    _, std = rolling_moments(values, [5, 14, 100])
+    zscore = rolling_zscore(values, [5, 14, 100])
+
+    assert (std[:, 150:350] == 0).all()
+    assert (zscore[:, 150:350] == 0).all()
+
+
+def test_zscore_matches_pandas():
+    series = pd.Series(random_walk(500, columns=1)[:, 0])
+    zscore = rolling_zscore(series.to_numpy(), [20, 100])
+
+    for i, w in enumerate([20, 100]):
+        expected = (series - series.rolling(w).mean()) / series.rolling(w).std()
+        np.testing.assert_allclose(zscore[i], expected.to_numpy(), rtol=1e-8, atol=1e-10)
+
+
+def test_crowding_surface_has_one_row_per_window():
+    prices = pd.Series(random_walk(400, columns=1)[:, 0], index=pd.date_range('2023-01-01', periods=400))
+    surface = crowding_surface(prices, [20, 100])
+
+    assert list(surface.index) == [20, 100]
+    assert list(surface.columns) == list(prices.index)
+    assert surface.iloc[:, -1].notna().all()
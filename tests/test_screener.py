@@ -0,0 +1,100 @@
+"""
+Screener metrics on a date x coin matrix against per-coin pandas
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from indicators.rolling_stats import EPS
+from indicators.screener import (
+    build_price_matrix,
+    compute_screener,
+    latest_values,
+    prepare_latest_records,
+    prepare_series_records,
+)
+
+PARAMS = {'rsi_period': 14, 'roc_period': 30, 'window': 50, 'volatility_window': 20}
+
+
+def price_matrix(days=300, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', periods=days, name='date')
+    returns = rng.normal(0, 0.03, size=(days, 3))
+    prices = pd.DataFrame(100 * np.exp(returns.cumsum(axis=0)), index=dates, columns=['BTC', 'ETH', 'SOL'])
+    prices.iloc[:40, 2] = np.nan     # listed later
+    prices.iloc[-10:, 1] = np.nan    # stopped updating
+    return prices
+
+
+def crowding_pandas(close, p):
+    """The single-coin crowding index, written the plain pandas way"""
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).rolling(p['rsi_period']).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(p['rsi_period']).mean().replace(0, EPS)
+    rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    roc = (close / close.shift(p['roc_period']) - 1) * 100
+    std = roc.rolling(p['window']).std().replace(0, EPS)
+    z_score = (roc - roc.rolling(p['window']).mean()) / std
+    return rsi, z_score, rsi * z_score
+
+
+def test_price_matrix_from_rows():
+    rows = [
+        {'date': '2024-01-02', 'prices': json.dumps({'BTC': '43000.5', 'ETH': 2300})},
+        {'date': '2024-01-01', 'prices': {'BTC': 42000, 'ETH': None}},
+        {'date': '2024-01-02', 'prices': {'BTC': 43100, 'DOGE': 0.09}},
+    ]
+
+    matrix = build_price_matrix(rows)
+
+    assert list(matrix.index.strftime('%Y-%m-%d')) == ['2024-01-01', '2024-01-02']
+    assert matrix.loc['2024-01-02', 'BTC'] == 43100
+    assert np.isnan(matrix.loc['2024-01-01', 'ETH']) and matrix.loc['2024-01-02', 'DOGE'] == 0.09
+    assert build_price_matrix([]).empty
+
+
+def test_every_coin_matches_its_single_coin_computation():
+    prices = price_matrix()
+
+    metrics = compute_screener(prices, PARAMS)
+
+    for symbol in ['BTC', 'ETH']:
+        rsi, z_score, crowding = crowding_pandas(prices[symbol], PARAMS)
+        pd.testing.assert_series_equal(metrics['rsi'][symbol], rsi, check_names=False, atol=1e-8)
+        pd.testing.assert_series_equal(metrics['z_score'][symbol], z_score, check_names=False, atol=1e-6)
+        pd.testing.assert_series_equal(metrics['crowding'][symbol], crowding, check_names=False, atol=1e-5)
+
+    drawdown = prices['BTC'] / prices['BTC'].cummax() - 1
+    pd.testing.assert_series_equal(metrics['drawdown']['BTC'], drawdown, check_names=False)
+    volatility = np.log(prices['BTC']).diff().rolling(PARAMS['volatility_window']).std() * np.sqrt(365)
+    pd.testing.assert_series_equal(metrics['volatility']['BTC'], volatility, check_names=False, atol=1e-10)
+
+
+def test_latest_values_use_each_coins_last_price():
+    prices = price_matrix()
+    latest = latest_values(compute_screener(prices, PARAMS))
+
+    assert latest.loc['BTC', 'date'] == prices.index[-1]
+    assert latest.loc['ETH', 'date'] == prices.index[-11]
+    assert latest.loc['ETH', 'price'] == prices['ETH'].iloc[-11]
+
+    records = {r['symbol']: r for r in prepare_latest_records(latest)}
+    assert records['ETH']['date'] == prices.index[-11].strftime('%Y-%m-%d')
+    assert set(records['SOL']) == {'symbol', 'date', 'price', 'rsi', 'roc', 'z_score', 'crowding',
+                                   'volatility', 'drawdown'}
+
+
+def test_series_start_at_the_first_price_and_skip_empty_coins():
+    prices = price_matrix()
+    prices['NEW'] = np.nan
+
+    records = {r['symbol']: r['series'] for r in prepare_series_records(compute_screener(prices, PARAMS))}
+
+    assert set(records) == {'BTC', 'ETH', 'SOL'}
+    assert records['SOL']['dates'][0] == prices.index[40].strftime('%Y-%m-%d')
+    assert len(records['ETH']['dates']) == len(prices) - 10
+    # Warm-up values are stored as JSON nulls
+    assert records['BTC']['rsi'][0] is None and records['BTC']['rsi'][-1] is not None
@@ -0,0 +1,109 @@
+"""
+SheetLoader snapshot cache and tail reads, against CSV fixtures
+"""
+
+import csv
+import os
+
+import pytest
+
+from indicators.sheets_loader import FixtureSheetBackend, SheetLoader
+
+RANGE = 'prices!A:C'
+
+
+class CountingBackend(FixtureSheetBackend):
+    """Fixture backend that records every value read"""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.requests = []
+
+    def batch_get(self, ranges):
+        self.requests.append(list(ranges))
+        return super().batch_get(ranges)
+
+
+def write_sheet(directory, rows, mtime):
+    path = os.path.join(directory, 'prices.csv')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    # Explicit mtimes: the fixture's modified time is the newest CSV mtime
+    os.utime(path, (mtime, mtime))
+
+
+def sheet_rows(n):
+    return [['date', 'close', 'fr']] + [[f'2024-01-{i + 1:02d}', str(100 + i), '0.0001'] for i in range(n)]
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    directory = tmp_path / 'fixtures'
+    directory.mkdir()
+    backend = CountingBackend(str(directory))
+    loader = SheetLoader('test-sheet', backend=backend, cache_dir=str(tmp_path / 'cache'), overlap=3)
+    return str(directory), backend, loader
+
+
+def test_first_load_reads_the_range(sheet):
+    directory, backend, loader = sheet
+    write_sheet(directory, sheet_rows(10), 1000)
+
+    values = loader.load([RANGE])[RANGE]
+
+    assert values == sheet_rows(10)
+    assert backend.requests == [[RANGE]]
+    assert loader.version() == '1000.0'
+
+
+def test_unchanged_sheet_makes_no_value_reads(sheet):
+    directory, backend, loader = sheet
+    write_sheet(directory, sheet_rows(10), 1000)
+    loader.load([RANGE])
+    backend.requests.clear()
+
+    values = loader.load([RANGE])[RANGE]
+    # A new loader on the same cache directory (e.g. the next CI run)
+    fresh = SheetLoader('test-sheet', backend=backend, cache_dir=loader.cache_dir)
+    fresh_values = fresh.load([RANGE])[RANGE]
+
+    assert values == fresh_values == sheet_rows(10)
+    assert backend.requests == []
+
+
+def test_appended_rows_are_read_as_a_tail(sheet):
+    directory, backend, loader = sheet
+    write_sheet(directory, sheet_rows(10), 1000)
+    loader.load([RANGE])
+    backend.requests.clear()
+
+    write_sheet(directory, sheet_rows(12), 2000)
+    values = loader.load([RANGE])[RANGE]
+
+    assert values == sheet_rows(12)
+    # Header + 10 rows cached: the tail starts at the 3 overlap rows (sheet rows 9-11)
+    assert backend.requests == [['prices!A9:C']]
+
+
+def test_changed_overlap_falls_back_to_a_full_read(sheet):
+    directory, backend, loader = sheet
+    write_sheet(directory, sheet_rows(10), 1000)
+    loader.load([RANGE])
+    backend.requests.clear()
+
+    rows = sheet_rows(12)
+    rows[9][1] = '999'  # Edit inside the overlap
+    write_sheet(directory, rows, 2000)
+    values = loader.load([RANGE])[RANGE]
+
+    assert values == rows
+    assert backend.requests == [['prices!A9:C'], [RANGE]]
+
+
+def test_load_tail_keeps_the_header(sheet):
+    directory, backend, loader = sheet
+    write_sheet(directory, sheet_rows(10), 1000)
+
+    values = loader.load_tail([RANGE], 2)[RANGE]
+
+    assert values == [sheet_rows(10)[0]] + sheet_rows(10)[-2:]
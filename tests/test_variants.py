@@ -0,0 +1,53 @@
+"""
+Period slices, theme overlays and variant rows
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators.variants import DEFAULT_VARIANT, apply_theme, period_slices, slice_from, variant_rows
+
+
+def frame(days=400):
+    return pd.DataFrame({'close': np.arange(days, dtype=float)}, index=pd.date_range('2023-01-01', periods=days))
+
+
+def test_periods_end_at_the_last_row_not_the_clock():
+    data = frame()
+
+    slices = period_slices(data, ('7d', '1y', 'all'))
+
+    assert slices['all'] is data
+    assert slices['7d'].index[0] == data.index[-1] - pd.Timedelta(days=7)
+    assert len(slices['7d']) == 8 and len(slices['1y']) == 366
+    assert period_slices(data, ('7d',))['7d'].equals(slices['7d'])
+
+
+def test_unsorted_frames_are_masked():
+    data = frame(30).iloc[::-1]
+
+    assert len(slice_from(data, '2023-01-25')) == 6
+
+
+def test_themes_share_the_data_arrays():
+    x = np.arange(10)
+    figure = {'data': [{'x': x, 'line': {'width': 1}}, {'x': x}], 'layout': {'font': {'size': 12}}}
+
+    dark = apply_theme(figure, {'layout': {'font': {'color': 'white'}}, 'traces': {0: {'line': {'color': 'gold'}}}})
+
+    assert dark['layout']['font'] == {'size': 12, 'color': 'white'}
+    assert dark['data'][0]['line'] == {'width': 1, 'color': 'gold'}
+    assert dark['data'][0]['x'] is x and dark['data'][1] is figure['data'][1]
+    assert figure['layout']['font'] == {'size': 12} and figure['data'][0]['line'] == {'width': 1}
+
+
+def test_variant_rows_skip_the_default_and_unchanged_variants():
+    variants = {('7d', 'light'): {'data': [1]}, ('7d', 'dark'): {'data': [2]}, DEFAULT_VARIANT: {'data': [3]}}
+
+    rows = variant_rows('funding_rate', variants, '2024-01-01')
+    stored = {(row['period'], row['theme']): row['content_hash'] for row in rows}
+    variants[('7d', 'dark')] = {'data': [4]}
+
+    assert sorted(stored) == [('7d', 'dark'), ('7d', 'light')]
+    assert [(row['period'], row['theme']) for row in variant_rows('funding_rate', variants, '2024-01-02', stored)] == \
+        [('7d', 'dark')]
@@ -3,9 +3,14 @@ import requests
 import pandas as pd
 import time
 import json
+import argparse
 from datetime import datetime, UTC, timedelta
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from indicators.bulk_writer import BulkWriter
+from indicators.market_rollups import update_rollups
+from indicators.coin_stats import compute_coin_stats, upload_coin_stats
+from indicators.dashboard_snapshot import build_snapshot, publish_snapshot
 
 # Load environment variables from .env.local
 load_dotenv('.env.local')
@@ -15,9 +20,6 @@ SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
 SUPABASE_KEY = os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
 COINGECKO_API_KEY = os.getenv('COINGECKO_API_KEY')
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 # ------------------------------
 # Functions for tracking coins and rankings
 # ------------------------------
@@ -142,10 +144,6 @@ headers_markets = {
     "Accept": "application/json"
 }
 
-response_markets = requests.get(url_markets, params=params_markets, headers=headers_markets)
-response_markets.raise_for_status()
-coins_data = response_markets.json()
-
 # Exclusion list (CoinGecko IDs) – coins to be skipped
 exclude_ids = [
     "tether", "usd-coin", "staked-ether", "wrapped-bitcoin", "wrapped-steth", "usds",
@@ -157,27 +155,24 @@ exclude_ids = [
     "binance-peg-dogecoin", "l2-standard-bridged-weth-base", "usdx-money-usdx"
 ]
 
-# Filter out excluded coins from the fetched list
-filtered_coins = [coin for coin in coins_data if coin["id"] not in exclude_ids]
-
-# Select the top 100 coins from the filtered list (if available)
-selected_coins = filtered_coins[:100]
-print(f"Total coins after exclusion and selection: {len(selected_coins)}")
-
-# Build a list of coin dictionaries with "ID" and "Symbol"
-coins = [{"ID": coin["id"], "Symbol": coin["symbol"].upper()} for coin in selected_coins]
+def get_top_coins():
+    """
+    Returns the top 100 coins by market cap as {"ID", "Symbol"} dictionaries,
+    skipping the excluded IDs
+    """
+    response_markets = requests.get(url_markets, params=params_markets, headers=headers_markets)
+    response_markets.raise_for_status()
+    coins_data = response_markets.json()
 
-# ------------------------------
-# Update rankings and tracked coins
-# ------------------------------
-print("Updating coin rankings...")
-update_rankings(supabase, coins)
+    # Filter out excluded coins from the fetched list
+    filtered_coins = [coin for coin in coins_data if coin["id"] not in exclude_ids]
 
-print("Updating tracked coins list...")
-update_tracked_coins(supabase, coins)
+    # Select the top 100 coins from the filtered list (if available)
+    selected_coins = filtered_coins[:100]
+    print(f"Total coins after exclusion and selection: {len(selected_coins)}")
 
-# Get all coins that should be tracked (current top 100 + recently relevant)
-all_coins_to_track = get_all_active_coins(supabase, coins, max_days_out=30)
+    # Build a list of coin dictionaries with "ID" and "Symbol"
+    return [{"ID": coin["id"], "Symbol": coin["symbol"].upper()} for coin in selected_coins]
 
 # ------------------------------
 # API settings for historical data
@@ -194,11 +189,6 @@ params = {
     "to": int(datetime.now(UTC).timestamp())
 }
 
-# Storage for price, market cap, and volume data
-price_data = {}
-market_cap_data = {}
-volume_data = {}
-
 # ------------------------------
 # Fetch historical data for each coin
 # ------------------------------
@@ -238,18 +228,6 @@ def fetch_coin_data(coin_id, symbol):
         print(f"Failed to fetch {symbol}: {e}")
         return {}, {}, {}
 
-# Fetch data for all coins to track, not just the top 100
-for coin in all_coins_to_track:
-    coin_id = coin["ID"]
-    symbol = coin["Symbol"]
-    
-    prices, market_caps, volumes = fetch_coin_data(coin_id, symbol)
-    
-    if prices:
-        price_data[symbol] = prices
-        market_cap_data[symbol] = market_caps
-        volume_data[symbol] = volumes
-
 # ------------------------------
 # Convert data dictionaries to DataFrames
 # ------------------------------
@@ -258,18 +236,8 @@ def create_dataframe(data):
     df.insert(0, "Date", df.index)
     return df
 
-df_prices = create_dataframe(price_data)
-df_market_caps = create_dataframe(market_cap_data)
-df_volumes = create_dataframe(volume_data)
-
-# Save locally as CSV (optional)
-df_prices.to_csv("top_100_coins_prices.csv", index=False)
-df_market_caps.to_csv("top_100_coins_market_caps.csv", index=False)
-df_volumes.to_csv("top_100_coins_volumes.csv", index=False)
-print("✅ Saved historical data locally.")
-
 # Modify the batch_insert function
-def batch_insert(supabase, table_name, data, batch_size=100):
+def batch_insert(supabase, table_name, data):
     if data.empty:
         print(f"No data to insert for {table_name}")
         return
@@ -293,18 +261,130 @@ def batch_insert(supabase, table_name, data, batch_size=100):
         print(f"No valid data to insert for {table_name}")
         return
 
-    for i in range(0, len(supabase_data), batch_size):
-        batch = supabase_data[i:i+batch_size]
-        try:
-            # Upsert to handle potential duplicate dates
-            response = supabase.table(table_name).upsert(batch).execute()
-            print(f"Inserted/Updated {table_name} batch {i//batch_size + 1}")
-        except Exception as e:
-            print(f"Error inserting {table_name} batch {i//batch_size + 1}: {e}")
+    # Merged into the stored rows (handles duplicate dates, and a coin whose
+    # fetch failed keeps its history), in size-based batches, several at a time
+    stats = BulkWriter(supabase).merge(table_name, supabase_data, fallback_upsert=True)
+    print(f"Inserted/Updated {stats['rows']} {table_name} rows in {stats['batches']} batches ({stats['seconds']:.1f}s)")
+    if stats['failed']:
+        print(f"Error inserting {stats['failed']} {table_name} rows")
+
+# ------------------------------
+# Single-coin backfill
+# ------------------------------
+def backfill_coin(supabase, coin_id, symbol):
+    """
+    Fetches one coin's history and merges only its values into the price,
+    market cap and volume rows, leaving every other coin untouched.
+    """
+    prices, market_caps, volumes = fetch_coin_data(coin_id, symbol)
+    if not prices:
+        print(f"No data fetched for {symbol}")
+        return False
 
-# Perform batch inserts
-batch_insert(supabase, 'crypto_prices', df_prices)
-batch_insert(supabase, 'crypto_market_caps', df_market_caps)
-batch_insert(supabase, 'crypto_volumes', df_volumes)
+    writer = BulkWriter(supabase)
+    for table_name, values in [('crypto_prices', prices), ('crypto_market_caps', market_caps),
+                               ('crypto_volumes', volumes)]:
+        writer.merge(table_name, [{'date': date, 'prices': {symbol: value}} for date, value in values.items()])
+    writer.report()
+    return not any(total['failed'] for total in writer.totals.values())
+
+# ------------------------------
+# Full ingest run
+# ------------------------------
+def run_ingest(supabase=None):
+    """
+    Fetches the current top 100, updates rankings and tracking, downloads
+    history for every tracked coin, upserts it into Supabase and refreshes
+    the per-coin stats and the dashboard snapshot.
+
+    Returns the price, market cap and volume DataFrames so callers can reuse
+    them without reading them back from the database.
+    """
+    if supabase is None:
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    coins = get_top_coins()
+
+    # ------------------------------
+    # Update rankings and tracked coins
+    # ------------------------------
+    print("Updating coin rankings...")
+    update_rankings(supabase, coins)
+
+    print("Updating tracked coins list...")
+    update_tracked_coins(supabase, coins)
+
+    # Get all coins that should be tracked (current top 100 + recently relevant)
+    all_coins_to_track = get_all_active_coins(supabase, coins, max_days_out=30)
+
+    # Storage for price, market cap, and volume data
+    price_data = {}
+    market_cap_data = {}
+    volume_data = {}
+
+    # Fetch data for all coins to track, not just the top 100
+    for coin in all_coins_to_track:
+        coin_id = coin["ID"]
+        symbol = coin["Symbol"]
+
+        prices, market_caps, volumes = fetch_coin_data(coin_id, symbol)
+
+        if prices:
+            price_data[symbol] = prices
+            market_cap_data[symbol] = market_caps
+            volume_data[symbol] = volumes
+
+    df_prices = create_dataframe(price_data)
+    df_market_caps = create_dataframe(market_cap_data)
+    df_volumes = create_dataframe(volume_data)
+
+    # Save locally as CSV (optional)
+    df_prices.to_csv("top_100_coins_prices.csv", index=False)
+    df_market_caps.to_csv("top_100_coins_market_caps.csv", index=False)
+    df_volumes.to_csv("top_100_coins_volumes.csv", index=False)
+    print("✅ Saved historical data locally.")
+
+    # Perform batch inserts
+    batch_insert(supabase, 'crypto_prices', df_prices)
+    batch_insert(supabase, 'crypto_market_caps', df_market_caps)
+    batch_insert(supabase, 'crypto_volumes', df_volumes)
+
+    # Latest values, changes, ATH/drawdown and volatility for the stats cards
+    coin_stats = compute_coin_stats(df_prices, df_market_caps, df_volumes)
+    if upload_coin_stats(supabase, coin_stats):
+        print("✅ Updated coin stats.")
+    else:
+        print("Failed to update coin stats")
+
+    # Everything the dashboard's default view needs, in one document
+    snapshot = build_snapshot(df_prices, df_market_caps, df_volumes, coins, coin_stats)
+    if publish_snapshot(supabase, snapshot):
+        print(f"✅ Published dashboard snapshot {snapshot['version']}.")
+    else:
+        print("Failed to publish the dashboard snapshot")
+
+    print("🚀 Supabase upload complete!")
+
+    return {
+        "coins": coins,
+        "tracked_coins": all_coins_to_track,
+        "prices": df_prices,
+        "market_caps": df_market_caps,
+        "volumes": df_volumes,
+    }
 
-print("🚀 Supabase upload complete!")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest top 100 market data into Supabase")
+    parser.add_argument('--backfill', nargs=2, metavar=('COINGECKO_ID', 'SYMBOL'),
+                        help="Only backfill one coin's history into the existing rows")
+    parser.add_argument('--rollups-only', action='store_true',
+                        help="Only update the weekly/monthly rollups from the stored rows")
+    args = parser.parse_args()
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    if args.backfill:
+        ok = backfill_coin(supabase, args.backfill[0], args.backfill[1].upper())
+        # A backfill rewrites old days, so rebuild every period
+        exit(0 if ok and update_rollups(supabase, full_refresh=True) else 1)
+    if not args.rollups_only:
+        run_ingest(supabase)
+    exit(0 if update_rollups(supabase) else 1)